@@ -0,0 +1,15 @@
+from botocore.exceptions import ClientError
+
+from grammy_common import backup, streams, telemetry
+
+
+@telemetry.instrument(route="STREAM backup-changes")
+def handler(event, context):
+    records = event.get("Records", [])
+    try:
+        backup.write_changes(records)
+    except ClientError:
+        return streams.batch_response(
+            record["dynamodb"]["SequenceNumber"] for record in records
+        )
+    return streams.batch_response([])
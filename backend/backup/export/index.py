@@ -0,0 +1,12 @@
+from grammy_common import backup, telemetry
+
+
+@telemetry.instrument(route="JOB backup-export")
+def handler(event, context):
+    if "segment" in event:
+        return backup.export_segment(
+            event["prefix"], event["segment"], event["segments"]
+        )
+    if event.get("full"):
+        return backup.export_full()
+    return backup.scheduled_export()
@@ -0,0 +1,10 @@
+from grammy_common import backup, telemetry
+
+
+@telemetry.instrument(route="JOB backup-restore")
+def handler(event, context):
+    return backup.restore(
+        prefix=event.get("export"),
+        table_name=event.get("table"),
+        until=event.get("until"),
+    )
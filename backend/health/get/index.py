@@ -1,2 +1,6 @@
-def handler(event, context):
-    return {"statusCode": 200, "body": "Healthy!"}
+from grammy_common import telemetry
+
+
+@telemetry.instrument
+def handler(event, context):
+    return {"statusCode": 200, "body": "Healthy!"}
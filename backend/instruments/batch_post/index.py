@@ -0,0 +1,8 @@
+from grammy_common import api, db
+from grammy_common.keys import INSTRUMENT
+
+
+@api.endpoint
+def handler(event, context):
+    created, failed = db.create_many(INSTRUMENT, api.batch_body(event))
+    return api.batch_write_result(created, failed)
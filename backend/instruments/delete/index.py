@@ -1,2 +1,10 @@
+from grammy_common import api, db
+from grammy_common.keys import INSTRUMENT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Deleted instrument successfully"}
+    body = api.json_body(event)
+    if not db.delete(INSTRUMENT, api.require_id(event, body)):
+        raise api.ApiError(404, "Instrument not found")
+    return api.response(204)
@@ -1,2 +1,13 @@
+from grammy_common import api, cache
+from grammy_common.keys import INSTRUMENT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Retrieved instrument ID successfully"}
+    fields = api.fields_param(event)
+    instrument = cache.get(INSTRUMENT, api.require_id(event), fields)
+    if instrument is None:
+        raise api.ApiError(404, "Instrument not found")
+    return api.conditional(
+        event, instrument, api.etag(instrument, variant=",".join(fields or ()))
+    )
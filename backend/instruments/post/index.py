@@ -1,2 +1,7 @@
+from grammy_common import api, db
+from grammy_common.keys import INSTRUMENT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Created instrument successfully"}
+    return api.response(201, db.create(INSTRUMENT, api.json_body(event)))
@@ -1,2 +1,11 @@
+from grammy_common import api, db
+from grammy_common.keys import INSTRUMENT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Updated instrument successfully"}
+    body = api.json_body(event)
+    instrument = db.replace(INSTRUMENT, api.require_id(event, body), body)
+    if instrument is None:
+        raise api.ApiError(404, "Instrument not found")
+    return api.response(200, instrument)
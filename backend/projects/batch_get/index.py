@@ -0,0 +1,10 @@
+from grammy_common import api, db
+from grammy_common.keys import PROJECT
+
+
+@api.endpoint
+def handler(event, context):
+    items, missing, failed = db.get_many(
+        PROJECT, api.id_list(event), api.fields_param(event)
+    )
+    return api.batch_get_result(items, missing, failed)
@@ -1,5 +1,10 @@
+from grammy_common import api, db
+from grammy_common.keys import PROJECT
+
+
+@api.endpoint
 def handler(event, context):
-    return {
-        "statusCode": 200,
-        "body": "Deleted project successfully"
-    }
+    body = api.json_body(event)
+    if not db.delete(PROJECT, api.require_id(event, body)):
+        raise api.ApiError(404, "Project not found")
+    return api.response(204)
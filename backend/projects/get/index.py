@@ -1,2 +1,8 @@
+from grammy_common import api, db
+from grammy_common.keys import PROJECT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "List of projects will be returned here"}
+    items, cursor = db.list_items(PROJECT, **api.page_params(event))
+    return api.page(event, items, cursor)
@@ -1,2 +1,16 @@
+from grammy_common import api, db
+
+INCLUDES = ("songs", "instruments", "tunings")
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Project with specific ID will be returned here"}
+    include = api.include_param(event, INCLUDES)
+    fields = api.fields_param(event)
+    project = db.get_project(api.require_id(event), include, fields)
+    if project is None:
+        raise api.ApiError(404, "Project not found")
+    related = [item for name in sorted(include) for item in project[name]]
+    variant = ",".join(sorted(include)) + "|" + ",".join(fields or ())
+    tag = api.etag(project, *related, variant=variant)
+    return api.conditional(event, project, tag)
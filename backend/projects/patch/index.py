@@ -0,0 +1,16 @@
+from grammy_common import api, db
+from grammy_common.keys import PROJECT
+
+
+@api.endpoint
+def handler(event, context):
+    changes, version = api.patch_body(event)
+    try:
+        changed = db.update(PROJECT, api.require_id(event), changes, version)
+    except db.VersionConflict as conflict:
+        raise api.ApiError(
+            409, f"Project was modified; current version is {conflict.version}"
+        )
+    if changed is None:
+        raise api.ApiError(404, "Project not found")
+    return api.response(200, changed)
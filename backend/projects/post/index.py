@@ -1,2 +1,7 @@
+from grammy_common import api, db
+from grammy_common.keys import PROJECT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Project created successfully"}
+    return api.response(201, db.create(PROJECT, api.json_body(event)))
@@ -1,2 +1,11 @@
+from grammy_common import api, db
+from grammy_common.keys import PROJECT
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Project updated successfully"}
+    body = api.json_body(event)
+    project = db.replace(PROJECT, api.require_id(event, body), body)
+    if project is None:
+        raise api.ApiError(404, "Project not found")
+    return api.response(200, project)
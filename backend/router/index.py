@@ -0,0 +1,3 @@
+from grammy_common.router import handler
+
+__all__ = ["handler"]
@@ -0,0 +1,22 @@
+from grammy_common import api, keys, search
+
+
+@api.endpoint
+def handler(event, context):
+    text = (api.query_param(event, "q") or "").strip()
+    if not text:
+        raise api.ApiError(400, "Missing required parameter: q")
+    raw_limit = api.query_param(event, "limit", str(search.DEFAULT_RESULTS))
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise api.ApiError(400, "limit must be an integer")
+    if not 1 <= limit <= search.MAX_RESULTS:
+        raise api.ApiError(400, f"limit must be between 1 and {search.MAX_RESULTS}")
+    types = frozenset(
+        value for value in (api.query_param(event, "type") or "").split(",") if value
+    )
+    unknown = types - set(keys.ENTITIES)
+    if unknown:
+        raise api.ApiError(400, f"Unknown type: {', '.join(sorted(unknown))}")
+    return api.response(200, {"items": search.query(text, limit, types)})
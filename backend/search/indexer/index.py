@@ -0,0 +1,8 @@
+from grammy_common import search, streams, telemetry
+
+
+@telemetry.instrument(route="STREAM search-indexer")
+def handler(event, context):
+    if event.get("backfill"):
+        return {"indexed": search.backfill()}
+    return streams.batch_response(search.index_changes(streams.changes(event)))
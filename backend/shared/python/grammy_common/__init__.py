@@ -0,0 +1,7 @@
+"""Code shared by every backend handler, shipped as a Lambda layer."""
+
+import time
+
+# When an execution environment started loading handler code; the package is
+# imported before any of its modules, so telemetry measures init from here.
+LOADED_AT = time.perf_counter()
@@ -0,0 +1,333 @@
+"""API Gateway proxy event parsing and response helpers."""
+
+import base64
+import functools
+import gzip
+import hashlib
+import json
+import os
+import re
+from decimal import Decimal
+from typing import Callable, Optional
+
+from . import keys, pagination, planner, telemetry
+from .lazy import lazy_import
+
+# Loaded by the first write that carries an idempotency key
+idempotency = lazy_import("grammy_common.idempotency")
+
+# Query parameters that control paging or the representation rather than
+# select an access pattern.
+PAGE_PARAMS = ("limit", "cursor", "from", "to", "fields")
+
+# Responses at least this large are compressed when the client accepts it.
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+
+# Attribute names a ``fields`` projection may name.
+FIELD_NAME = re.compile(r"^[A-Za-z][A-Za-z0-9_]{0,63}$")
+MAX_FIELDS = 32
+
+# Largest number of items or ids accepted by a batch endpoint.
+MAX_BATCH_SIZE = 500
+
+# "<METHOD> <resource>" of the routes whose requests may carry an
+# ``Idempotency-Key``: those marked as writes in the stack's ROUTES.
+WRITE_ROUTES = frozenset(json.loads(os.environ.get("WRITE_ROUTES", "[]")))
+
+
+class ApiError(Exception):
+    """An error that is returned to the client as an HTTP response."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def response(status_code: int, body=None, headers: Optional[dict] = None) -> dict:
+    """Build a proxy integration response with a JSON body."""
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps(body, default=_default) if body is not None else "",
+    }
+
+
+def error(status_code: int, message: str) -> dict:
+    """Build an error response."""
+    return response(status_code, {"message": message})
+
+
+def header(event: dict, name: str) -> Optional[str]:
+    """Return a request header from ``event``, matched case-insensitively."""
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def etag(*items: dict, variant: str = "") -> str:
+    """Return a weak ETag derived from the versions of ``items``.
+
+    ``variant`` distinguishes representations built from the same items,
+    such as different pages or ``include`` sets.
+    """
+    digest = hashlib.sha1(variant.encode())
+    for item in items:
+        version = item.get("version", item.get("updatedAt"))
+        digest.update(f"|{item.get('type')}#{item.get('id')}#{version}".encode())
+    return f'W/"{digest.hexdigest()[:27]}"'
+
+
+def conditional(event: dict, body, tag: str) -> dict:
+    """Return 304 when ``If-None-Match`` matches ``tag``, else ``body``."""
+    if_none_match = header(event, "If-None-Match") or ""
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    if "*" in candidates or tag in candidates or tag[2:] in candidates:
+        return {"statusCode": 304, "headers": {"ETag": tag}, "body": ""}
+    return response(200, body, headers={"ETag": tag})
+
+
+def path_param(event: dict, name: str) -> Optional[str]:
+    """Return a path parameter from ``event``."""
+    return (event.get("pathParameters") or {}).get(name)
+
+
+def query_param(event: dict, name: str, default: Optional[str] = None):
+    """Return a query string parameter from ``event``."""
+    return (event.get("queryStringParameters") or {}).get(name, default)
+
+
+def json_body(event: dict) -> dict:
+    """Return the decoded JSON object body of ``event``."""
+    raw = event.get("body") or "{}"
+    try:
+        if event.get("isBase64Encoded"):
+            raw = base64.b64decode(raw)
+        body = json.loads(raw, parse_float=Decimal)
+    except ValueError:
+        raise ApiError(400, "Request body must be valid JSON")
+    if not isinstance(body, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return body
+
+
+def require_id(event: dict, body: Optional[dict] = None) -> str:
+    """Return the target id from the path, the query string or ``body``."""
+    entity_id = (
+        path_param(event, "id") or query_param(event, "id") or (body or {}).get("id")
+    )
+    if not entity_id:
+        raise ApiError(400, "Missing required parameter: id")
+    return str(entity_id)
+
+
+def patch_body(event: dict) -> tuple:
+    """Return the changes and the expected ``version`` of a PATCH request.
+
+    Attributes set to ``null`` are removed. The version guards against lost
+    updates, so it is required.
+    """
+    changes = json_body(event)
+    version = changes.pop("version", None)
+    if version is None:
+        raise ApiError(428, "Missing required field: version")
+    if isinstance(version, bool) or not isinstance(version, int) or version < 1:
+        raise ApiError(400, "version must be a positive integer")
+    changes = {
+        name: value
+        for name, value in changes.items()
+        if name not in keys.MANAGED_ATTRIBUTES and name not in keys.KEY_ATTRIBUTES
+    }
+    if not changes:
+        raise ApiError(400, "Request body must change at least one attribute")
+    if "" in changes:
+        raise ApiError(400, "Attribute names must not be empty")
+    return changes, version
+
+
+def batch_body(event: dict) -> list:
+    """Return the ``items`` array of a batch request body."""
+    items = json_body(event).get("items")
+    if not isinstance(items, list) or not items:
+        raise ApiError(400, "Request body must contain a non-empty items array")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ApiError(400, f"A batch may contain at most {MAX_BATCH_SIZE} items")
+    if not all(isinstance(item, dict) for item in items):
+        raise ApiError(400, "Every batch item must be a JSON object")
+    return items
+
+
+def id_list(event: dict) -> list:
+    """Return the comma-separated ``ids`` query parameter as a list."""
+    ids = [value for value in (query_param(event, "ids") or "").split(",") if value]
+    if not ids:
+        raise ApiError(400, "Missing required parameter: ids")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ApiError(400, f"A batch may contain at most {MAX_BATCH_SIZE} ids")
+    return ids
+
+
+def batch_write_result(created: list, failed: list) -> dict:
+    """Build the response of a batch create; 207 when some items failed."""
+    return response(
+        207 if failed else 201,
+        {
+            "succeeded": created,
+            "failed": [
+                {"index": index, "message": "Item was not written"} for index in failed
+            ],
+        },
+    )
+
+
+def batch_get_result(items: list, missing: list, failed: list) -> dict:
+    """Build the response of a batch read; 207 when some keys failed."""
+    return response(
+        207 if failed else 200,
+        {"items": items, "missing": missing, "failed": failed},
+    )
+
+
+def include_param(event: dict, allowed: tuple) -> frozenset:
+    """Return the comma-separated ``include`` query parameter as a set."""
+    include = frozenset(
+        value for value in (query_param(event, "include") or "").split(",") if value
+    )
+    unknown = include - set(allowed)
+    if unknown:
+        raise ApiError(400, f"Cannot include: {', '.join(sorted(unknown))}")
+    return include
+
+
+def fields_param(event: dict) -> Optional[tuple]:
+    """Return the attribute names of the ``fields`` projection, if any."""
+    raw = query_param(event, "fields")
+    if raw is None:
+        return None
+    fields = sorted({value.strip() for value in raw.split(",") if value.strip()})
+    if not fields:
+        raise ApiError(400, "fields must name at least one attribute")
+    if len(fields) > MAX_FIELDS:
+        raise ApiError(400, f"fields may name at most {MAX_FIELDS} attributes")
+    for name in fields:
+        if not FIELD_NAME.match(name):
+            raise ApiError(400, f"Invalid field name: {name}")
+    return tuple(fields)
+
+
+def page_params(event: dict) -> dict:
+    """Return the paging arguments and filters of a list request."""
+    raw_limit = query_param(event, "limit", str(pagination.DEFAULT_LIMIT))
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ApiError(400, "limit must be an integer")
+    if not 1 <= limit <= pagination.MAX_LIMIT:
+        raise ApiError(400, f"limit must be between 1 and {pagination.MAX_LIMIT}")
+    return {
+        "limit": limit,
+        "cursor": query_param(event, "cursor"),
+        "start": query_param(event, "from"),
+        "end": query_param(event, "to"),
+        "fields": fields_param(event),
+        "filters": {
+            name: value
+            for name, value in (event.get("queryStringParameters") or {}).items()
+            if name not in PAGE_PARAMS
+        },
+    }
+
+
+def page(event: dict, items: list, cursor: Optional[str]) -> dict:
+    """Build the conditional response for one page of a listing."""
+    variant = json.dumps(event.get("queryStringParameters") or {}, sort_keys=True)
+    return conditional(
+        event,
+        {"items": items, "nextCursor": cursor},
+        etag(*items, variant=f"{variant}|{cursor}"),
+    )
+
+
+def _accepted_encodings(event: dict) -> dict:
+    """Return the ``Accept-Encoding`` codings of ``event`` with their q-values."""
+    accepted = {}
+    for part in (header(event, "Accept-Encoding") or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    return accepted
+
+
+def compress(event: dict, result: dict) -> dict:
+    """Gzip the body of ``result`` when ``event`` accepts it.
+
+    The compressed body is returned base64-encoded, as a binary response,
+    with ``Content-Encoding`` set. Small, empty and already encoded bodies
+    are returned unchanged.
+    """
+    headers = result.get("headers") or {}
+    body = result.get("body")
+    if (
+        not body
+        or result.get("isBase64Encoded")
+        or "Content-Encoding" in headers
+        or len(body) < COMPRESSION_MIN_BYTES
+    ):
+        return result
+    accepted = _accepted_encodings(event)
+    if accepted.get("gzip", accepted.get("*", 0.0)) <= 0:
+        return result
+    data = gzip.compress(body.encode(), compresslevel=6)
+    return {
+        **result,
+        "headers": {**headers, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        "body": base64.b64encode(data).decode(),
+        "isBase64Encoded": True,
+    }
+
+
+def endpoint(func: Callable) -> Callable:
+    """Turn ``ApiError`` raised by a handler into an error response.
+
+    Requests to ``WRITE_ROUTES`` with an ``Idempotency-Key`` header run at
+    most once per key, see ``idempotency``. Responses are compressed as the
+    client accepts (see ``compress``) and the handler is instrumented, see
+    ``telemetry.instrument``.
+    """
+
+    def run(event, context) -> dict:
+        try:
+            return func(event, context)
+        except ApiError as exc:
+            return error(exc.status_code, exc.message)
+        except (pagination.InvalidCursor, planner.UnsupportedAccessPattern) as exc:
+            return error(400, str(exc))
+
+    @functools.wraps(func)
+    def wrapper(event, context):
+        route = f"{event.get('httpMethod')} {event.get('resource')}"
+        if route in WRITE_ROUTES and header(event, "Idempotency-Key"):
+            result = idempotency.handle(event, context, lambda: run(event, context))
+        else:
+            result = run(event, context)
+        return compress(event, result)
+
+    return telemetry.instrument(wrapper)
@@ -0,0 +1,264 @@
+"""Song assets (audio, tabs, stems) in the assets bucket.
+
+Asset bytes never pass through API Gateway or Lambda. ``start_upload``
+creates an S3 multipart upload and presigns a PUT URL for each of its parts;
+the client sends the parts straight to S3, in parallel, and hands their
+ETags to ``complete_upload``. The bucket reports the new object through
+EventBridge, and ``record`` adds it to the ``assets`` map of the song item,
+keyed by asset id. Objects are stored under the path the CloudFront
+distribution serves them on:
+
+    <ASSETS_PATH>/<songId>/<assetId>
+
+and ``download_url`` returns a distribution URL for one, signed with the
+CloudFront key pair. Without a key pair it refuses, unless unsigned
+downloads were turned on explicitly. Every upload gets a fresh asset
+id, so an object never changes once written and can be cached for as long
+as the distribution likes.
+
+Objects are served from the application's own domain, so only the media
+types in ``MEDIA_TYPES`` are accepted, and every object is stored as an
+attachment.
+"""
+
+import functools
+import math
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from botocore.signers import CloudFrontSigner
+
+from . import api, db, keys
+
+BUCKET_NAME = os.environ.get("ASSETS_BUCKET", "")
+ASSETS_PATH = os.environ.get("ASSETS_PATH", "song-assets")
+# Domain of the distribution that serves downloads
+ASSETS_DOMAIN = os.environ.get("ASSETS_DOMAIN", "")
+PART_BYTES = int(os.environ.get("ASSET_PART_SIZE_MB", "16")) * 1024 * 1024
+MAX_BYTES = int(os.environ.get("ASSET_MAX_SIZE_MB", "2048")) * 1024 * 1024
+URL_EXPIRY_SECONDS = int(os.environ.get("ASSET_URL_EXPIRY_SECONDS", "3600"))
+# CloudFront public key id and the secret holding its private key (PEM);
+# without them download URLs are only handed out, unsigned, when that is
+# turned on
+SIGNING_KEY_PAIR_ID = os.environ.get("ASSET_SIGNING_KEY_PAIR_ID", "")
+SIGNING_KEY_SECRET = os.environ.get("ASSET_SIGNING_KEY_SECRET", "")
+UNSIGNED_DOWNLOADS = os.environ.get("ASSET_UNSIGNED_DOWNLOADS") == "1"
+
+# S3 limits: parts are at least 5 MiB, except the last, and at most 10,000
+MIN_PART_BYTES = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+FILENAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+MEDIA_TYPE_PREFIXES = ("audio/", "video/")
+MEDIA_TYPES = frozenset(
+    (
+        "text/plain",
+        "application/pdf",
+        "application/zip",
+        "application/octet-stream",
+        "application/x-guitar-pro",
+        "image/png",
+        "image/jpeg",
+    )
+)
+
+# Presigned URLs name the bucket in the host, so browsers can send parts to
+# the bucket's regional endpoint
+s3 = boto3.client(
+    "s3",
+    config=Config(signature_version="s3v4", s3={"addressing_style": "virtual"}),
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def object_key(song_id: str, asset_id: str) -> str:
+    """Return the key, and download path, of an asset."""
+    return f"{ASSETS_PATH}/{song_id}/{asset_id}"
+
+
+def parse_key(key: str) -> Optional[tuple]:
+    """Return the ``(song_id, asset_id)`` of an asset key, or ``None``."""
+    prefix, _, rest = key.partition("/")
+    song_id, _, asset_id = rest.partition("/")
+    if prefix != ASSETS_PATH or not song_id or not asset_id or "/" in asset_id:
+        return None
+    return song_id, asset_id
+
+
+def _media_type(content_type) -> str:
+    if not isinstance(content_type, str):
+        raise api.ApiError(400, "contentType must be a string")
+    media_type = content_type.strip().lower()
+    if media_type not in MEDIA_TYPES and not media_type.startswith(MEDIA_TYPE_PREFIXES):
+        raise api.ApiError(415, f"Unsupported asset type: {content_type}")
+    return media_type
+
+
+def start_upload(song_id: str, filename, content_type, size) -> dict:
+    """Create the multipart upload of a new asset and presign its parts."""
+    if not isinstance(filename, str) or not FILENAME.match(filename):
+        raise api.ApiError(
+            400, "filename must be 1-128 letters, digits, '.', '_' or '-'"
+        )
+    media_type = _media_type(content_type)
+    if isinstance(size, bool) or not isinstance(size, int) or size < 1:
+        raise api.ApiError(400, "size must be a positive integer")
+    if size > MAX_BYTES:
+        raise api.ApiError(413, f"An asset may be at most {MAX_BYTES} bytes")
+    part_bytes = max(PART_BYTES, MIN_PART_BYTES, math.ceil(size / MAX_PARTS))
+    part_count = math.ceil(size / part_bytes)
+
+    asset_id = keys.new_id()
+    key = object_key(song_id, asset_id)
+    upload_id = s3.create_multipart_upload(
+        Bucket=BUCKET_NAME,
+        Key=key,
+        ContentType=media_type,
+        ContentDisposition=f'attachment; filename="{filename}"',
+        Metadata={"filename": filename},
+    )["UploadId"]
+    # Presigning is local: no request per part
+    parts = [
+        {
+            "partNumber": number,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": BUCKET_NAME,
+                    "Key": key,
+                    "UploadId": upload_id,
+                    "PartNumber": number,
+                },
+                ExpiresIn=URL_EXPIRY_SECONDS,
+            ),
+        }
+        for number in range(1, part_count + 1)
+    ]
+    return {
+        "assetId": asset_id,
+        "uploadId": upload_id,
+        "partSize": part_bytes,
+        "parts": parts,
+        "expiresAt": int(time.time()) + URL_EXPIRY_SECONDS,
+    }
+
+
+def _completed_parts(parts) -> List[dict]:
+    if not isinstance(parts, list) or not parts:
+        raise api.ApiError(400, "parts must be a non-empty array")
+    completed = []
+    for part in parts:
+        number = part.get("partNumber") if isinstance(part, dict) else None
+        etag = part.get("etag") if isinstance(part, dict) else None
+        if (
+            isinstance(number, bool)
+            or not isinstance(number, int)
+            or not 1 <= number <= MAX_PARTS
+            or not isinstance(etag, str)
+            or not etag
+        ):
+            raise api.ApiError(
+                400, "Every part must have a partNumber and the etag S3 returned"
+            )
+        completed.append({"PartNumber": number, "ETag": etag})
+    return sorted(completed, key=lambda part: part["PartNumber"])
+
+
+def complete_upload(song_id: str, asset_id: str, upload_id, parts) -> None:
+    """Assemble the uploaded parts of an asset into its object."""
+    if not isinstance(upload_id, str) or not upload_id:
+        raise api.ApiError(400, "Missing required field: uploadId")
+    try:
+        s3.complete_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=object_key(song_id, asset_id),
+            UploadId=upload_id,
+            MultipartUpload={"Parts": _completed_parts(parts)},
+        )
+    except ClientError as exc:
+        code = exc.response.get("Error", {}).get("Code")
+        if code == "NoSuchUpload":
+            raise api.ApiError(404, "Upload not found")
+        if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall"):
+            raise api.ApiError(400, exc.response["Error"].get("Message", code))
+        raise
+
+
+def record(key: str, size: int) -> Optional[dict]:
+    """Add the uploaded object ``key`` to its song; return the asset.
+
+    Objects outside the asset layout, or already deleted, are ignored.
+    Objects over the size limit, and objects of songs that no longer exist,
+    are deleted.
+    """
+    parsed = parse_key(key)
+    if parsed is None:
+        return None
+    song_id, asset_id = parsed
+    if size > MAX_BYTES:
+        s3.delete_object(Bucket=BUCKET_NAME, Key=key)
+        return None
+    try:
+        head = s3.head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as exc:
+        # Deleted since: a redelivered event of an object removed below
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            return None
+        raise
+    asset = {
+        "id": asset_id,
+        "filename": head.get("Metadata", {}).get("filename", asset_id),
+        "contentType": head.get("ContentType"),
+        "size": size,
+        "etag": head.get("ETag", "").strip('"'),
+        "uploadedAt": _now(),
+    }
+    if not db.add_asset(keys.SONG, song_id, asset):
+        s3.delete_object(Bucket=BUCKET_NAME, Key=key)
+        return None
+    return asset
+
+
+@functools.lru_cache(maxsize=1)
+def _signer() -> CloudFrontSigner:
+    """Return the CloudFront signer, loading the private key on first use."""
+    # Only the download handler bundles cryptography
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    secret = boto3.client("secretsmanager").get_secret_value(
+        SecretId=SIGNING_KEY_SECRET
+    )
+    private_key = serialization.load_pem_private_key(
+        secret["SecretString"].encode(), password=None
+    )
+    return CloudFrontSigner(
+        SIGNING_KEY_PAIR_ID,
+        lambda message: private_key.sign(message, padding.PKCS1v15(), hashes.SHA1()),
+    )
+
+
+def download_url(song_id: str, asset_id: str) -> dict:
+    """Return the distribution URL of an asset and when it expires.
+
+    Unsigned URLs do not expire; ``expiresAt`` is then ``None``.
+    """
+    url = f"https://{ASSETS_DOMAIN}/{object_key(song_id, asset_id)}"
+    if not SIGNING_KEY_PAIR_ID:
+        if not UNSIGNED_DOWNLOADS:
+            raise api.ApiError(503, "Asset downloads are not configured")
+        return {"url": url, "expiresAt": None}
+    expires_at = int(time.time()) + URL_EXPIRY_SECONDS
+    url = _signer().generate_presigned_url(
+        url, date_less_than=datetime.fromtimestamp(expires_at, timezone.utc)
+    )
+    return {"url": url, "expiresAt": expires_at}
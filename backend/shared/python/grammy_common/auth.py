@@ -0,0 +1,167 @@
+"""Caller identity from Cognito JWTs, verified in-process.
+
+Behind the API Gateway Cognito authorizer, the verified claims are already
+in the event, and ``claims`` returns them as they are. Otherwise (router
+functions invoked directly, local runs) the ``Authorization`` token is
+verified here: an RS256 signature check against the user pool's JWKS, plus
+the expiry, not-before and issue times, issuer, token use and client id.
+Idempotency records are scoped to the ``subject`` of the caller.
+
+The JWKS lives at module scope, so it is fetched once per execution
+environment, on first use rather than at import. A token signed with a key
+that is not in it (Cognito rotated its keys) fetches it again, at most once
+per ``JWKS_REFRESH_SECONDS``, so a flood of forged key ids cannot turn into
+a flood of requests to Cognito. A JWKS that cannot be fetched or read fails
+the token with a 401, and the next token tries again.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import urllib.request
+from typing import Dict, Optional, Tuple
+
+from . import api
+
+USER_POOL_ID = os.environ.get("USER_POOL_ID", "")
+USER_POOL_CLIENT_ID = os.environ.get("USER_POOL_CLIENT_ID", "")
+REGION = USER_POOL_ID.partition("_")[0] or os.environ.get("AWS_REGION", "")
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+JWKS_URL = os.environ.get("JWKS_URL") or f"{ISSUER}/.well-known/jwks.json"
+JWKS_REFRESH_SECONDS = float(os.environ.get("JWKS_REFRESH_SECONDS", "60"))
+JWKS_TIMEOUT_SECONDS = 2
+# Allowed clock skew when checking ``exp``, ``nbf`` and ``iat``
+LEEWAY_SECONDS = 30
+
+# DER prefix of a SHA-256 DigestInfo, as in PKCS #1 v1.5 signatures
+_SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+_keys: Dict[str, Tuple[int, int]] = {}
+_fetched_at: Optional[float] = None
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _b64int(value: str) -> int:
+    return int.from_bytes(_b64decode(value), "big")
+
+
+def _fetch_keys() -> None:
+    global _fetched_at
+    try:
+        with urllib.request.urlopen(JWKS_URL, timeout=JWKS_TIMEOUT_SECONDS) as response:
+            jwks = json.load(response)
+        keys = {
+            key["kid"]: (_b64int(key["n"]), _b64int(key["e"]))
+            for key in jwks.get("keys", [])
+            if key.get("kty") == "RSA"
+        }
+    # URLError and timeouts are OSErrors; a malformed JWKS fails one of the others
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+        raise api.ApiError(401, "Token signing keys are unavailable") from error
+    _keys.clear()
+    _keys.update(keys)
+    _fetched_at = time.monotonic()
+
+
+def _key(kid: str) -> Optional[Tuple[int, int]]:
+    """Return the public key ``kid``, refetching the JWKS if it is unknown."""
+    if kid not in _keys and (
+        _fetched_at is None or time.monotonic() - _fetched_at >= JWKS_REFRESH_SECONDS
+    ):
+        _fetch_keys()
+    return _keys.get(kid)
+
+
+def _rsa_sha256_valid(key: Tuple[int, int], message: bytes, signature: bytes) -> bool:
+    """Check an RSASSA-PKCS1-v1_5 SHA-256 signature."""
+    modulus, exponent = key
+    size = (modulus.bit_length() + 7) // 8
+    if len(signature) != size:
+        return False
+    value = int.from_bytes(signature, "big")
+    if value >= modulus:
+        return False
+    digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    expected = (
+        b"\x00\x01" + b"\xff" * (size - len(digest_info) - 3) + b"\x00" + digest_info
+    )
+    return hmac.compare_digest(
+        pow(value, exponent, modulus).to_bytes(size, "big"), expected
+    )
+
+
+def _time_claim(token_claims: dict, name: str, required: bool = False):
+    """Return the NumericDate claim ``name``, None when absent and optional."""
+    value = token_claims.get(name)
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise api.ApiError(401, f"Token {name} must be a number")
+    return value
+
+
+def verify(token: str) -> dict:
+    """Return the claims of a valid user pool token; raise 401 otherwise."""
+    try:
+        header, payload, signature = token.split(".")
+        headers = json.loads(_b64decode(header))
+        token_claims = json.loads(_b64decode(payload))
+        signature = _b64decode(signature)
+        if not isinstance(headers, dict) or not isinstance(token_claims, dict):
+            raise ValueError("JWT header and payload must be objects")
+    except ValueError:
+        raise api.ApiError(401, "Malformed token")
+    if headers.get("alg") != "RS256":
+        raise api.ApiError(401, "Unsupported token algorithm")
+    kid = headers.get("kid")
+    key = _key(kid) if isinstance(kid, str) else None
+    if key is None or not _rsa_sha256_valid(
+        key, f"{header}.{payload}".encode(), signature
+    ):
+        raise api.ApiError(401, "Invalid token signature")
+    now = time.time()
+    if _time_claim(token_claims, "exp", required=True) + LEEWAY_SECONDS < now:
+        raise api.ApiError(401, "Token expired")
+    not_before = _time_claim(token_claims, "nbf")
+    if not_before is not None and not_before - LEEWAY_SECONDS > now:
+        raise api.ApiError(401, "Token not valid yet")
+    issued_at = _time_claim(token_claims, "iat")
+    if issued_at is not None and issued_at - LEEWAY_SECONDS > now:
+        raise api.ApiError(401, "Token issued in the future")
+    if token_claims.get("iss") != ISSUER:
+        raise api.ApiError(401, "Token issued by another user pool")
+    token_use = token_claims.get("token_use")
+    client_id = (
+        token_claims.get("aud") if token_use == "id" else token_claims.get("client_id")
+    )
+    if token_use not in ("id", "access") or client_id != USER_POOL_CLIENT_ID:
+        raise api.ApiError(401, "Token issued for another client")
+    return token_claims
+
+
+def claims(event: dict) -> dict:
+    """Return the verified claims of the caller of ``event``."""
+    authorized = ((event.get("requestContext") or {}).get("authorizer") or {}).get(
+        "claims"
+    )
+    if authorized:
+        return authorized
+    token = api.header(event, "Authorization")
+    if not token:
+        raise api.ApiError(401, "Missing Authorization header")
+    scheme, _, credentials = token.partition(" ")
+    return verify(credentials if scheme.lower() == "bearer" else token)
+
+
+def subject(event: dict) -> str:
+    """Return the user id (``sub``) of the caller, e.g. for owner checks."""
+    sub = claims(event).get("sub")
+    if not isinstance(sub, str) or not sub:
+        raise api.ApiError(401, "Token has no subject")
+    return sub
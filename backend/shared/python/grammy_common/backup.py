@@ -0,0 +1,409 @@
+"""Exports of ``DataStack.table`` to the backup bucket, and restores.
+
+A full export is a parallel Scan of ``EXPORT_SEGMENTS`` segments. The export
+function invokes itself once per segment, so each segment has a whole
+invocation, and its time limit, to itself. A segment is streamed, page by
+page, through gzip into its own S3 multipart upload, so memory use does not
+grow with the table. Each segment then records its item count, and the last
+one to finish writes the manifest:
+
+    full/<started>/segment-<n>.jsonl.gz    {"Item": <item>} per line
+    full/<started>/segment-<n>.json        items
+    full/<started>/manifest.json           startedAt, finishedAt, segments, items
+
+An export whose segment failed, after Lambda's own retries, has no manifest
+and is never restored.
+
+Between full exports, the backup stream consumer writes every batch of
+table stream records as one delta object, named by the time of its first
+record so that a restore can list the deltas after an export:
+
+    incremental/<time>-<sequence>.jsonl.gz  {"seq", "time", "Keys", "NewImage"}
+
+Items and keys are kept in DynamoDB JSON, as the low-level client and the
+stream return them, so an export round-trips sets, binary and numbers
+exactly. Binary values are base64 text, as in the stream, and are decoded
+again for the client on restore. A delta without ``NewImage`` is a deletion.
+
+``restore`` writes a full export back with one worker per segment, then
+replays the deltas recorded since the export started, up to an optional
+point in time no earlier than that. A Scan is not a snapshot, so the replay
+also covers changes made while the export ran.
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import time
+from fnmatch import fnmatchcase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+
+import boto3
+
+from . import batch, db, telemetry
+
+BUCKET_NAME = os.environ.get("BACKUP_BUCKET", "")
+EXPORT_SEGMENTS = int(os.environ.get("EXPORT_SEGMENTS", "16"))
+FULL_EXPORT_INTERVAL = timedelta(
+    days=float(os.environ.get("FULL_EXPORT_INTERVAL_DAYS", "7"))
+)
+FULL_PREFIX = "full/"
+INCREMENTAL_PREFIX = "incremental/"
+# S3 parts must be at least 5 MiB, except the last one.
+PART_BYTES = 8 * 1024 * 1024
+RESTORE_PAGE_SIZE = batch.WRITE_CHUNK_SIZE * batch.MAX_WORKERS
+RESTORE_WORKERS = 4
+# Other tables a restore may write to, as a shell-style pattern
+RESTORE_TABLES = os.environ.get("RESTORE_TABLES", "")
+# Stream records are kept for 24 hours, so a delta object can hold records
+# up to a day older than the export it is replayed after.
+STREAM_RETENTION = timedelta(hours=24)
+
+s3 = boto3.client("s3")
+functions = boto3.client("lambda")
+# Without the resource's type conversion: items stay in DynamoDB JSON.
+dynamodb = boto3.client(
+    "dynamodb", config=db.client.meta.config, endpoint_url=db.ENDPOINT_URL
+)
+telemetry.instrument_client(dynamodb)
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+
+def _base64(value: bytes) -> str:
+    """Encode the binary values the client returns, for ``json.dumps``."""
+    if not isinstance(value, bytes):
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+    return base64.b64encode(value).decode()
+
+
+def _with_bytes(value: dict) -> dict:
+    """Decode the base64 binary values of a DynamoDB JSON value."""
+    ((kind, inner),) = value.items()
+    if kind == "B":
+        return {"B": base64.b64decode(inner)}
+    if kind == "BS":
+        return {"BS": [base64.b64decode(element) for element in inner]}
+    if kind == "M":
+        return {"M": _item_with_bytes(inner)}
+    if kind == "L":
+        return {"L": [_with_bytes(element) for element in inner]}
+    return value
+
+
+def _item_with_bytes(item: dict) -> dict:
+    return {name: _with_bytes(value) for name, value in item.items()}
+
+
+class _MultipartUpload(io.RawIOBase):
+    """Writable file that uploads to one S3 object in ``PART_BYTES`` parts."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self._upload_id = s3.create_multipart_upload(
+            Bucket=BUCKET_NAME, Key=key, ContentType="application/x-ndjson"
+        )["UploadId"]
+        self._buffer = bytearray()
+        self._parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        if len(self._buffer) >= PART_BYTES:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self) -> None:
+        number = len(self._parts) + 1
+        response = s3.upload_part(
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=bytes(self._buffer),
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+        self._buffer.clear()
+
+    def complete(self) -> None:
+        if self._buffer or not self._parts:
+            self._upload_part()
+        s3.complete_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        s3.abort_multipart_upload(
+            Bucket=BUCKET_NAME, Key=self.key, UploadId=self._upload_id
+        )
+
+
+def _export_segment(prefix: str, segment: int, total: int) -> int:
+    """Stream one Scan segment to S3; return the number of items."""
+    upload = _MultipartUpload(f"{prefix}segment-{segment:04d}.jsonl.gz")
+    count = 0
+    try:
+        with gzip.GzipFile(fileobj=upload, mode="wb") as output:
+            params = {
+                "TableName": db.TABLE_NAME,
+                "Segment": segment,
+                "TotalSegments": total,
+            }
+            while True:
+                response = dynamodb.scan(**params)
+                for item in response.get("Items", []):
+                    line = json.dumps({"Item": item}, default=_base64)
+                    output.write(line.encode() + b"\n")
+                count += response.get("Count", 0)
+                if "LastEvaluatedKey" not in response:
+                    break
+                params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        upload.complete()
+    except BaseException:
+        upload.abort()
+        raise
+    return count
+
+
+def _read_json(key: str):
+    return json.loads(s3.get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read())
+
+
+def export_full(segments: int = EXPORT_SEGMENTS) -> dict:
+    """Start a full export, invoking this function once per segment.
+
+    Returns the export's prefix and start time.
+    """
+    started = _timestamp(datetime.now(timezone.utc))
+    prefix = f"{FULL_PREFIX}{started}/"
+    for segment in range(segments):
+        functions.invoke(
+            FunctionName=os.environ["AWS_LAMBDA_FUNCTION_NAME"],
+            InvocationType="Event",
+            Payload=json.dumps(
+                {"prefix": prefix, "segment": segment, "segments": segments}
+            ).encode(),
+        )
+    return {"prefix": prefix, "startedAt": started, "segments": segments}
+
+
+def export_segment(prefix: str, segment: int, segments: int) -> dict:
+    """Export one segment; return the manifest if it was the last one."""
+    count = _export_segment(prefix, segment, segments)
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=f"{prefix}segment-{segment:04d}.json",
+        Body=json.dumps({"items": count}).encode(),
+        ContentType="application/json",
+    )
+    paginator = s3.get_paginator("list_objects_v2")
+    counts = [
+        entry["Key"]
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=f"{prefix}segment-")
+        for entry in page.get("Contents", [])
+        if entry["Key"].endswith(".json")
+    ]
+    if len(counts) < segments:
+        return {"prefix": prefix, "segment": segment, "items": count}
+    # Segments finishing together may both get here; they write the same
+    # counts.
+    manifest = {
+        "prefix": prefix,
+        "startedAt": prefix[len(FULL_PREFIX) : -1],
+        "finishedAt": _timestamp(datetime.now(timezone.utc)),
+        "segments": segments,
+        "items": sum(_read_json(key)["items"] for key in counts),
+    }
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=f"{prefix}manifest.json",
+        Body=json.dumps(manifest).encode(),
+        ContentType="application/json",
+    )
+    return manifest
+
+
+def latest_export() -> Optional[dict]:
+    """Return the manifest of the most recent complete full export."""
+    paginator = s3.get_paginator("list_objects_v2")
+    prefixes = [
+        entry["Prefix"]
+        for page in paginator.paginate(
+            Bucket=BUCKET_NAME, Prefix=FULL_PREFIX, Delimiter="/"
+        )
+        for entry in page.get("CommonPrefixes", [])
+    ]
+    for prefix in sorted(prefixes, reverse=True):
+        try:
+            response = s3.get_object(Bucket=BUCKET_NAME, Key=f"{prefix}manifest.json")
+        except s3.exceptions.NoSuchKey:
+            continue  # still running, or failed
+        return json.loads(response["Body"].read())
+    return None
+
+
+def scheduled_export() -> dict:
+    """Run a full export unless a recent one exists.
+
+    The stream consumer records every change between full exports, so a
+    full export is only needed once per ``FULL_EXPORT_INTERVAL``.
+    """
+    latest = latest_export()
+    if latest is not None:
+        age = datetime.now(timezone.utc) - _parse_timestamp(latest["startedAt"])
+        if age < FULL_EXPORT_INTERVAL:
+            return {"skipped": True, "latest": latest}
+    return export_full()
+
+
+def write_changes(records: List[dict]) -> None:
+    """Write a batch of raw table stream records as one delta object."""
+    if not records:
+        return
+    first = records[0]["dynamodb"]
+    recorded = datetime.fromtimestamp(
+        float(first.get("ApproximateCreationDateTime", time.time())), tz=timezone.utc
+    )
+    lines = []
+    for record in records:
+        change = record["dynamodb"]
+        delta = {
+            "seq": change["SequenceNumber"],
+            "time": float(change.get("ApproximateCreationDateTime", 0)),
+            "Keys": change["Keys"],
+        }
+        if "NewImage" in change:
+            delta["NewImage"] = change["NewImage"]
+        lines.append(json.dumps(delta))
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=(
+            f"{INCREMENTAL_PREFIX}{_timestamp(recorded)}"
+            f"-{first['SequenceNumber']}.jsonl.gz"
+        ),
+        Body=gzip.compress(("\n".join(lines) + "\n").encode()),
+        ContentType="application/x-ndjson",
+    )
+
+
+def _lines(key: str) -> Iterator[dict]:
+    """Yield the JSON lines of a gzipped object without loading it whole."""
+    body = s3.get_object(Bucket=BUCKET_NAME, Key=key)["Body"]
+    with gzip.GzipFile(fileobj=body, mode="rb") as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _pages(values: Iterable, size: int) -> Iterator[list]:
+    page = []
+    for value in values:
+        page.append(value)
+        if len(page) == size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _restore_segment(key: str, table_name: str) -> int:
+    restored = 0
+    items = (_item_with_bytes(line["Item"]) for line in _lines(key))
+    for page in _pages(items, RESTORE_PAGE_SIZE):
+        failed = batch.write_items(dynamodb, table_name, page)
+        if failed:
+            raise RuntimeError(f"{len(failed)} items of {key} were not restored")
+        restored += len(page)
+    return restored
+
+
+def _deltas(since: datetime, until: Optional[datetime]) -> dict:
+    """Return the last recorded state of every key changed since ``since``."""
+    start_after = f"{INCREMENTAL_PREFIX}{_timestamp(since - STREAM_RETENTION)}"
+    latest = {}
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=BUCKET_NAME, Prefix=INCREMENTAL_PREFIX, StartAfter=start_after
+    ):
+        for entry in page.get("Contents", []):
+            for delta in _lines(entry["Key"]):
+                if until is not None and delta["time"] > until.timestamp():
+                    continue
+                key = json.dumps(delta["Keys"], sort_keys=True)
+                # Changes to one item share a shard lineage, whose sequence
+                # numbers increase.
+                if key not in latest or int(delta["seq"]) > int(latest[key]["seq"]):
+                    latest[key] = delta
+    return latest
+
+
+def restore(
+    prefix: Optional[str] = None,
+    table_name: Optional[str] = None,
+    until: Optional[str] = None,
+) -> dict:
+    """Restore a full export and replay the deltas recorded after it.
+
+    ``prefix`` names the export (default: the latest), ``table_name`` the
+    table to write to (default: this stack's, otherwise one matching
+    ``RESTORE_TABLES``), and ``until`` an ISO 8601 UTC time after which
+    changes are not replayed. The export holds changes up to the time it
+    finished, so ``until`` may not be earlier than its start.
+    """
+    table_name = table_name or db.TABLE_NAME
+    if table_name != db.TABLE_NAME and not fnmatchcase(table_name, RESTORE_TABLES):
+        raise ValueError(f"Restores may only write to tables named {RESTORE_TABLES}")
+    if prefix is None:
+        manifest = latest_export()
+        if manifest is None:
+            raise RuntimeError("No complete full export to restore")
+    else:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=f"{prefix}manifest.json")
+        manifest = json.loads(response["Body"].read())
+    started = _parse_timestamp(manifest["startedAt"])
+    until_time = (
+        datetime.fromisoformat(until).astimezone(timezone.utc) if until else None
+    )
+    if until_time is not None and until_time < started:
+        raise ValueError(
+            f"{manifest['prefix']} started at {manifest['startedAt']}, after {until}"
+        )
+    keys = [
+        f"{manifest['prefix']}segment-{segment:04d}.jsonl.gz"
+        for segment in range(manifest["segments"])
+    ]
+    with ThreadPoolExecutor(max_workers=RESTORE_WORKERS) as pool:
+        restored = sum(pool.map(lambda key: _restore_segment(key, table_name), keys))
+
+    deltas = _deltas(started, until_time).values()
+    puts = [
+        _item_with_bytes(delta["NewImage"]) for delta in deltas if "NewImage" in delta
+    ]
+    deletes = [
+        _item_with_bytes(delta["Keys"]) for delta in deltas if "NewImage" not in delta
+    ]
+    failed = batch.write_items(dynamodb, table_name, puts)
+    failed += batch.delete_items(dynamodb, table_name, deletes)
+    if failed:
+        raise RuntimeError(f"{len(failed)} changes were not replayed")
+    return {
+        "export": manifest["prefix"],
+        "restored": restored,
+        "replayed": len(puts),
+        "deleted": len(deletes),
+    }
@@ -0,0 +1,141 @@
+"""Concurrent BatchWriteItem/BatchGetItem with unprocessed-item retry.
+
+Requests are split into chunks of the DynamoDB per-call limits and the
+chunks run concurrently on the shared client. Items DynamoDB returns as
+unprocessed are retried with full-jitter exponential backoff; whatever is
+still unprocessed after the last attempt is reported as failed. So is what
+remains of a chunk whose request raises, once botocore's own retries are
+spent, while the other chunks complete. ``client`` is the
+low-level client of the ``db`` resource, which is thread-safe and converts
+between Python values and DynamoDB attribute values itself.
+``map_concurrently`` runs other independent requests, such as the shards of
+a listing, the same way.
+"""
+
+import contextvars
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+WRITE_CHUNK_SIZE = 25
+GET_CHUNK_SIZE = 100
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 6
+BASE_DELAY_SECONDS = 0.05
+MAX_DELAY_SECONDS = 2.0
+
+try:
+    from snapshot_restore_py import register_after_restore
+except ImportError:  # not running under SnapStart
+    pass
+else:
+    # Environments restored from one snapshot would otherwise share the same
+    # random state and retry in lockstep.
+    register_after_restore(random.seed)
+
+
+def _chunks(values: list, size: int) -> Iterator[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(
+        random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2**attempt))
+    )
+
+
+def _write_chunk(client, table_name: str, requests: List[dict]) -> List[dict]:
+    """Send one chunk of write requests; return those never processed."""
+    pending = requests
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = client.batch_write_item(RequestItems={table_name: pending})
+        except (BotoCoreError, ClientError):
+            return pending
+        pending = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not pending:
+            return []
+        if attempt + 1 < MAX_ATTEMPTS:
+            _backoff(attempt)
+    return pending
+
+
+def _get_chunk(
+    client, table_name: str, item_keys: List[dict], projection: dict
+) -> Tuple[list, list]:
+    """Read one chunk; return the found items and the never-processed keys."""
+    found = []
+    request = {"Keys": item_keys, **projection}
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = client.batch_get_item(RequestItems={table_name: request})
+        except (BotoCoreError, ClientError):
+            return found, request["Keys"]
+        found.extend(response["Responses"].get(table_name, []))
+        request = response.get("UnprocessedKeys", {}).get(table_name)
+        if not request:
+            return found, []
+        if attempt + 1 < MAX_ATTEMPTS:
+            _backoff(attempt)
+    return found, request["Keys"]
+
+
+def map_concurrently(func: Callable, values: list) -> list:
+    """Return ``func`` applied to each of ``values``, run concurrently.
+
+    Each call runs in a copy of the caller's context, so context variables
+    such as per-request instrumentation follow the work onto pool threads.
+    """
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(values))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, func, value) for value in values
+        ]
+        return [future.result() for future in futures]
+
+
+def _write_requests(client, table_name: str, requests: List[dict]) -> List[dict]:
+    chunks = list(_chunks(requests, WRITE_CHUNK_SIZE))
+    if not chunks:
+        return []
+    results = map_concurrently(
+        lambda chunk: _write_chunk(client, table_name, chunk), chunks
+    )
+    return [request for failed in results for request in failed]
+
+
+def write_items(client, table_name: str, items: List[dict]) -> List[dict]:
+    """Put ``items``; return the ones that could not be written."""
+    requests = [{"PutRequest": {"Item": item}} for item in items]
+    failed = _write_requests(client, table_name, requests)
+    return [request["PutRequest"]["Item"] for request in failed]
+
+
+def delete_items(client, table_name: str, item_keys: List[dict]) -> List[dict]:
+    """Delete the items with ``item_keys``; return the keys that failed."""
+    requests = [{"DeleteRequest": {"Key": key}} for key in item_keys]
+    failed = _write_requests(client, table_name, requests)
+    return [request["DeleteRequest"]["Key"] for request in failed]
+
+
+def get_items(
+    client, table_name: str, item_keys: List[dict], projection: Optional[dict] = None
+) -> Tuple[list, list]:
+    """Read ``item_keys``; return the found items and the keys that failed.
+
+    ``projection`` holds ``ProjectionExpression`` and
+    ``ExpressionAttributeNames`` to read only some attributes.
+    """
+    chunks = list(_chunks(item_keys, GET_CHUNK_SIZE))
+    if not chunks:
+        return [], []
+    found, failed = [], []
+    for items, keys in map_concurrently(
+        lambda chunk: _get_chunk(client, table_name, chunk, projection or {}), chunks
+    ):
+        found.extend(items)
+        failed.extend(keys)
+    return found, failed
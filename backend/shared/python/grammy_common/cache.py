@@ -0,0 +1,136 @@
+"""In-process cache for reference data (tunings and instruments).
+
+The cache lives at module scope, so it survives across warm invocations of
+an execution environment. Entries are evicted by size (LRU) and age (TTL),
+and each entry remembers the version of its entity type it was loaded at.
+Writes bump that version (see ``db``), so a single small ``GetItem`` on the
+version item tells whether cached entries are still current. The version
+itself is re-read at most once per ``VERSION_CHECK_SECONDS``.
+
+An entry is stored under the version read before it was loaded, and both
+reads are strongly consistent: a value loaded after a write is never cached
+under a version older than that write, and one cached under the version of a
+write includes it. Listings come from a secondary index, which cannot be
+read consistently and lags behind the table, so a listing loaded within
+``INDEX_LAG_SECONDS`` of the last write is served but not cached.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+
+from . import db, keys
+
+MAX_ENTRIES = int(os.environ.get("REFERENCE_CACHE_SIZE", "512"))
+TTL_SECONDS = float(os.environ.get("REFERENCE_CACHE_TTL", "300"))
+VERSION_CHECK_SECONDS = float(os.environ.get("REFERENCE_VERSION_CHECK", "1"))
+INDEX_LAG_SECONDS = float(os.environ.get("REFERENCE_INDEX_LAG", "2"))
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class _Entry(NamedTuple):
+    version: int
+    expires_at: float
+    value: object
+
+
+class LRUCache:
+    """A size-bounded LRU mapping whose entries also expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: int):
+        """Return the entry cached for ``key`` at ``version``, else ``None``."""
+        entry = self._entries.get(key)
+        if (
+            entry is None
+            or entry.version != version
+            or entry.expires_at <= time.monotonic()
+        ):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, version: int, value) -> None:
+        """Cache ``value`` for ``key`` at ``version``."""
+        self._entries[key] = _Entry(version, time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+_cache = LRUCache(MAX_ENTRIES, TTL_SECONDS)
+_versions = {}
+
+
+def _version(entity: keys.Entity) -> tuple:
+    """Return the version of ``entity`` and when it last changed."""
+    checked_at, version = _versions.get(entity.name, (None, None))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at >= VERSION_CHECK_SECONDS:
+        version = db.read_version(entity, consistent=True)
+        _versions[entity.name] = (now, version)
+    return version
+
+
+def reference(
+    entity: keys.Entity, key: Hashable, loader: Callable, indexed: bool = False
+):
+    """Return the cached result of ``loader`` for ``key``, loading it on a miss.
+
+    ``indexed`` marks a loader that reads a secondary index.
+    """
+    version, changed_at = _version(entity)
+    cache_key = (entity.name, key)
+    entry = _cache.get(cache_key, version)
+    hit = entry is not None
+    if hit:
+        value = entry.value
+    else:
+        value = loader()
+        if not indexed or time.time() - changed_at >= INDEX_LAG_SECONDS:
+            _cache.put(cache_key, version, value)
+    logger.info(
+        json.dumps(
+            {"cache": "reference", "entity": entity.name, "hit": hit, **_cache.stats()}
+        )
+    )
+    return value
+
+
+def get(entity: keys.Entity, entity_id: str, fields: Optional[tuple] = None):
+    """Cached ``db.get``."""
+    return reference(
+        entity,
+        ("get", entity_id, fields),
+        lambda: db.get(entity, entity_id, fields, consistent=True),
+    )
+
+
+def list_items(entity: keys.Entity, **params):
+    """Cached ``db.list_items``."""
+    key = ("list", json.dumps(params, sort_keys=True))
+    return reference(entity, key, lambda: db.list_items(entity, **params), indexed=True)
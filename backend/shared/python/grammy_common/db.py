@@ -0,0 +1,576 @@
+"""DynamoDB access for ``DataStack.table``.
+
+The client is created once per execution environment, at import time, so warm
+invocations reuse its pooled keep-alive connections instead of paying for
+client construction and a TLS handshake on every request.
+"""
+
+import heapq
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+from . import batch, keys, pagination, planner, telemetry
+
+TABLE_NAME = os.environ.get("TABLE_NAME", "")
+# Override for DynamoDB Local and other stand-ins used by local tooling.
+ENDPOINT_URL = os.environ.get("DYNAMODB_ENDPOINT") or None
+
+_config = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    connect_timeout=2,
+    read_timeout=5,
+    retries={"max_attempts": 3, "mode": "standard"},
+)
+
+dynamodb = boto3.resource("dynamodb", config=_config, endpoint_url=ENDPOINT_URL)
+client = dynamodb.meta.client
+telemetry.instrument_client(client)
+table = dynamodb.Table(TABLE_NAME)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_version(entity: keys.Entity) -> int:
+    """Return the current version of a ``keys.VERSIONED`` entity type."""
+    return read_version(entity)[0]
+
+
+def read_version(entity: keys.Entity, consistent: bool = False) -> Tuple[int, float]:
+    """Return the version of ``entity`` and when it last changed.
+
+    The time is in epoch seconds, 0 when unknown. ``consistent`` reads the
+    version item with ``ConsistentRead``, so every write that has returned
+    is counted.
+    """
+    item = table.get_item(
+        Key=keys.version_key(entity),
+        ProjectionExpression="version, changedAt",
+        ConsistentRead=consistent,
+    ).get("Item")
+    if not item:
+        return 0, 0.0
+    return int(item["version"]), float(item.get("changedAt", 0))
+
+
+def _bump_version(entity: keys.Entity) -> None:
+    """Invalidate cached ``entity`` data after a write."""
+    if entity in keys.VERSIONED:
+        table.update_item(
+            Key=keys.version_key(entity),
+            UpdateExpression="SET changedAt = :now ADD version :one",
+            ExpressionAttributeValues={":now": int(time.time()), ":one": 1},
+        )
+
+
+def query_all(**params) -> Iterator[dict]:
+    """Yield every item a ``Query`` returns, following its pages."""
+    while True:
+        response = table.query(**params)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def all_items(entity: keys.Entity, **params) -> Iterator[dict]:
+    """Yield every item of ``entity``, one GSI4 shard after another."""
+    for partition in keys.type_partitions(entity):
+        yield from query_all(
+            IndexName="GSI4",
+            KeyConditionExpression="GSI4PK = :pk",
+            ExpressionAttributeValues={":pk": partition},
+            **params,
+        )
+
+
+def projection(fields: Optional[tuple], *required: str) -> dict:
+    """Return the expression parameters that read only ``fields``.
+
+    ``id``, ``type``, ``version``, ``updatedAt`` and the ``required``
+    attributes are always read, since callers need them to assemble results
+    and ETags. Names go through placeholders, as many attribute names are
+    DynamoDB reserved words.
+    """
+    if not fields:
+        return {}
+    names = sorted({"id", "type", "version", "updatedAt", *required, *fields})
+    return {
+        "ProjectionExpression": ", ".join(f"#p{index}" for index in range(len(names))),
+        "ExpressionAttributeNames": {
+            f"#p{index}": name for index, name in enumerate(names)
+        },
+    }
+
+
+def get(
+    entity: keys.Entity,
+    entity_id: str,
+    fields: Optional[tuple] = None,
+    consistent: bool = False,
+) -> Optional[dict]:
+    """Return the item with ``entity_id`` or ``None`` when it does not exist.
+
+    ``fields`` limits the attributes read, see ``projection``; ``consistent``
+    reads with ``ConsistentRead``.
+    """
+    response = table.get_item(
+        Key=keys.item_key(entity, entity_id),
+        ConsistentRead=consistent,
+        **projection(fields),
+    )
+    item = response.get("Item")
+    return keys.from_item(item) if item else None
+
+
+def get_project(
+    project_id: str,
+    include: frozenset = frozenset(),
+    fields: Optional[tuple] = None,
+) -> Optional[dict]:
+    """Return a project with the related entities named in ``include``.
+
+    ``include`` may name ``songs``, ``instruments`` and ``tunings``. The
+    project and its songs come from one ``Query`` on the project's item
+    collection in GSI3; the instruments and tunings its songs reference are
+    read with a single deduplicated batch get. ``fields`` applies to the
+    project and every included item.
+    """
+    if not include:
+        return get(keys.PROJECT, project_id, fields)
+
+    collection = keys.sort_key(keys.PROJECT, project_id)
+    references = [
+        f"{entity.name}Id"
+        for entity in (keys.INSTRUMENT, keys.TUNING)
+        if f"{entity.name}s" in include
+    ]
+    params = {
+        "IndexName": "GSI3",
+        "KeyConditionExpression": "GSI3PK = :pk",
+        "ExpressionAttributeValues": {":pk": collection},
+        **projection(fields, *references),
+    }
+    project, songs = None, []
+    while True:
+        response = table.query(**params)
+        for item in response.get("Items", []):
+            if item["type"] == keys.PROJECT.name:
+                project = keys.from_item(item)
+            else:
+                songs.append(keys.from_item(item))
+        if "LastEvaluatedKey" not in response:
+            break
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    if project is None:
+        return None
+
+    if "songs" in include:
+        project["songs"] = songs
+    related_keys = {}
+    for entity in (keys.INSTRUMENT, keys.TUNING):
+        if f"{entity.name}s" not in include:
+            continue
+        project[f"{entity.name}s"] = []
+        for song in songs:
+            entity_id = song.get(f"{entity.name}Id")
+            if entity_id:
+                key = keys.item_key(entity, str(entity_id))
+                related_keys[key["SK"]] = key
+    found, failed = batch.get_items(
+        client, TABLE_NAME, list(related_keys.values()), projection(fields)
+    )
+    if failed:
+        raise RuntimeError(f"{len(failed)} related items could not be read")
+    for item in found:
+        project[f"{item['type']}s"].append(keys.from_item(item))
+    return project
+
+
+def list_items(
+    entity: keys.Entity,
+    limit: int = pagination.DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    filters: Optional[dict] = None,
+    fields: Optional[tuple] = None,
+) -> Tuple[list, Optional[str]]:
+    """Return one page of ``entity`` items and the cursor of the next page.
+
+    ``filters`` select an access pattern from ``planner``; ``start`` and
+    ``end`` bound an unfiltered listing to an inclusive range of ids. Every
+    page is a single ``Query``, or one per shard (see ``_list_sharded``
+    and ``_list_distinct`` for the exceptions), so its cost does not grow
+    with the table. ``fields`` limits the attributes read, see
+    ``projection``.
+    """
+    query_plan = planner.plan(entity, filters, start, end)
+    if query_plan.shards:
+        return _list_sharded(entity, query_plan, limit, cursor, fields)
+    if query_plan.distinct:
+        return _list_distinct(query_plan, limit, cursor, fields)
+    params = dict(query_plan.params, Limit=limit)
+    if not query_plan.resolve:
+        params.update(projection(fields))
+    start_key = pagination.decode_cursor(
+        cursor, query_plan.partition_attribute, query_plan.partition_value
+    )
+    if start_key:
+        params["ExclusiveStartKey"] = start_key
+    response = table.query(**params)
+    next_cursor = pagination.encode_cursor(response.get("LastEvaluatedKey"))
+    if query_plan.resolve:
+        resolve = query_plan.resolve
+        entity_ids = [
+            keys.id_from_sort_key(resolve, item[query_plan.sort_attribute])
+            for item in response.get("Items", [])
+        ]
+        items, _, _ = get_many(resolve, entity_ids, fields)
+        return items, next_cursor
+    return [keys.from_item(item) for item in response.get("Items", [])], next_cursor
+
+
+def _list_sharded(
+    entity: keys.Entity,
+    query_plan: planner.QueryPlan,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[tuple],
+) -> Tuple[list, Optional[str]]:
+    """Return one page of a listing spread over shards.
+
+    Every shard is queried for up to ``limit`` items, concurrently, and the
+    page is the first ``limit`` of their merge by sort key: an item a shard
+    did not return sorts after all ``limit`` items it did. The cursor is the
+    last item of the page, and each shard resumes after it.
+    """
+    sort_attribute = query_plan.sort_attribute
+    start_key = pagination.decode_cursor(
+        cursor, query_plan.partition_attribute, query_plan.partition_value
+    )
+    after = start_key.get(sort_attribute, "") if start_key else None
+    if start_key and not after.startswith(entity.prefix + keys.SEPARATOR):
+        raise pagination.InvalidCursor("Cursor does not belong to this listing")
+
+    def query_shard(partition: str) -> Tuple[list, bool]:
+        params = dict(
+            query_plan.params, Limit=limit, **projection(fields, sort_attribute)
+        )
+        params["ExpressionAttributeValues"] = dict(
+            params["ExpressionAttributeValues"], **{":pk": partition}
+        )
+        if after:
+            # Sort keys are unique: the start key need not be in this shard
+            params["ExclusiveStartKey"] = {
+                **keys.item_key(entity, keys.id_from_sort_key(entity, after)),
+                query_plan.partition_attribute: partition,
+                sort_attribute: after,
+            }
+        response = table.query(**params)
+        return response.get("Items", []), "LastEvaluatedKey" in response
+
+    results = batch.map_concurrently(query_shard, list(query_plan.shards))
+    merged = list(
+        heapq.merge(
+            *(items for items, _ in results), key=lambda item: item[sort_attribute]
+        )
+    )
+    page = merged[:limit]
+    next_cursor = None
+    if page and (len(merged) > limit or any(more for _, more in results)):
+        next_cursor = pagination.encode_cursor(
+            {
+                query_plan.partition_attribute: query_plan.partition_value,
+                sort_attribute: page[-1][sort_attribute],
+            }
+        )
+    return [keys.from_item(item) for item in page], next_cursor
+
+
+def _list_distinct(
+    query_plan: planner.QueryPlan,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[tuple],
+) -> Tuple[list, Optional[str]]:
+    """Return one page of the distinct entities a keys-only index names.
+
+    The entries naming one entity are adjacent in the index. Each ``Query``
+    starts after the last entity seen, skipping the rest of its entries, so
+    a page holds ``limit`` entities, whatever their number of entries, and
+    the cursor is the last of them.
+    """
+    sort_attribute = query_plan.sort_attribute
+    params = dict(query_plan.params, Limit=limit + 1)
+    values = params["ExpressionAttributeValues"]
+    start_key = pagination.decode_cursor(
+        cursor, query_plan.partition_attribute, query_plan.partition_value
+    )
+    if start_key:
+        if sort_attribute not in start_key:
+            raise pagination.InvalidCursor("Cursor does not belong to this listing")
+        values = dict(values, **{":after": start_key[sort_attribute]})
+    sort_keys = []
+    while len(sort_keys) <= limit:
+        params["ExpressionAttributeValues"] = values
+        response = table.query(**params)
+        for item in response.get("Items", []):
+            if not sort_keys or item[sort_attribute] != sort_keys[-1]:
+                sort_keys.append(item[sort_attribute])
+        if "LastEvaluatedKey" not in response:
+            break
+        values = dict(values, **{":after": sort_keys[-1]})
+    next_cursor = None
+    if len(sort_keys) > limit:
+        sort_keys = sort_keys[:limit]
+        next_cursor = pagination.encode_cursor(
+            {
+                query_plan.partition_attribute: query_plan.partition_value,
+                sort_attribute: sort_keys[-1],
+            }
+        )
+    resolve = query_plan.resolve
+    items, _, _ = get_many(
+        resolve, [keys.id_from_sort_key(resolve, key) for key in sort_keys], fields
+    )
+    return items, next_cursor
+
+
+def _stamp(
+    entity: keys.Entity, item: dict, created_at: str, updated_at: str, version: int = 1
+) -> dict:
+    """Set the timestamps and version of ``item`` and its derived index keys."""
+    item["createdAt"] = created_at
+    item["updatedAt"] = updated_at
+    item["version"] = version
+    item.update(keys.index_keys(entity, item))
+    return item
+
+
+def create(entity: keys.Entity, attributes: dict) -> dict:
+    """Store a new item built from ``attributes`` and return it."""
+    now = _now()
+    item = _stamp(entity, keys.to_item(entity, keys.new_id(), attributes), now, now)
+    table.put_item(Item=item, ConditionExpression="attribute_not_exists(PK)")
+    _bump_version(entity)
+    return keys.from_item(item)
+
+
+def create_many(entity: keys.Entity, attribute_list: list) -> Tuple[list, list]:
+    """Store new items in batches; return created items and failed indexes."""
+    now = _now()
+    items = []
+    for attributes in attribute_list:
+        item = keys.to_item(entity, keys.new_id(), attributes)
+        items.append(_stamp(entity, item, now, now))
+    failed_ids = {item["id"] for item in batch.write_items(client, TABLE_NAME, items)}
+    created = [keys.from_item(item) for item in items if item["id"] not in failed_ids]
+    failed = [index for index, item in enumerate(items) if item["id"] in failed_ids]
+    if created:
+        _bump_version(entity)
+    return created, failed
+
+
+def get_many(
+    entity: keys.Entity, entity_ids: list, fields: Optional[tuple] = None
+) -> Tuple[list, list, list]:
+    """Read items in batches; return found items, missing ids and failed ids."""
+    unique_ids = list(dict.fromkeys(entity_ids))
+    found, failed_keys = batch.get_items(
+        client,
+        TABLE_NAME,
+        [keys.item_key(entity, entity_id) for entity_id in unique_ids],
+        projection(fields),
+    )
+    items = {item["id"]: keys.from_item(item) for item in found}
+    failed = {keys.id_from_sort_key(entity, key["SK"]) for key in failed_keys}
+    missing = [
+        entity_id
+        for entity_id in unique_ids
+        if entity_id not in items and entity_id not in failed
+    ]
+    ordered = [items[entity_id] for entity_id in unique_ids if entity_id in items]
+    return (
+        ordered,
+        missing,
+        [entity_id for entity_id in unique_ids if entity_id in failed],
+    )
+
+
+def replace(entity: keys.Entity, entity_id: str, attributes: dict) -> Optional[dict]:
+    """Replace an existing item; return ``None`` when it does not exist.
+
+    Recorded ``assets`` are kept. The write only happens while the item is
+    at the version read, so an asset recorded in between is not lost: the
+    replacement is built again from the new version instead.
+    """
+    while True:
+        current = table.get_item(
+            Key=keys.item_key(entity, entity_id),
+            ProjectionExpression="createdAt, #v, #a",
+            ExpressionAttributeNames={"#v": "version", "#a": "assets"},
+        ).get("Item")
+        if current is None:
+            return None
+        item = keys.to_item(entity, entity_id, attributes)
+        if "assets" in current:
+            item["assets"] = current["assets"]
+        version = int(current.get("version", 0))
+        _stamp(entity, item, current.get("createdAt"), _now(), version + 1)
+        try:
+            table.put_item(
+                Item=item,
+                ConditionExpression="attribute_exists(PK) AND #v = :version",
+                ExpressionAttributeNames={"#v": "version"},
+                ExpressionAttributeValues={":version": version},
+            )
+        except client.exceptions.ConditionalCheckFailedException:
+            continue
+        _bump_version(entity)
+        return keys.from_item(item)
+
+
+def add_asset(entity: keys.Entity, entity_id: str, asset: dict) -> bool:
+    """Add ``asset`` to the ``assets`` map of an item, by its ``id``.
+
+    Bumps the item's version, so cached representations are refreshed and
+    conditional updates based on the old version fail. Returns ``False``
+    when the item does not exist.
+    """
+    names = {"#a": "assets", "#id": asset["id"], "#v": "version"}
+    while True:
+        try:
+            table.update_item(
+                Key=keys.item_key(entity, entity_id),
+                UpdateExpression="SET #a.#id = :asset ADD #v :one",
+                ConditionExpression="attribute_exists(#a)",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={":asset": asset, ":one": 1},
+            )
+            return True
+        except client.exceptions.ConditionalCheckFailedException:
+            pass
+        # The first asset of the item creates the map
+        try:
+            table.update_item(
+                Key=keys.item_key(entity, entity_id),
+                UpdateExpression="SET #a = :assets ADD #v :one",
+                ConditionExpression="attribute_exists(PK) AND attribute_not_exists(#a)",
+                ExpressionAttributeNames={"#a": "assets", "#v": "version"},
+                ExpressionAttributeValues={":assets": {asset["id"]: asset}, ":one": 1},
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+            return True
+        except client.exceptions.ConditionalCheckFailedException as exc:
+            if not exc.response.get("Item"):
+                return False
+            # Another asset created the map first
+
+
+class VersionConflict(Exception):
+    """The item changed since the version a conditional update expected."""
+
+    def __init__(self, version: int):
+        super().__init__(f"Item is at version {version}")
+        self.version = version
+
+
+def _current_version(item: dict) -> int:
+    # Items returned with a failed condition are not converted by the resource.
+    version = item.get("version", 0)
+    if isinstance(version, dict):
+        version = version.get("N", 0)
+    return int(version)
+
+
+def update(
+    entity: keys.Entity, entity_id: str, changes: dict, expected_version: int
+) -> Optional[dict]:
+    """Apply a partial update with one ``UpdateItem``; return what changed.
+
+    ``changes`` maps attribute names to new values, ``None`` removing the
+    attribute. The write only happens while the item is at
+    ``expected_version``; otherwise ``VersionConflict`` is raised. Returns
+    ``None`` when the item does not exist.
+    """
+    now = _now()
+    changes = {
+        name: value
+        for name, value in changes.items()
+        if name not in keys.KEY_ATTRIBUTES and name not in keys.MANAGED_ATTRIBUTES
+    }
+    sets = {name: value for name, value in changes.items() if value is not None}
+    removes = [name for name, value in changes.items() if value is None]
+    current = None
+    if entity is keys.SONG and len({"instrumentId", "projectId"} & changes.keys()) == 1:
+        # GSI2 is keyed on both references, so the unchanged one is read.
+        # The read is consistent and must be of the expected version; the
+        # version condition below then guarantees the write is based on it.
+        current = table.get_item(
+            Key=keys.item_key(entity, entity_id),
+            ProjectionExpression="instrumentId, projectId, #v",
+            ExpressionAttributeNames={"#v": "version"},
+            ConsistentRead=True,
+        ).get("Item")
+        if current is None:
+            return None
+        if _current_version(current) != expected_version:
+            raise VersionConflict(_current_version(current))
+    index_sets, index_removes = keys.index_updates(
+        entity, entity_id, changes, now, current
+    )
+    sets.update(index_sets, updatedAt=now, version=expected_version + 1)
+    removes += index_removes
+    names = {"#v": "version"}
+    values = {":expected": expected_version}
+    set_clauses, remove_clauses = [], []
+    for index, (name, value) in enumerate(sets.items()):
+        names[f"#s{index}"] = name
+        values[f":s{index}"] = value
+        set_clauses.append(f"#s{index} = :s{index}")
+    for index, name in enumerate(removes):
+        names[f"#r{index}"] = name
+        remove_clauses.append(f"#r{index}")
+    expression = "SET " + ", ".join(set_clauses)
+    if remove_clauses:
+        expression += " REMOVE " + ", ".join(remove_clauses)
+    try:
+        response = table.update_item(
+            Key=keys.item_key(entity, entity_id),
+            UpdateExpression=expression,
+            ConditionExpression="attribute_exists(PK) AND #v = :expected",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues="UPDATED_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except client.exceptions.ConditionalCheckFailedException as exc:
+        current = exc.response.get("Item")
+        if not current:
+            return None
+        raise VersionConflict(_current_version(current))
+    _bump_version(entity)
+    changed = {name: None for name in removes if name not in keys.KEY_ATTRIBUTES}
+    changed.update(keys.from_item(response["Attributes"]))
+    changed["id"] = entity_id
+    return changed
+
+
+def delete(entity: keys.Entity, entity_id: str) -> bool:
+    """Delete the item with ``entity_id``; return whether it existed."""
+    response = table.delete_item(
+        Key=keys.item_key(entity, entity_id),
+        ReturnValues="ALL_OLD",
+    )
+    if "Attributes" not in response:
+        return False
+    _bump_version(entity)
+    return True
@@ -0,0 +1,240 @@
+"""Fretboards and transposition of songs between tunings.
+
+A tuning is the MIDI pitch of each open string, lowest string first; its
+``notes`` are stored as names (``["E2", "A2", ...]``) or MIDI numbers. A
+``Fretboard`` is a tuning on an instrument with ``frets`` frets and an
+optional capo, and its pitch matrix holds the sounding pitch of every
+position:
+
+    pitches[string, fret] = tuning[string] + capo + fret
+
+Songs carry what is played as positions relative to the capo, the way tab
+is written; other keys of a note or chord are kept as they are:
+
+    tab      [{"string": <index>, "fret": <fret>, ...}, ...]
+    chords   [{"frets": [<fret or null per string>], ...}, ...]
+
+Transposing keeps every sounding pitch. For a (source, target) pair, one
+table maps each source position to the target position of the same pitch:
+on the same string where it is within reach, else on the nearest string
+that has it, at the lowest fret. Tables are built with array operations over
+the whole fretboard and memoized, so a song of any length is transposed with
+one gather over all its notes. A note the target cannot play comes back with
+``string`` and ``fret`` set to null, as does a chord string whose note had
+to move onto a string another note of the chord already uses.
+"""
+
+import functools
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_FRETS = 24
+# Distinct (source, target) tables kept; each is 2 x strings x frets bytes
+TABLE_CACHE_SIZE = 256
+
+NOTE_NAME = re.compile(r"^([A-Ga-g])([#b]?)(-?\d+)$")
+PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+UNPLAYABLE = -1
+
+
+class Fretboard(NamedTuple):
+    """A tuning on an instrument, with a capo."""
+
+    tuning: Tuple[int, ...]
+    frets: int = DEFAULT_FRETS
+    capo: int = 0
+
+    @property
+    def strings(self) -> int:
+        return len(self.tuning)
+
+    @property
+    def reach(self) -> int:
+        """Highest fret above the capo."""
+        return self.frets - self.capo
+
+
+class Transposition(NamedTuple):
+    """Target ``string`` and ``fret`` of every source position."""
+
+    string: np.ndarray
+    fret: np.ndarray
+
+
+def pitch(note) -> int:
+    """Return the MIDI pitch of a note name such as ``"F#3"``, or a number."""
+    if isinstance(note, str):
+        match = NOTE_NAME.match(note.strip())
+        if not match:
+            raise ValueError(f"Invalid note: {note}")
+        letter, accidental, octave = match.groups()
+        offset = {"#": 1, "b": -1}.get(accidental, 0)
+        return (int(octave) + 1) * 12 + PITCH_CLASSES[letter.upper()] + offset
+    if isinstance(note, bool) or int(note) != note:
+        raise ValueError(f"Invalid note: {note}")
+    return int(note)
+
+
+def fretboard(tuning: dict, instrument: Optional[dict] = None, capo=0) -> Fretboard:
+    """Return the fretboard of a tuning item on an instrument item."""
+    notes = tuning.get("notes")
+    if not isinstance(notes, list) or not notes:
+        raise ValueError("Tuning must have a non-empty notes list")
+    instrument = instrument or {}
+    strings = instrument.get("strings")
+    if strings is not None and int(strings) != len(notes):
+        raise ValueError(
+            f"Tuning has {len(notes)} notes but the instrument has {strings} strings"
+        )
+    frets = int(instrument.get("frets", DEFAULT_FRETS))
+    if isinstance(capo, bool) or int(capo) != capo:
+        raise ValueError("capo must be an integer")
+    capo = int(capo)
+    if not 0 <= capo < frets:
+        raise ValueError(f"capo must be between 0 and {frets - 1}")
+    return Fretboard(tuple(pitch(note) for note in notes), frets, capo)
+
+
+@functools.lru_cache(maxsize=TABLE_CACHE_SIZE)
+def pitches(board: Fretboard) -> np.ndarray:
+    """Return the sounding pitch of every (string, fret) of ``board``."""
+    matrix = (
+        np.asarray(board.tuning, dtype=np.int16)[:, None]
+        + board.capo
+        + np.arange(board.reach + 1, dtype=np.int16)[None, :]
+    )
+    matrix.flags.writeable = False
+    return matrix
+
+
+@functools.lru_cache(maxsize=TABLE_CACHE_SIZE)
+def transposition(source: Fretboard, target: Fretboard) -> Transposition:
+    """Return the table mapping positions on ``source`` to ``target``."""
+    # candidates[s, f, t]: fret on target string t sounding source (s, f)
+    candidates = (
+        pitches(source)[:, :, None]
+        - np.asarray(target.tuning, dtype=np.int16)[None, None, :]
+        - target.capo
+    )
+    reachable = (candidates >= 0) & (candidates <= target.reach)
+    # Prefer the same string, then the nearest one, then the lowest fret
+    distance = np.abs(
+        np.arange(source.strings)[:, None, None]
+        - np.arange(target.strings)[None, None, :]
+    )
+    cost = np.where(
+        reachable, distance * (target.frets + 1) + candidates, np.iinfo(np.int32).max
+    )
+    string = np.argmin(cost, axis=2)
+    fret = np.take_along_axis(candidates, string[:, :, None], axis=2)[:, :, 0]
+    playable = reachable.any(axis=2)
+    string = np.where(playable, string, UNPLAYABLE).astype(np.int8)
+    fret = np.where(playable, fret, UNPLAYABLE).astype(np.int8)
+    string.flags.writeable = fret.flags.writeable = False
+    return Transposition(string, fret)
+
+
+def _positions(source: Fretboard, strings: np.ndarray, frets: np.ndarray) -> tuple:
+    """Look up source positions in the table of ``source``'s shape.
+
+    Returns the table indices and which positions exist on ``source``.
+    """
+    valid = (
+        (strings >= 0)
+        & (strings < source.strings)
+        & (frets >= 0)
+        & (frets <= source.reach)
+    )
+    return np.where(valid, strings, 0), np.where(valid, frets, 0), valid
+
+
+def _integers(values: list, name: str) -> np.ndarray:
+    try:
+        array = np.fromiter(values, dtype=np.float64, count=len(values))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be integers")
+    if not np.array_equal(array, np.trunc(array)):
+        raise ValueError(f"{name} must be integers")
+    return array.astype(np.int32)
+
+
+def transpose_tab(tab: List[dict], source: Fretboard, target: Fretboard) -> tuple:
+    """Return the tab moved to ``target`` and its number of unplayable notes."""
+    if not tab:
+        return [], 0
+    if not all(isinstance(note, dict) for note in tab):
+        raise ValueError("tab must be a list of notes")
+    strings = _integers([note.get("string") for note in tab], "Tab strings")
+    frets = _integers([note.get("fret") for note in tab], "Tab frets")
+    table = transposition(source, target)
+    rows, columns, valid = _positions(source, strings, frets)
+    new_strings = np.where(valid, table.string[rows, columns], UNPLAYABLE)
+    new_frets = np.where(valid, table.fret[rows, columns], UNPLAYABLE)
+    unplayable = int(np.count_nonzero(new_strings == UNPLAYABLE))
+    return [
+        {
+            **note,
+            "string": None if string == UNPLAYABLE else string,
+            "fret": None if fret == UNPLAYABLE else fret,
+        }
+        for note, string, fret in zip(tab, new_strings.tolist(), new_frets.tolist())
+    ], unplayable
+
+
+def transpose_chords(chords: List[dict], source: Fretboard, target: Fretboard) -> tuple:
+    """Return the chord shapes moved to ``target`` and their lost notes."""
+    if not chords:
+        return [], 0
+    if not all(
+        isinstance(chord, dict) and isinstance(chord.get("frets"), list)
+        for chord in chords
+    ):
+        raise ValueError("chords must be a list of objects with a frets list")
+    # One row per chord, one column per source string; muted strings are -1
+    if any(len(chord["frets"]) > source.strings for chord in chords):
+        raise ValueError(f"A chord has more than {source.strings} strings")
+    padding = [None] * source.strings
+    shapes = _integers(
+        [
+            UNPLAYABLE if fret is None else fret
+            for chord in chords
+            for fret in (chord["frets"] + padding)[: source.strings]
+        ],
+        "Chord frets",
+    ).reshape(len(chords), source.strings)
+    sounded = shapes != UNPLAYABLE
+    rows, columns = np.nonzero(sounded)
+    table = transposition(source, target)
+    lookup_rows, lookup_columns, valid = _positions(
+        source, columns, shapes[rows, columns]
+    )
+    new_strings = np.where(valid, table.string[lookup_rows, lookup_columns], UNPLAYABLE)
+    new_frets = np.where(valid, table.fret[lookup_rows, lookup_columns], UNPLAYABLE)
+    placed = new_strings != UNPLAYABLE
+    # Scatter into target shapes; where two notes of a chord land on the same
+    # string, only the first is kept
+    result = np.full((len(chords), target.strings), UNPLAYABLE, dtype=np.int32)
+    slots = rows[placed] * target.strings + new_strings[placed]
+    _, first = np.unique(slots, return_index=True)
+    result.flat[slots[first]] = new_frets[placed][first]
+    lost = int(np.count_nonzero(sounded)) - len(first)
+    return [
+        {**chord, "frets": [None if fret == UNPLAYABLE else fret for fret in shape]}
+        for chord, shape in zip(chords, result.tolist())
+    ], lost
+
+
+def transpose_song(song: dict, source: Fretboard, target: Fretboard) -> dict:
+    """Return the ``tab`` and ``chords`` of ``song`` moved to ``target``."""
+    tab, lost_notes = transpose_tab(song.get("tab") or [], source, target)
+    chords, lost_chord_notes = transpose_chords(
+        song.get("chords") or [], source, target
+    )
+    return {
+        "tab": tab,
+        "chords": chords,
+        "capo": target.capo,
+        "unplayable": lost_notes + lost_chord_notes,
+    }
@@ -0,0 +1,189 @@
+"""Idempotency keys for write requests.
+
+A client that may retry a write (a mobile app on a flaky network, or after
+an API Gateway timeout) sends an ``Idempotency-Key`` header. The first
+request with a key claims it with a conditional put of an in-progress
+record in ``DataStack.table``; when the handler succeeds, its response is
+stored in the record. A retry with the same key replays the stored response,
+with ``Idempotent-Replayed: true``, without running the handler again:
+
+    first request    claim (PutItem), run the handler, store (UpdateItem)
+    retry            replay the record the failed claim returns
+    concurrent       409 with Retry-After while the first one runs
+    other request    422: the key was used with a different body
+
+Records are scoped to the caller (``auth.subject``, so a request without a
+verified caller is refused) and the request path, and expire after
+``TTL_SECONDS`` through the table's TTL; until DynamoDB deletes an expired
+record, it is treated as absent. A claim is held for the function's
+remaining run time, so a key whose request timed out or crashed can be used
+again. Only successful (2xx) responses are stored. After an error the claim
+is released, as a retry may then succeed.
+
+Completed responses are also kept at module scope, in ``cache.LRUCache``,
+so an immediate retry that reaches the same execution environment is
+answered without a DynamoDB round trip. Stored responses never change, so
+this tier cannot serve a stale one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from . import api, auth, cache, db, keys
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+MEMORY_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "1024"))
+MAX_KEY_LENGTH = 255
+# Claim duration when the remaining run time is unknown
+DEFAULT_LOCK_SECONDS = 30
+
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_responses = cache.LRUCache(MEMORY_SIZE, TTL_SECONDS)
+_deserializer = TypeDeserializer()
+
+
+def _record_hash(caller: str, event: dict, key: str) -> str:
+    """Hash the caller, method, path and key that identify a record."""
+    scope = "\0".join(
+        (
+            caller,
+            event.get("httpMethod", ""),
+            event.get("path") or event.get("resource") or "",
+            key,
+        )
+    )
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(event: dict) -> str:
+    return hashlib.sha256((event.get("body") or "").encode()).hexdigest()
+
+
+def _lock_seconds(context) -> float:
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    return remaining() / 1000 if remaining else DEFAULT_LOCK_SECONDS
+
+
+def _replay(response: dict) -> dict:
+    return {
+        **response,
+        "headers": {**(response.get("headers") or {}), REPLAYED_HEADER: "true"},
+    }
+
+
+def _reused() -> dict:
+    return api.error(422, f"{HEADER} was already used with a different request")
+
+
+def _existing(record: dict, fingerprint: str, record_hash: str) -> dict:
+    """Answer a request whose key is already claimed by ``record``."""
+    if record.get("fingerprint") != fingerprint:
+        return _reused()
+    if record.get("status") != COMPLETED:
+        response = api.error(409, f"A request with this {HEADER} is in progress")
+        response["headers"]["Retry-After"] = "1"
+        return response
+    response = json.loads(record["response"])
+    _responses.put(record_hash, 0, (fingerprint, response))
+    return _replay(response)
+
+
+def _claim(record_key: dict, fingerprint: str, context) -> Optional[dict]:
+    """Claim a key; return the record already holding it, if any."""
+    now = time.time()
+    try:
+        db.table.put_item(
+            Item={
+                **record_key,
+                "status": IN_PROGRESS,
+                "fingerprint": fingerprint,
+                "lockedUntil": int(now + _lock_seconds(context)) + 1,
+                "ttl": int(now) + TTL_SECONDS,
+            },
+            ConditionExpression=(
+                "attribute_not_exists(PK) OR #ttl < :now"
+                " OR (#status = :in_progress AND lockedUntil < :now)"
+            ),
+            ExpressionAttributeNames={"#ttl": "ttl", "#status": "status"},
+            ExpressionAttributeValues={":now": int(now), ":in_progress": IN_PROGRESS},
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except db.client.exceptions.ConditionalCheckFailedException as exc:
+        # Returned in DynamoDB JSON, without the resource's conversion
+        return {
+            name: _deserializer.deserialize(value)
+            for name, value in exc.response.get("Item", {}).items()
+        }
+    return None
+
+
+def _store(record_key: dict, response: dict) -> bool:
+    """Store the response of a claimed key; return whether it fit."""
+    try:
+        db.table.update_item(
+            Key=record_key,
+            UpdateExpression="SET #status = :completed, #response = :response",
+            ExpressionAttributeNames={"#status": "status", "#response": "response"},
+            ExpressionAttributeValues={
+                ":completed": COMPLETED,
+                ":response": json.dumps(response),
+            },
+        )
+    except ClientError as exc:
+        # Too large for an item (400 KB): the key is released instead
+        if exc.response.get("Error", {}).get("Code") != "ValidationException":
+            raise
+        logger.warning(json.dumps({"idempotency": "not stored", "reason": str(exc)}))
+        return False
+    return True
+
+
+def handle(event: dict, context, run: Callable[[], dict]) -> dict:
+    """Return the response to ``event``, running it at most once per key.
+
+    ``run`` executes the handler and returns its response.
+    """
+    key = api.header(event, HEADER)
+    if len(key) > MAX_KEY_LENGTH:
+        return api.error(400, f"{HEADER} must be at most {MAX_KEY_LENGTH} characters")
+    try:
+        caller = auth.subject(event)
+    except api.ApiError as exc:
+        return api.error(exc.status_code, exc.message)
+    record_hash = _record_hash(caller, event, key)
+    fingerprint = _fingerprint(event)
+
+    entry = _responses.get(record_hash, 0)
+    if entry is not None:
+        stored_fingerprint, response = entry.value
+        return _replay(response) if stored_fingerprint == fingerprint else _reused()
+
+    record_key = keys.idempotency_key(record_hash)
+    existing = _claim(record_key, fingerprint, context)
+    if existing:
+        return _existing(existing, fingerprint, record_hash)
+
+    try:
+        response = run()
+    except BaseException:
+        db.table.delete_item(Key=record_key)
+        raise
+    if 200 <= response.get("statusCode", 500) < 300 and _store(record_key, response):
+        _responses.put(record_hash, 0, (fingerprint, response))
+    else:
+        db.table.delete_item(Key=record_key)
+    return response
@@ -0,0 +1,304 @@
+"""Single-table key scheme for ``DataStack.table``.
+
+Every entity item has a partition of its own, so traffic spreads over the
+table however it is distributed over types, and an item is read with
+``GetItem``:
+
+    entity       PK                 SK
+    project      PROJECT#<id>       PROJECT#<id>
+    song         SONG#<id>          SONG#<id>
+    instrument   INSTRUMENT#<id>    INSTRUMENT#<id>
+    tuning       TUNING#<id>        TUNING#<id>
+
+Types are listed through GSI4, where the items of a type are spread over
+``TYPE_SHARDS`` partitions by a hash of their id; a listing queries every
+shard and merges the results by sort key (see ``db.list_items``):
+
+    index  item     partition key        sort key
+    GSI4   any      <TYPE>#<shard>       <TYPE>#<id>
+
+Cross-entity lookups use sparse, overloaded global secondary indexes. An item
+only carries the keys of an index when it takes part in one of its access
+patterns, and the generic attribute names leave room for other entity types:
+
+    index  item     partition key              sort key
+    GSI1   song     TUNING#<tuningId>          SONG#<id>
+    GSI2   song     INSTRUMENT#<instrumentId>  PROJECT#<projectId>
+    GSI3   project  PROJECT#<id>               PROJECT#<id>
+    GSI3   song     PROJECT#<projectId>        SONG#<updatedAt>#<id>
+
+GSI3 holds each project's item collection: the project and its songs share
+the ``PROJECT#<id>`` partition, so a whole project is read with one ``Query``.
+
+Entity types cached by ``cache`` have a version item, bumped on every write:
+
+    item         PK            SK
+    version      VERSION       <TYPE>
+
+Searchable items have a search document, maintained from the table's stream
+by the search indexer (see ``search``). Documents are numbered in the order
+they were written, with the numbers drawn from the ``VERSION``/``SEARCH``
+item. GSI1 lists them in that order, spread over ``SEARCH_SHARDS``
+partitions by a hash of their item's id:
+
+    item       PK                   SK            GSI1PK           GSI1SK
+    document   SEARCH#<TYPE>#<id>   <TYPE>#<id>   SEARCH#<shard>   <zero-padded sequence>
+
+Per-project, per-instrument and per-tuning summaries are maintained from the
+stream by the summary aggregator (see ``summaries``). Each summary has a
+partition of its own, which a project shares with its instrument usage, and
+GSI2 lists them all, spread over ``SUMMARY_SHARDS`` partitions. GSI2 only
+projects keys, so updating a summary's counters does not write the index:
+
+    item              PK                     SK                             GSI2PK           GSI2SK
+    summary           SUMMARY#<TYPE>#<id>    <TYPE>#<id>                    SUMMARY#<shard>  <SK>
+    instrument usage  SUMMARY#PROJECT#<id>   PROJECT#<id>#INSTRUMENT#<iid>  SUMMARY#<shard>  <SK>
+
+Idempotency records (see ``idempotency``) each have a partition of their
+own, named by a hash of the caller, the request path and the key, and are
+deleted through the table's ``ttl`` attribute:
+
+    item          PK                      SK
+    idempotency   IDEMPOTENCY#<hash>      IDEMPOTENCY
+"""
+
+import hashlib
+import uuid
+from typing import NamedTuple, Optional
+
+SEPARATOR = "#"
+# Part of the key layout: changing these moves items between partitions
+TYPE_SHARDS = 8
+SEARCH_SHARDS = 8
+SUMMARY_SHARDS = 8
+
+# Attributes owned by the data layer; never accepted from or returned to clients.
+INDEX_ATTRIBUTES = (
+    "GSI1PK",
+    "GSI1SK",
+    "GSI2PK",
+    "GSI2SK",
+    "GSI3PK",
+    "GSI3SK",
+    "GSI4PK",
+    "GSI4SK",
+)
+KEY_ATTRIBUTES = ("PK", "SK") + INDEX_ATTRIBUTES
+# ``assets`` is recorded from the assets bucket, see ``assets``. ``MIGRATING``
+# marks the copies ``tools/migrate_keys.py`` is writing, see ``summaries``.
+MIGRATING = "migrating"
+MANAGED_ATTRIBUTES = (
+    "id",
+    "type",
+    "createdAt",
+    "updatedAt",
+    "version",
+    "assets",
+    MIGRATING,
+)
+
+
+class Entity(NamedTuple):
+    """An entity type stored in the table."""
+
+    name: str
+    prefix: str
+
+
+PROJECT = Entity("project", "PROJECT")
+SONG = Entity("song", "SONG")
+INSTRUMENT = Entity("instrument", "INSTRUMENT")
+TUNING = Entity("tuning", "TUNING")
+
+ENTITIES = {entity.name: entity for entity in (PROJECT, SONG, INSTRUMENT, TUNING)}
+_BY_PREFIX = {entity.prefix: entity for entity in ENTITIES.values()}
+
+# Reference data served from ``cache``; writes to these bump a version item.
+VERSIONED = (INSTRUMENT, TUNING)
+
+# Not an API entity: the prefix of search documents, whose version item
+# numbers them.
+SEARCH = Entity("search", "SEARCH")
+# Not an API entity either: the prefix of summaries
+SUMMARY = Entity("summary", "SUMMARY")
+
+
+def new_id() -> str:
+    """Return a fresh entity id."""
+    return uuid.uuid4().hex
+
+
+def sort_key(entity: Entity, entity_id: str) -> str:
+    """Return the sort key of the item with ``entity_id``."""
+    return f"{entity.prefix}{SEPARATOR}{entity_id}"
+
+
+def item_key(entity: Entity, entity_id: str) -> dict:
+    """Return the primary key of the item with ``entity_id``."""
+    key = sort_key(entity, entity_id)
+    return {"PK": key, "SK": key}
+
+
+def parse_item_key(pk: str, sk: str) -> Optional[tuple]:
+    """Return the ``(entity, entity_id)`` of an item key, ``None`` for others."""
+    prefix, _, entity_id = pk.partition(SEPARATOR)
+    entity = _BY_PREFIX.get(prefix)
+    if entity is None or not entity_id or pk != sk:
+        return None
+    return entity, entity_id
+
+
+def type_partitions(entity: Entity) -> list:
+    """Return the GSI4 partitions holding the items of ``entity``."""
+    return [f"{entity.prefix}{SEPARATOR}{shard}" for shard in range(TYPE_SHARDS)]
+
+
+def shard(entity_id: str, shards: int) -> int:
+    """Return which of ``shards`` partitions an entity id hashes to."""
+    digest = hashlib.sha256(entity_id.encode()).digest()
+    return int.from_bytes(digest[:4], "big") % shards
+
+
+def type_keys(entity: Entity, entity_id: str) -> dict:
+    """Return the GSI4 keys listing the item with ``entity_id``."""
+    return {
+        "GSI4PK": f"{entity.prefix}{SEPARATOR}{shard(entity_id, TYPE_SHARDS)}",
+        "GSI4SK": sort_key(entity, entity_id),
+    }
+
+
+def search_partitions() -> list:
+    """Return the GSI1 partitions holding the search documents."""
+    return [f"{SEARCH.prefix}{SEPARATOR}{index}" for index in range(SEARCH_SHARDS)]
+
+
+def search_keys(entity: Entity, entity_id: str) -> dict:
+    """Return the key and GSI1 partition of an item's search document."""
+    item_sort_key = sort_key(entity, entity_id)
+    return {
+        "PK": f"{SEARCH.prefix}{SEPARATOR}{item_sort_key}",
+        "SK": item_sort_key,
+        "GSI1PK": search_partitions()[shard(entity_id, SEARCH_SHARDS)],
+    }
+
+
+def version_key(entity: Entity) -> dict:
+    """Return the primary key of the version item of ``entity``."""
+    return {"PK": "VERSION", "SK": entity.prefix}
+
+
+def idempotency_key(record_hash: str) -> dict:
+    """Return the primary key of the idempotency record ``record_hash``."""
+    return {"PK": f"IDEMPOTENCY{SEPARATOR}{record_hash}", "SK": "IDEMPOTENCY"}
+
+
+def id_from_sort_key(entity: Entity, sk: str) -> str:
+    """Return the entity id encoded in a sort key."""
+    return sk[len(entity.prefix) + len(SEPARATOR) :]
+
+
+def index_keys(entity: Entity, item: dict) -> dict:
+    """Return the secondary index keys ``item`` takes part in."""
+    index = type_keys(entity, item["id"])
+    if entity is PROJECT:
+        project_key = sort_key(PROJECT, item["id"])
+        index.update(GSI3PK=project_key, GSI3SK=project_key)
+        return index
+    if entity is not SONG:
+        return index
+    song_key = sort_key(SONG, item["id"])
+    tuning_id = item.get("tuningId")
+    instrument_id = item.get("instrumentId")
+    project_id = item.get("projectId")
+    if tuning_id:
+        index["GSI1PK"] = sort_key(TUNING, str(tuning_id))
+        index["GSI1SK"] = song_key
+    if instrument_id and project_id:
+        index["GSI2PK"] = sort_key(INSTRUMENT, str(instrument_id))
+        index["GSI2SK"] = sort_key(PROJECT, str(project_id))
+    if project_id:
+        index["GSI3PK"] = sort_key(PROJECT, str(project_id))
+        index["GSI3SK"] = SEPARATOR.join((SONG.prefix, item["updatedAt"], item["id"]))
+    return index
+
+
+def index_updates(
+    entity: Entity,
+    entity_id: str,
+    changes: dict,
+    updated_at: str,
+    current: Optional[dict] = None,
+) -> tuple:
+    """Return the index keys to set and remove for a partial update.
+
+    Only keys derived from attributes in ``changes`` (``None`` meaning
+    removed) are touched. GSI2 keys depend on both ``instrumentId`` and
+    ``projectId``; when only one of them changes, ``current`` must hold the
+    other.
+    """
+    if entity is not SONG:
+        return {}, []
+    song_key = sort_key(SONG, entity_id)
+    sets, removes = {}, []
+    if "tuningId" in changes:
+        if changes["tuningId"]:
+            sets["GSI1PK"] = sort_key(TUNING, str(changes["tuningId"]))
+            sets["GSI1SK"] = song_key
+        else:
+            removes += ["GSI1PK", "GSI1SK"]
+    if "instrumentId" in changes or "projectId" in changes:
+        references = {**(current or {}), **changes}
+        instrument_id = references.get("instrumentId")
+        project_id = references.get("projectId")
+        if instrument_id and project_id:
+            sets["GSI2PK"] = sort_key(INSTRUMENT, str(instrument_id))
+            sets["GSI2SK"] = sort_key(PROJECT, str(project_id))
+        else:
+            removes += ["GSI2PK", "GSI2SK"]
+    if "projectId" in changes:
+        if changes["projectId"]:
+            sets["GSI3PK"] = sort_key(PROJECT, str(changes["projectId"]))
+        else:
+            removes.append("GSI3PK")
+    # Songs are ordered by last update within their project. Without a
+    # GSI3PK the sort key alone does not put the song in GSI3.
+    sets["GSI3SK"] = SEPARATOR.join((SONG.prefix, updated_at, entity_id))
+    return sets, removes
+
+
+def to_item(entity: Entity, entity_id: str, attributes: dict) -> dict:
+    """Build a table item from client ``attributes``."""
+    item = {
+        key: value
+        for key, value in attributes.items()
+        if key not in KEY_ATTRIBUTES and key not in MANAGED_ATTRIBUTES
+    }
+    item.update(item_key(entity, entity_id))
+    item["id"] = entity_id
+    item["type"] = entity.name
+    return item
+
+
+def from_item(item: dict) -> dict:
+    """Strip table keys from an item before it is returned to a client."""
+    return {key: value for key, value in item.items() if key not in KEY_ATTRIBUTES}
+
+
+def summary_partitions() -> list:
+    """Return the GSI2 partitions listing the summaries."""
+    return [f"{SUMMARY.prefix}{SEPARATOR}{index}" for index in range(SUMMARY_SHARDS)]
+
+
+def summary_keys(summary_sort_key: str) -> dict:
+    """Return the keys of the summary with ``summary_sort_key``.
+
+    The partition is named by the summary's first two parts, the summarized
+    item, so a project's usage summaries share its partition.
+    """
+    item_sort_key = SEPARATOR.join(summary_sort_key.split(SEPARATOR)[:2])
+    return {
+        "PK": f"{SUMMARY.prefix}{SEPARATOR}{item_sort_key}",
+        "SK": summary_sort_key,
+        "GSI2PK": summary_partitions()[shard(summary_sort_key, SUMMARY_SHARDS)],
+        "GSI2SK": summary_sort_key,
+    }
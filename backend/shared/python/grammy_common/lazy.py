@@ -0,0 +1,33 @@
+"""Deferred imports for handlers.
+
+Everything a handler imports at module scope is paid for on every cold start.
+Dependencies that only some requests need should be bound with
+``lazy_import`` instead, which returns the module object straight away but
+only executes it on first attribute access::
+
+    from grammy_common.lazy import lazy_import
+
+    np = lazy_import("numpy")  # imported when a request first uses np.*
+
+Functions with SnapStart enabled are the exception: imports done during init
+are captured in the snapshot, so there they should stay eager.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module ``name`` without executing it until first use."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,40 @@
+"""Opaque continuation tokens for paged ``Query`` results."""
+
+import base64
+import json
+from typing import Optional
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a continuation token cannot be decoded."""
+
+
+def encode_cursor(last_evaluated_key: Optional[dict]) -> Optional[str]:
+    """Encode ``LastEvaluatedKey`` as a URL-safe token."""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: Optional[str], partition_attribute: str, partition: str
+) -> Optional[dict]:
+    """Decode a token into an ``ExclusiveStartKey`` within ``partition``."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise InvalidCursor("Malformed cursor")
+    if (
+        not isinstance(key, dict)
+        or key.get(partition_attribute) != partition
+        or not all(isinstance(value, str) for value in key.values())
+    ):
+        raise InvalidCursor("Cursor does not belong to this listing")
+    return key
@@ -0,0 +1,156 @@
+"""Access-pattern query planner.
+
+Every supported way of listing items maps to a ``Query`` on one of the
+table's secondary indexes (see ``keys``), or one per shard for a listing of
+a whole type. A listing that matches no pattern is rejected instead of
+falling back to a full-table ``Scan``.
+"""
+
+from typing import NamedTuple, Optional
+
+from . import keys
+
+
+class UnsupportedAccessPattern(ValueError):
+    """Raised when a listing cannot be served by a ``Query``."""
+
+
+class AccessPattern(NamedTuple):
+    """A filtered listing served by a secondary index."""
+
+    entity: keys.Entity
+    filter: str
+    filter_entity: keys.Entity
+    index: str
+    sort_prefix: str
+    scan_forward: bool = True
+    keys_only: bool = False
+    # Several index entries name the same entity; list each one once.
+    distinct: bool = False
+
+
+class QueryPlan(NamedTuple):
+    """``Query`` parameters for one listing."""
+
+    params: dict
+    partition_attribute: str
+    partition_value: str
+    sort_attribute: str
+    # Entity to read by id when the index only projects keys.
+    resolve: Optional[keys.Entity] = None
+    # Page by distinct sort key, see ``db.list_items``; the sort key
+    # condition is then ``> :after``.
+    distinct: bool = False
+    # Partitions queried as ``:pk`` and merged by sort key; the listing is
+    # then named by ``partition_value``.
+    shards: tuple = ()
+
+
+PATTERNS = (
+    # All songs in a tuning.
+    AccessPattern(keys.SONG, "tuningId", keys.TUNING, "GSI1", keys.SONG.prefix),
+    # All projects with a song played on an instrument. Every such song
+    # has an entry, so a project appears once per song.
+    AccessPattern(
+        keys.PROJECT,
+        "instrumentId",
+        keys.INSTRUMENT,
+        "GSI2",
+        keys.PROJECT.prefix,
+        keys_only=True,
+        distinct=True,
+    ),
+    # Songs of a project, most recently modified first.
+    AccessPattern(
+        keys.SONG,
+        "projectId",
+        keys.PROJECT,
+        "GSI3",
+        keys.SONG.prefix,
+        scan_forward=False,
+    ),
+)
+
+
+def _type_plan(
+    entity: keys.Entity, start: Optional[str], end: Optional[str]
+) -> QueryPlan:
+    condition = "GSI4PK = :pk"
+    values = {}
+    if start is not None and end is not None:
+        condition += " AND GSI4SK BETWEEN :start AND :end"
+    elif start is not None:
+        condition += " AND GSI4SK >= :start"
+    elif end is not None:
+        condition += " AND GSI4SK <= :end"
+    if start is not None:
+        values[":start"] = keys.sort_key(entity, start)
+    if end is not None:
+        values[":end"] = keys.sort_key(entity, end)
+    return QueryPlan(
+        params={
+            "IndexName": "GSI4",
+            "KeyConditionExpression": condition,
+            "ExpressionAttributeValues": values,
+        },
+        partition_attribute="GSI4PK",
+        partition_value=entity.prefix,
+        sort_attribute="GSI4SK",
+        shards=tuple(keys.type_partitions(entity)),
+    )
+
+
+def _index_plan(pattern: AccessPattern, value: str) -> QueryPlan:
+    partition_attribute = f"{pattern.index}PK"
+    sort_attribute = f"{pattern.index}SK"
+    partition = keys.sort_key(pattern.filter_entity, value)
+    condition = f"{partition_attribute} = :pk"
+    values = {":pk": partition}
+    if pattern.distinct:
+        # Entries sort after their bare prefix
+        condition += f" AND {sort_attribute} > :after"
+        values[":after"] = pattern.sort_prefix + keys.SEPARATOR
+    elif pattern.sort_prefix:
+        condition += f" AND begins_with({sort_attribute}, :prefix)"
+        values[":prefix"] = pattern.sort_prefix + keys.SEPARATOR
+    return QueryPlan(
+        params={
+            "IndexName": pattern.index,
+            "KeyConditionExpression": condition,
+            "ExpressionAttributeValues": values,
+            "ScanIndexForward": pattern.scan_forward,
+        },
+        partition_attribute=partition_attribute,
+        partition_value=partition,
+        sort_attribute=sort_attribute,
+        resolve=pattern.entity if pattern.keys_only else None,
+        distinct=pattern.distinct,
+    )
+
+
+def plan(
+    entity: keys.Entity,
+    filters: Optional[dict] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> QueryPlan:
+    """Return the ``Query`` serving a listing of ``entity`` by ``filters``.
+
+    Without filters the entity type is listed from its GSI4 shards,
+    optionally bounded by an inclusive ``start``/``end`` id range.
+    """
+    filters = {name: value for name, value in (filters or {}).items() if value}
+    if not filters:
+        return _type_plan(entity, start, end)
+    if start is not None or end is not None:
+        raise UnsupportedAccessPattern(
+            "An id range can only bound an unfiltered listing"
+        )
+    if len(filters) == 1:
+        ((name, value),) = filters.items()
+        for pattern in PATTERNS:
+            if pattern.entity is entity and pattern.filter == name:
+                return _index_plan(pattern, value)
+    raise UnsupportedAccessPattern(
+        f"Listing {entity.name}s by {', '.join(sorted(filters))} is not supported"
+    )
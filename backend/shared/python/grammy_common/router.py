@@ -0,0 +1,40 @@
+"""In-process dispatcher for router-mode functions.
+
+In router mode one Lambda function serves several routes, so they share warm
+execution environments. ``ROUTE_TABLE`` maps ``"<METHOD> <resource>"`` to the
+directory of the route's handler, relative to the function code root. Each
+handler module is imported on first use and kept for later invocations.
+Handlers emit their metrics with a ``Route`` dimension (see ``telemetry``),
+so metrics stay per route even though the function is shared.
+"""
+
+import importlib.util
+import json
+import os
+
+from . import api
+
+ROUTE_TABLE = json.loads(os.environ.get("ROUTE_TABLE", "{}"))
+CODE_ROOT = os.environ.get("LAMBDA_TASK_ROOT", os.getcwd())
+
+_handlers = {}
+
+
+def _load(code_path: str):
+    module_name = "grammy_route_" + code_path.replace("/", "_")
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(CODE_ROOT, code_path, "index.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def handler(event, context):
+    route = f"{event.get('httpMethod')} {event.get('resource')}"
+    code_path = ROUTE_TABLE.get(route)
+    if code_path is None:
+        return api.error(404, f"No handler for {route}")
+    if code_path not in _handlers:
+        _handlers[code_path] = _load(code_path)
+    return _handlers[code_path](event, context)
@@ -0,0 +1,347 @@
+"""Inverted index behind ``GET /search``.
+
+The search indexer keeps one search document per searchable item (see
+``keys``) up to date from the table's stream. Each document holds the item's
+label and searchable text and a sequence number; deletions leave a
+tombstone document, so readers learn about them too. Tombstones expire
+through the table's TTL after ``TOMBSTONE_SECONDS``. Documents are spread
+over ``keys.SEARCH_SHARDS`` GSI1 partitions, which are read concurrently.
+
+The query handler keeps an ``Index`` of all documents in memory across warm
+invocations. The first query loads every document; afterwards, at most once
+per ``SYNC_SECONDS``, a ``GetItem`` on the sequence item tells whether newer
+documents exist, and only those are read from GSI1. An index that has not
+synced for half of ``TOMBSTONE_SECONDS`` could miss expired tombstones, so
+it is loaded again instead. A query then costs the same however large the
+table is: query tokens match indexed terms by prefix (bounded by
+``MAX_PREFIX_TERMS``) and, for tokens of ``NGRAM`` characters or more, by
+trigram similarity, which tolerates typos and partial words.
+"""
+
+import bisect
+import heapq
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional
+
+from . import batch, db, keys
+
+# Item attributes that make up an entity's searchable text; the first one
+# present is the label shown in results.
+SEARCH_FIELDS = {
+    keys.PROJECT.name: ("name", "description"),
+    keys.SONG.name: ("title", "artist"),
+    keys.INSTRUMENT.name: ("name",),
+    keys.TUNING.name: ("name",),
+}
+
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 50
+MAX_PREFIX_TERMS = 256
+NGRAM = 3
+MIN_SIMILARITY = 0.5
+SEQUENCE_DIGITS = 12
+SYNC_SECONDS = float(os.environ.get("SEARCH_SYNC_SECONDS", "1"))
+TOMBSTONE_SECONDS = int(os.environ.get("SEARCH_TOMBSTONE_SECONDS", "86400"))
+# Documents are numbered before they are written, so a document can land
+# after higher-numbered ones; syncs re-read this many numbers back.
+RESYNC_WINDOW = 1000
+
+_TOKEN = re.compile(r"[0-9a-z#]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the lower-cased, accent-free words of ``text``."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _TOKEN.findall(stripped)
+
+
+def _grams(term: str) -> set:
+    padded = f" {term} "
+    return {padded[start : start + NGRAM] for start in range(len(padded) - NGRAM + 1)}
+
+
+def document(entity: keys.Entity, item: Optional[dict]) -> Optional[dict]:
+    """Return the label and searchable text of ``item``, if it has any."""
+    texts = [
+        str(item[field])
+        for field in SEARCH_FIELDS.get(entity.name, ())
+        if item and item.get(field)
+    ]
+    if not texts:
+        return None
+    return {"label": texts[0], "text": " ".join(texts)}
+
+
+def _sequence_key(sequence: int) -> str:
+    return str(sequence).zfill(SEQUENCE_DIGITS)
+
+
+def document_item(
+    entity: keys.Entity, entity_id: str, doc: Optional[dict], sequence: int
+) -> dict:
+    """Build the search document item; a ``None`` ``doc`` is a tombstone."""
+    item = {
+        **keys.search_keys(entity, entity_id),
+        "GSI1SK": _sequence_key(sequence),
+        "type": entity.name,
+        "id": entity_id,
+        "seq": sequence,
+    }
+    if doc is None:
+        item["deleted"] = True
+        item["ttl"] = int(time.time()) + TOMBSTONE_SECONDS
+    else:
+        item.update(doc)
+    return item
+
+
+class Index:
+    """In-memory inverted index over search documents."""
+
+    def __init__(self):
+        self._documents = {}
+        self._postings = defaultdict(set)
+        self._terms = []
+        self._grams = defaultdict(set)
+        self.sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def apply(self, item: dict) -> None:
+        """Add, replace or (for a tombstone) remove a document."""
+        key = item["SK"]
+        sequence = int(item["seq"])
+        self.sequence = max(self.sequence, sequence)
+        current = self._documents.get(key)
+        if current is not None:
+            if current["seq"] >= sequence:
+                return
+            for term in current["terms"]:
+                self._remove_term(term, key)
+        if item.get("deleted"):
+            self._documents.pop(key, None)
+            return
+        terms = frozenset(tokenize(item.get("text", "")))
+        self._documents[key] = {
+            "seq": sequence,
+            "type": item["type"],
+            "id": item["id"],
+            "label": item["label"],
+            "terms": terms,
+        }
+        for term in terms:
+            self._add_term(term, key)
+
+    def _add_term(self, term: str, key: str) -> None:
+        if term not in self._postings:
+            bisect.insort(self._terms, term)
+            for gram in _grams(term):
+                self._grams[gram].add(term)
+        self._postings[term].add(key)
+
+    def _remove_term(self, term: str, key: str) -> None:
+        postings = self._postings[term]
+        postings.discard(key)
+        if postings:
+            return
+        del self._postings[term]
+        del self._terms[bisect.bisect_left(self._terms, term)]
+        for gram in _grams(term):
+            self._grams[gram].discard(term)
+            if not self._grams[gram]:
+                del self._grams[gram]
+
+    def _matches(self, token: str) -> dict:
+        """Return the indexed terms ``token`` matches, with their scores."""
+        scores = {}
+        start = bisect.bisect_left(self._terms, token)
+        for term in self._terms[start : start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            scores[term] = 3.0 if term == token else 2.0
+        if len(token) >= NGRAM:
+            token_grams = _grams(token)
+            shared = Counter(
+                term for gram in token_grams for term in self._grams.get(gram, ())
+            )
+            for term, count in shared.items():
+                if term in scores:
+                    continue
+                similarity = 2 * count / (len(token_grams) + len(_grams(term)))
+                if similarity >= MIN_SIMILARITY:
+                    scores[term] = similarity
+        return scores
+
+    def search(
+        self, text: str, limit: int = DEFAULT_RESULTS, types: Iterable[str] = ()
+    ) -> List[dict]:
+        """Return the best ``limit`` documents matching every word of ``text``."""
+        totals = None
+        for token in dict.fromkeys(tokenize(text)):
+            scores = {}
+            for term, score in self._matches(token).items():
+                for key in self._postings[term]:
+                    if score > scores.get(key, 0.0):
+                        scores[key] = score
+            if totals is None:
+                totals = scores
+            else:
+                totals = {
+                    key: total + scores[key]
+                    for key, total in totals.items()
+                    if key in scores
+                }
+            if not totals:
+                return []
+        types = frozenset(types)
+        candidates = [
+            key
+            for key in totals or ()
+            if not types or self._documents[key]["type"] in types
+        ]
+        best = heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda key: (
+                -totals[key],
+                len(self._documents[key]["label"]),
+                self._documents[key]["label"],
+            ),
+        )
+        return [
+            {
+                "type": self._documents[key]["type"],
+                "id": self._documents[key]["id"],
+                "label": self._documents[key]["label"],
+                "score": round(totals[key], 3),
+            }
+            for key in best
+        ]
+
+
+_index = Index()
+_checked_at = None
+_synced_at = None
+
+
+def _read_documents(since: Optional[int] = None) -> list:
+    """Read the documents numbered after ``since``, or all of them."""
+
+    def read_shard(partition: str) -> list:
+        condition = "GSI1PK = :pk"
+        values = {":pk": partition}
+        if since is not None:
+            condition += " AND GSI1SK > :since"
+            values[":since"] = _sequence_key(since)
+        return list(
+            db.query_all(
+                IndexName="GSI1",
+                KeyConditionExpression=condition,
+                ExpressionAttributeValues=values,
+            )
+        )
+
+    shards = batch.map_concurrently(read_shard, keys.search_partitions())
+    return [item for items in shards for item in items]
+
+
+def _sync() -> None:
+    """Bring the in-memory index up to date with the search documents."""
+    global _index, _checked_at, _synced_at
+    now = time.monotonic()
+    if _synced_at is None or now - _synced_at >= TOMBSTONE_SECONDS / 2:
+        index = Index()
+        for item in _read_documents():
+            index.apply(item)
+        _index, _checked_at, _synced_at = index, now, now
+        return
+    if now - _checked_at < SYNC_SECONDS:
+        return
+    _checked_at = now
+    if db.get_version(keys.SEARCH) > _index.sequence:
+        for item in _read_documents(max(0, _index.sequence - RESYNC_WINDOW)):
+            _index.apply(item)
+    _synced_at = now
+
+
+def query(text: str, limit: int = DEFAULT_RESULTS, types: Iterable[str] = ()):
+    """Search the (synced) in-memory index."""
+    _sync()
+    return _index.search(text, limit, types)
+
+
+def _allocate(count: int) -> int:
+    """Reserve ``count`` sequence numbers; return the first one."""
+    response = db.table.update_item(
+        Key=keys.version_key(keys.SEARCH),
+        UpdateExpression="ADD version :count",
+        ExpressionAttributeValues={":count": count},
+        ReturnValues="UPDATED_NEW",
+    )
+    return int(response["Attributes"]["version"]) - count + 1
+
+
+def write_documents(entries: list) -> list:
+    """Write ``(entity, entity_id, doc)`` documents; return the failed ones."""
+    if not entries:
+        return []
+    first = _allocate(len(entries))
+    items = [
+        document_item(entity, entity_id, doc, first + offset)
+        for offset, (entity, entity_id, doc) in enumerate(entries)
+    ]
+    failed = {item["SK"] for item in batch.write_items(db.client, db.TABLE_NAME, items)}
+    return [entry for entry, item in zip(entries, items) if item["SK"] in failed]
+
+
+def index_changes(changes: Iterable) -> List[str]:
+    """Update search documents from stream changes.
+
+    Several changes to one item in a batch become a single write of its
+    latest state. Returns the sequence numbers of the records whose
+    documents could not be written.
+    """
+    latest = {}
+    for change in changes:
+        doc = document(change.entity, change.new)
+        if change.event_name == "MODIFY" and doc == document(change.entity, change.old):
+            continue
+        if change.event_name == "INSERT" and doc is None:
+            continue
+        key = keys.sort_key(change.entity, change.entity_id)
+        _, numbers = latest.get(key, (None, []))
+        latest[key] = (
+            (change.entity, change.entity_id, doc),
+            numbers + [change.sequence_number],
+        )
+    failed = {
+        keys.sort_key(entity, entity_id)
+        for entity, entity_id, _ in write_documents(
+            [entry for entry, _ in latest.values()]
+        )
+    }
+    return [number for key in failed for number in latest[key][1]]
+
+
+def backfill() -> int:
+    """Index every existing item; return the number of documents written."""
+    written = 0
+    for entity in keys.ENTITIES.values():
+        entries = []
+        for item in db.all_items(entity):
+            doc = document(entity, item)
+            if doc is not None:
+                entries.append((entity, item["id"], doc))
+        failed = write_documents(entries)
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} {entity.name} documents were not written"
+            )
+        written += len(entries)
+    return written
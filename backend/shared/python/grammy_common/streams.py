@@ -0,0 +1,68 @@
+"""Parsing of DynamoDB stream events for stream consumers.
+
+Consumers receive batches of ``Change`` records for entity items and report
+the records they could not process with ``batch_response``, so Lambda only
+retries from the first failed record instead of the whole batch (the event
+source enables ``ReportBatchItemFailures``).
+"""
+
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from . import keys
+
+_deserializer = TypeDeserializer()
+
+
+class Change(NamedTuple):
+    """One stream record of an entity item, with plain Python images."""
+
+    sequence_number: str
+    event_name: str
+    # When the change was made, in epoch seconds
+    timestamp: float
+    entity: keys.Entity
+    entity_id: str
+    old: Optional[dict]
+    new: Optional[dict]
+
+
+def _image(record: dict, name: str) -> Optional[dict]:
+    image = record["dynamodb"].get(name)
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+def changes(event: dict) -> Iterator[Change]:
+    """Yield the entity item changes of a stream event, in stream order.
+
+    Records of other items, such as version items and search documents, are
+    skipped.
+    """
+    for record in event.get("Records", []):
+        key = record["dynamodb"]["Keys"]
+        parsed = keys.parse_item_key(key["PK"]["S"], key["SK"]["S"])
+        if parsed is None:
+            continue
+        entity, entity_id = parsed
+        yield Change(
+            record["dynamodb"]["SequenceNumber"],
+            record["eventName"],
+            float(record["dynamodb"].get("ApproximateCreationDateTime", 0)),
+            entity,
+            entity_id,
+            _image(record, "OldImage"),
+            _image(record, "NewImage"),
+        )
+
+
+def batch_response(failed_sequence_numbers: Iterable[str]) -> dict:
+    """Build the partial batch response naming the records to retry."""
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": sequence_number}
+            for sequence_number in sorted(set(failed_sequence_numbers), key=int)
+        ]
+    }
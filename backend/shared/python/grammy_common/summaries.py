@@ -0,0 +1,314 @@
+"""Denormalized summaries, maintained from the table's stream.
+
+The summary aggregator turns entity changes into counter deltas and writes
+them with atomic ``UpdateItem`` ``ADD``s, so reading a summary is a single
+``GetItem`` or ``Query`` however many songs it covers. Each summary has a
+partition of its own (see ``keys.summary_keys``), so busy summaries do not
+contend with each other:
+
+    item                      PK                      SK                             attributes
+    project summary           SUMMARY#PROJECT#<id>    PROJECT#<id>                   name, songCount, lastActivity, deleted
+    project instrument usage  SUMMARY#PROJECT#<id>    PROJECT#<id>#INSTRUMENT#<iid>  songCount
+    instrument summary        SUMMARY#INSTRUMENT#<id> INSTRUMENT#<id>                name, songCount, lastActivity, deleted
+    tuning summary            SUMMARY#TUNING#<id>     TUNING#<id>                    name, songCount, lastActivity, deleted
+
+A project's summary and its instrument usage share a partition, so both come
+back from one ``Query``.
+
+A batch's changes are folded per summary first, so a summary that many
+records touch is written once. The folded updates go out in transactions of
+at most ``MAX_TRANSACTION_ITEMS`` items, each with an applied marker keyed by
+the sequence number of its first record and naming its last one,
+conditional on the marker not existing yet. A batch that Lambda delivers
+again, after a failure or a timeout, finds the markers of the records it
+applied and skips them. Markers expire through the table's TTL once the
+stream no longer holds their records:
+
+    item            PK                           SK        attributes
+    applied marker  SUMMARY#APPLIED#<sequence>   APPLIED   last, ttl
+
+When a transaction fails, its records and every later one are reported as
+failed, so Lambda retries from its first record, where the transactions
+start again as before. Bisecting a failed batch would split it elsewhere,
+so the aggregator's event source does not. ``rebuild`` recomputes every
+summary from the items.
+
+``tools/migrate_keys.py`` copies items to new keys with ``keys.MIGRATING``
+set, then deletes the originals and clears the mark. None of these changes
+are counted, since the tool rebuilds the summaries once it is done.
+"""
+
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Iterable, List
+
+from botocore.exceptions import ClientError
+
+from . import batch, db, keys
+
+# Streams keep records for 24 hours
+APPLIED_TTL_SECONDS = 2 * 24 * 3600
+# TransactWriteItems takes at most 100 items, the applied marker included.
+MAX_TRANSACTION_ITEMS = 100
+
+
+def summary_key(*parts: str) -> dict:
+    """Return the key of the summary item named by ``parts``."""
+    item_keys = keys.summary_keys(keys.SEPARATOR.join(parts))
+    return {"PK": item_keys["PK"], "SK": item_keys["SK"]}
+
+
+def applied_key(sequence_number: str) -> dict:
+    """Return the key of the applied marker of a stream record."""
+    return {
+        "PK": keys.SEPARATOR.join((keys.SUMMARY.prefix, "APPLIED", sequence_number)),
+        "SK": "APPLIED",
+    }
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
+
+
+class _Update:
+    """The changes records make to one summary item."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.values = {}
+
+    def merge(self, later: "_Update") -> None:
+        """Fold in the changes of a later record."""
+        self.counters.update(later.counters)
+        self.values.update(later.values)
+
+    def expression(self, index_keys: dict) -> dict:
+        """Return the ``UpdateItem`` expression parameters, or ``{}``.
+
+        ``index_keys`` are set along with the changes, so that the summary is
+        listed in its index partition.
+        """
+        names, values, sets, adds = {}, {}, [], []
+        if not self.values and not any(self.counters.values()):
+            return {}
+        changed = {**self.values, **index_keys}
+        for index, (name, value) in enumerate(sorted(changed.items())):
+            names[f"#s{index}"] = name
+            values[f":s{index}"] = value
+            sets.append(f"#s{index} = :s{index}")
+        counters = [(name, delta) for name, delta in self.counters.items() if delta]
+        for index, (name, delta) in enumerate(sorted(counters)):
+            names[f"#a{index}"] = name
+            values[f":a{index}"] = delta
+            adds.append(f"#a{index} :a{index}")
+        clauses = []
+        if sets:
+            clauses.append("SET " + ", ".join(sets))
+        if adds:
+            clauses.append("ADD " + ", ".join(adds))
+        return {
+            "UpdateExpression": " ".join(clauses),
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+
+
+def _song_counts(song: dict, sign: int) -> Iterable[tuple]:
+    """Yield the ``(summary key parts, delta)`` a song contributes."""
+    project_id = song.get("projectId")
+    instrument_id = song.get("instrumentId")
+    tuning_id = song.get("tuningId")
+    if project_id:
+        project = keys.sort_key(keys.PROJECT, str(project_id))
+        yield (project,), sign
+        if instrument_id:
+            yield (
+                (project, keys.sort_key(keys.INSTRUMENT, str(instrument_id))),
+                sign,
+            )
+    if instrument_id:
+        yield (keys.sort_key(keys.INSTRUMENT, str(instrument_id)),), sign
+    if tuning_id:
+        yield (keys.sort_key(keys.TUNING, str(tuning_id)),), sign
+
+
+def aggregate(change) -> dict:
+    """Return the ``_Update`` a stream change makes to each summary item."""
+    updates = defaultdict(_Update)
+    if any(keys.MIGRATING in (image or {}) for image in (change.old, change.new)):
+        return updates
+    if change.entity is keys.SONG:
+        activity = (change.new or {}).get("updatedAt") or _timestamp(change.timestamp)
+        for image, sign in ((change.old, -1), (change.new, 1)):
+            for parts, delta in _song_counts(image or {}, sign):
+                updates[parts].counters["songCount"] += delta
+        for parts, update in updates.items():
+            if len(parts) == 1:
+                update.values["lastActivity"] = activity
+    else:
+        update = updates[(keys.sort_key(change.entity, change.entity_id),)]
+        if change.new is None:
+            update.values["deleted"] = True
+            update.values["lastActivity"] = _timestamp(change.timestamp)
+        else:
+            update.values["deleted"] = False
+            update.values["lastActivity"] = change.new.get("updatedAt") or _timestamp(
+                change.timestamp
+            )
+            if change.new.get("name") is not None:
+                update.values["name"] = change.new["name"]
+    return updates
+
+
+def _fold(changes: list) -> tuple:
+    """Fold the longest run of ``changes`` that fits one transaction.
+
+    Returns the ``_Update`` of each summary item, keyed by its key parts, and
+    the number of changes folded.
+    """
+    updates = defaultdict(_Update)
+    folded = 0
+    for change in changes:
+        change_updates = aggregate(change)
+        if folded and len(updates.keys() | change_updates.keys()) >= (
+            MAX_TRANSACTION_ITEMS
+        ):
+            break
+        for parts, update in change_updates.items():
+            updates[parts].merge(update)
+        folded += 1
+    return updates, folded
+
+
+def _applied_through(sequence_number: str) -> str:
+    """Return the last record applied with ``sequence_number``, or ``""``.
+
+    Markers written one per record carry no ``last``.
+    """
+    response = db.table.get_item(Key=applied_key(sequence_number), ConsistentRead=True)
+    if "Item" not in response:
+        return ""
+    return response["Item"].get("last", sequence_number)
+
+
+def _write(first: str, last: str, updates: dict) -> bool:
+    """Write folded updates, unless their records were applied before.
+
+    Returns ``False`` when the applied marker of ``first`` already exists.
+    """
+    writes = []
+    for parts, update in updates.items():
+        index_keys = keys.summary_keys(keys.SEPARATOR.join(parts))
+        expression = update.expression(
+            {"GSI2PK": index_keys["GSI2PK"], "GSI2SK": index_keys["GSI2SK"]}
+        )
+        if expression:
+            writes.append(
+                {
+                    "Update": {
+                        "TableName": db.TABLE_NAME,
+                        "Key": summary_key(*parts),
+                        **expression,
+                    }
+                }
+            )
+    if not writes:
+        return True
+    marker = {
+        "Put": {
+            "TableName": db.TABLE_NAME,
+            "Item": {
+                **applied_key(first),
+                "last": last,
+                "ttl": int(time.time()) + APPLIED_TTL_SECONDS,
+            },
+            "ConditionExpression": "attribute_not_exists(PK)",
+        }
+    }
+    try:
+        db.client.transact_write_items(TransactItems=[marker] + writes)
+    except db.client.exceptions.TransactionCanceledException as exc:
+        reasons = exc.response.get("CancellationReasons") or [{}]
+        if reasons[0].get("Code") != "ConditionalCheckFailed":
+            raise
+        return False
+    return True
+
+
+def apply(changes: Iterable) -> List[str]:
+    """Write the summaries for a batch of stream changes.
+
+    Returns the sequence numbers of the records that were not applied.
+    """
+    changes = list(changes)
+    position = 0
+    while position < len(changes):
+        try:
+            applied = _applied_through(changes[position].sequence_number)
+            if applied:
+                while position < len(changes) and int(
+                    changes[position].sequence_number
+                ) <= int(applied):
+                    position += 1
+                continue
+            updates, folded = _fold(changes[position:])
+            if not _write(
+                changes[position].sequence_number,
+                changes[position + folded - 1].sequence_number,
+                updates,
+            ):
+                continue
+        except ClientError:
+            return [pending.sequence_number for pending in changes[position:]]
+        position += folded
+    return []
+
+
+def rebuild() -> int:
+    """Recompute every summary from the items; return the number written.
+
+    Summaries of items that no longer exist are zeroed and marked deleted.
+    """
+
+    def empty(sort_key: str) -> dict:
+        if sort_key.count(keys.SEPARATOR) > 1:
+            return {"songCount": 0}  # instrument usage
+        return {"songCount": 0, "deleted": True}
+
+    summaries = {
+        item["GSI2SK"]: empty(item["GSI2SK"])
+        for partition in keys.summary_partitions()
+        for item in db.query_all(
+            IndexName="GSI2",
+            KeyConditionExpression="GSI2PK = :pk",
+            ExpressionAttributeValues={":pk": partition},
+        )
+    }
+    for entity in (keys.PROJECT, keys.INSTRUMENT, keys.TUNING):
+        for item in db.all_items(entity):
+            summary = {
+                "songCount": 0,
+                "deleted": False,
+                "lastActivity": item.get("updatedAt"),
+            }
+            if item.get("name") is not None:
+                summary["name"] = item["name"]
+            summaries[keys.sort_key(entity, item["id"])] = summary
+    for song in db.all_items(keys.SONG):
+        for parts, delta in _song_counts(song, 1):
+            sort_key = keys.SEPARATOR.join(parts)
+            summary = summaries.setdefault(sort_key, empty(sort_key))
+            summary["songCount"] += delta
+            if len(parts) == 1 and song.get("updatedAt", "") > (
+                summary.get("lastActivity") or ""
+            ):
+                summary["lastActivity"] = song["updatedAt"]
+    items = [
+        {**keys.summary_keys(sort_key), **summary}
+        for sort_key, summary in summaries.items()
+    ]
+    failed = batch.write_items(db.client, db.TABLE_NAME, items)
+    if failed:
+        raise RuntimeError(f"{len(failed)} summaries were not written")
+    return len(items)
@@ -0,0 +1,195 @@
+"""Per-invocation latency metrics and tracing for handlers.
+
+``instrument`` wraps a handler and, after every invocation, prints one
+CloudWatch Embedded Metric Format record with a ``Route`` dimension: total
+duration, a cold-start flag, the init duration on cold starts, and the
+latency and consumed capacity of every DynamoDB call the invocation made.
+API handlers are instrumented by ``api.endpoint`` and their route is
+``<METHOD> <resource>``; stream consumers, jobs and event handlers name
+theirs, e.g. ``STREAM search-indexer``, and also count the stream records
+they report as failed.
+``instrument_client`` collects the DynamoDB side through botocore events and
+asks DynamoDB to return ``ConsumedCapacity`` with each response.
+
+Lambda active tracing records the invocation itself. When the X-Ray SDK is
+on the path, each invocation also gets a subsegment per route and the
+botocore calls are patched to record their own subsegments.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from . import LOADED_AT
+
+METRIC_NAMESPACE = os.environ.get("METRIC_NAMESPACE", "Grammy")
+FUNCTION_NAME = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+
+# DynamoDB operations that accept ReturnConsumedCapacity.
+CAPACITY_OPERATIONS = frozenset(
+    (
+        "GetItem",
+        "PutItem",
+        "UpdateItem",
+        "DeleteItem",
+        "Query",
+        "Scan",
+        "BatchGetItem",
+        "BatchWriteItem",
+        "TransactGetItems",
+        "TransactWriteItems",
+    )
+)
+
+# EMF accepts at most 100 values per metric in one record.
+MAX_VALUES = 100
+
+_init_ms = None
+_cold_start = True
+_calls = contextvars.ContextVar("dynamodb_calls")
+
+try:
+    from aws_xray_sdk.core import patch, xray_recorder
+except ImportError:  # SDK not bundled; Lambda still traces the invocation
+    xray_recorder = None
+else:
+    patch(["botocore"])
+
+
+def _request_capacity(params, model, **kwargs):
+    if model.name in CAPACITY_OPERATIONS:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+
+def _before_call(context, **kwargs):
+    context["grammy_started"] = time.perf_counter()
+
+
+def _after_call(parsed, model, context, **kwargs):
+    calls = _calls.get(None)
+    started = context.get("grammy_started")
+    if calls is None or started is None:
+        return
+    capacity = parsed.get("ConsumedCapacity") or []
+    if isinstance(capacity, dict):
+        capacity = [capacity]
+    calls.append(
+        (
+            model.name,
+            (time.perf_counter() - started) * 1000,
+            sum(float(entry.get("CapacityUnits", 0)) for entry in capacity),
+        )
+    )
+
+
+def instrument_client(client) -> None:
+    """Record latency and consumed capacity of calls made with ``client``."""
+    events = client.meta.events
+    events.register("provide-client-params.dynamodb", _request_capacity)
+    events.register("before-call.dynamodb", _before_call)
+    events.register("after-call.dynamodb", _after_call)
+
+
+def _emit(
+    route: str,
+    duration_ms: float,
+    status_code: int,
+    cold_start: bool,
+    calls,
+    record_failures: Optional[int] = None,
+):
+    metrics = [
+        {"Name": "Duration", "Unit": "Milliseconds"},
+        {"Name": "ColdStart", "Unit": "Count"},
+        {"Name": "Errors", "Unit": "Count"},
+        {"Name": "DynamoDBCalls", "Unit": "Count"},
+        {"Name": "DynamoDBCapacity", "Unit": "None"},
+    ]
+    record = {
+        "Route": route,
+        "FunctionName": FUNCTION_NAME,
+        "TraceId": os.environ.get("_X_AMZN_TRACE_ID"),
+        "StatusCode": status_code,
+        "Duration": duration_ms,
+        "ColdStart": int(cold_start),
+        "Errors": int(status_code >= 500),
+        "DynamoDBCalls": len(calls),
+        "DynamoDBCapacity": sum(call[2] for call in calls),
+        "DynamoDBOperations": [call[0] for call in calls],
+    }
+    if calls:
+        metrics.append({"Name": "DynamoDBLatency", "Unit": "Milliseconds"})
+        record["DynamoDBLatency"] = [call[1] for call in calls[:MAX_VALUES]]
+    if record_failures is not None:
+        metrics.append({"Name": "RecordFailures", "Unit": "Count"})
+        record["RecordFailures"] = record_failures
+    if cold_start and _init_ms is not None:
+        metrics.append({"Name": "InitDuration", "Unit": "Milliseconds"})
+        record["InitDuration"] = _init_ms
+    record["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [
+            {
+                "Namespace": METRIC_NAMESPACE,
+                "Dimensions": [["Route"]],
+                "Metrics": metrics,
+            }
+        ],
+    }
+    print(json.dumps(record))
+
+
+def instrument(func: Optional[Callable] = None, *, route: Optional[str] = None):
+    """Emit per-invocation metrics (and trace subsegments) for ``func``.
+
+    Without ``route``, the route is the API Gateway method and resource of
+    the event. Use as ``@instrument`` or ``@instrument(route=...)``.
+
+    The init duration is the time from the first import of the shared layer
+    (``grammy_common.LOADED_AT``) until the first invocation starts, so it
+    covers every module the handler loads, including a route's handler
+    that a router function loads on its first request.
+    """
+    if func is None:
+        return functools.partial(instrument, route=route)
+
+    @functools.wraps(func)
+    def wrapper(event, context):
+        global _cold_start, _init_ms
+        started = time.perf_counter()
+        cold_start, _cold_start = _cold_start, False
+        if cold_start:
+            _init_ms = (started - LOADED_AT) * 1000
+        name = route or f"{event.get('httpMethod')} {event.get('resource')}"
+        calls = []
+        token = _calls.set(calls)
+        status_code = 500
+        record_failures = None
+        try:
+            if xray_recorder is None:
+                result = func(event, context)
+            else:
+                with xray_recorder.in_subsegment(name) as subsegment:
+                    subsegment.put_annotation("cold_start", cold_start)
+                    result = func(event, context)
+            status_code = 200
+            if isinstance(result, dict):
+                status_code = result.get("statusCode", 200)
+                if "batchItemFailures" in result:
+                    record_failures = len(result["batchItemFailures"])
+            return result
+        finally:
+            _calls.reset(token)
+            _emit(
+                name,
+                (time.perf_counter() - started) * 1000,
+                status_code,
+                cold_start,
+                calls,
+                record_failures,
+            )
+
+    return wrapper
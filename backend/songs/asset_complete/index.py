@@ -0,0 +1,11 @@
+from grammy_common import api, assets
+
+
+@api.endpoint
+def handler(event, context):
+    body = api.json_body(event)
+    song_id = api.require_id(event)
+    asset_id = api.path_param(event, "assetId")
+    assets.complete_upload(song_id, asset_id, body.get("uploadId"), body.get("parts"))
+    # The asset is added to the song once the bucket reports the new object
+    return api.response(202, {"id": asset_id, "songId": song_id})
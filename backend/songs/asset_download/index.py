@@ -0,0 +1,15 @@
+from grammy_common import api, assets, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
+def handler(event, context):
+    song_id = api.require_id(event)
+    asset_id = api.path_param(event, "assetId")
+    song = db.get(SONG, song_id, fields=("assets",))
+    if song is None:
+        raise api.ApiError(404, "Song not found")
+    asset = (song.get("assets") or {}).get(asset_id)
+    if asset is None:
+        raise api.ApiError(404, "Asset not found")
+    return api.response(200, {**asset, **assets.download_url(song_id, asset_id)})
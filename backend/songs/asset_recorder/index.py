@@ -0,0 +1,8 @@
+from grammy_common import assets, telemetry
+
+
+@telemetry.instrument(route="EVENT song-asset-recorder")
+def handler(event, context):
+    # "Object Created" events from the assets bucket, through EventBridge
+    detail = event["detail"]
+    assets.record(detail["object"]["key"], int(detail["object"].get("size", 0)))
@@ -0,0 +1,14 @@
+from grammy_common import api, assets, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
+def handler(event, context):
+    body = api.json_body(event)
+    song_id = api.require_id(event)
+    if db.get(SONG, song_id, fields=("id",)) is None:
+        raise api.ApiError(404, "Song not found")
+    upload = assets.start_upload(
+        song_id, body.get("filename"), body.get("contentType"), body.get("size")
+    )
+    return api.response(201, upload)
@@ -0,0 +1,8 @@
+from grammy_common import api, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
+def handler(event, context):
+    created, failed = db.create_many(SONG, api.batch_body(event))
+    return api.batch_write_result(created, failed)
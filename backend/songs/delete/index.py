@@ -1,2 +1,10 @@
+from grammy_common import api, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Deleted song succesfully"}
+    body = api.json_body(event)
+    if not db.delete(SONG, api.require_id(event, body)):
+        raise api.ApiError(404, "Song not found")
+    return api.response(204)
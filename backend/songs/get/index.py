@@ -1,2 +1,8 @@
+from grammy_common import api, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "List of songs will be returned here"}
+    items, cursor = db.list_items(SONG, **api.page_params(event))
+    return api.page(event, items, cursor)
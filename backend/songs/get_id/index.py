@@ -1,2 +1,11 @@
+from grammy_common import api, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Retrieved song ID successfully"}
+    fields = api.fields_param(event)
+    song = db.get(SONG, api.require_id(event), fields)
+    if song is None:
+        raise api.ApiError(404, "Song not found")
+    return api.conditional(event, song, api.etag(song, variant=",".join(fields or ())))
@@ -1,2 +1,7 @@
+from grammy_common import api, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Created song sucessfully"}
+    return api.response(201, db.create(SONG, api.json_body(event)))
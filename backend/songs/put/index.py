@@ -1,2 +1,11 @@
+from grammy_common import api, db
+from grammy_common.keys import SONG
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Song updated sucessfully"}
+    body = api.json_body(event)
+    song = db.replace(SONG, api.require_id(event, body), body)
+    if song is None:
+        raise api.ApiError(404, "Song not found")
+    return api.response(200, song)
@@ -0,0 +1,51 @@
+from grammy_common import api, cache, db, fretboard
+from grammy_common.keys import INSTRUMENT, SONG, TUNING
+
+
+def _reference(entity, entity_id, label: str) -> dict:
+    item = cache.get(entity, str(entity_id)) if entity_id else None
+    if item is None:
+        raise api.ApiError(404, f"{label} not found")
+    return item
+
+
+@api.endpoint
+def handler(event, context):
+    body = api.json_body(event)
+    song = db.get(SONG, api.require_id(event))
+    if song is None:
+        raise api.ApiError(404, "Song not found")
+    if not song.get("tuningId"):
+        raise api.ApiError(409, "Song has no tuning to transpose from")
+    if not body.get("tuningId"):
+        raise api.ApiError(400, "Missing required field: tuningId")
+
+    instrument_id = song.get("instrumentId")
+    target_instrument_id = body.get("instrumentId", instrument_id)
+    try:
+        source = fretboard.fretboard(
+            _reference(TUNING, song["tuningId"], "Song tuning"),
+            _reference(INSTRUMENT, instrument_id, "Song instrument")
+            if instrument_id
+            else None,
+            song.get("capo", 0),
+        )
+        target = fretboard.fretboard(
+            _reference(TUNING, body["tuningId"], "Tuning"),
+            _reference(INSTRUMENT, target_instrument_id, "Instrument")
+            if target_instrument_id
+            else None,
+            body.get("capo", 0),
+        )
+        transposed = fretboard.transpose_song(song, source, target)
+    except (TypeError, ValueError) as exc:
+        raise api.ApiError(400, str(exc))
+    return api.response(
+        200,
+        {
+            "id": song["id"],
+            "tuningId": body["tuningId"],
+            "instrumentId": target_instrument_id,
+            **transposed,
+        },
+    )
@@ -0,0 +1,8 @@
+from grammy_common import streams, summaries, telemetry
+
+
+@telemetry.instrument(route="STREAM summary-aggregator")
+def handler(event, context):
+    if event.get("rebuild"):
+        return {"summaries": summaries.rebuild()}
+    return streams.batch_response(summaries.apply(streams.changes(event)))
@@ -1,2 +1,8 @@
+from grammy_common import api, cache
+from grammy_common.keys import TUNING
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Retrieved tunings successfully"}
+    items, cursor = cache.list_items(TUNING, **api.page_params(event))
+    return api.page(event, items, cursor)
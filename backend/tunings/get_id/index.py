@@ -1,2 +1,13 @@
+from grammy_common import api, cache
+from grammy_common.keys import TUNING
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Retrieved tuning ID successfully"}
+    fields = api.fields_param(event)
+    tuning = cache.get(TUNING, api.require_id(event), fields)
+    if tuning is None:
+        raise api.ApiError(404, "Tuning not found")
+    return api.conditional(
+        event, tuning, api.etag(tuning, variant=",".join(fields or ()))
+    )
@@ -1,2 +1,7 @@
+from grammy_common import api, db
+from grammy_common.keys import TUNING
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Created tuning successfully"}
+    return api.response(201, db.create(TUNING, api.json_body(event)))
@@ -1,2 +1,11 @@
+from grammy_common import api, db
+from grammy_common.keys import TUNING
+
+
+@api.endpoint
 def handler(event, context):
-    return {"statusCode": 200, "body": "Updated tuning successfully"}
+    body = api.json_body(event)
+    tuning = db.replace(TUNING, api.require_id(event, body), body)
+    if tuning is None:
+        raise api.ApiError(404, "Tuning not found")
+    return api.response(200, tuning)
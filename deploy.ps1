@@ -1,46 +1,84 @@
 # Quick CDK Deploy Script
-# Builds Docker image, runs frontend build, and deploys with CDK
+# Builds the frontend in Docker if it changed, and deploys the CDK stacks that changed
 
 param(
-    [switch]$NoPrompt
+    [switch]$NoPrompt,
+    # Rebuilds and deploys everything, ignoring what was deployed last time
+    [switch]$All
 )
 
 Write-Host "🚀 Starting Quick CDK Deploy..." -ForegroundColor Cyan
 
-# Step 1: Build Docker image
-Write-Host "`n📦 Building Docker image..." -ForegroundColor Yellow
-Push-Location frontend
-docker build -t grammy .
-if ($LASTEXITCODE -ne 0) {
-    Write-Host "❌ Docker build failed" -ForegroundColor Red
-    Pop-Location
-    exit 1
+# Tracks what was last built and deployed: tools/deploy_changes.py
+$changes = Join-Path (Get-Location).Path "tools/deploy_changes.py"
+if ($All) {
+    Remove-Item -ErrorAction SilentlyContinue infrastructure/grammy/build/deploy-state.json
 }
 
-# Step 2: Run container and build frontend
-Write-Host "`n🏗️  Running frontend build in Docker..." -ForegroundColor Yellow
-$frontendPath = (Get-Location).Path
-docker run --rm -v "${frontendPath}/dist:/out" grammy sh -c "npm run build && cp -r dist/* /out"
-if ($LASTEXITCODE -ne 0) {
-    Write-Host "❌ Frontend build failed" -ForegroundColor Red
+python $changes frontend-changed
+if ($LASTEXITCODE -eq 0) {
+    # Step 1: Build Docker image
+    Write-Host "`n📦 Building Docker image..." -ForegroundColor Yellow
+    Push-Location frontend
+    docker build -t grammy .
+    if ($LASTEXITCODE -ne 0) {
+        Write-Host "❌ Docker build failed" -ForegroundColor Red
+        Pop-Location
+        exit 1
+    }
+
+    # Step 2: Run container and build frontend
+    Write-Host "`n🏗️  Running frontend build in Docker..." -ForegroundColor Yellow
+    $frontendPath = (Get-Location).Path
+    docker run --rm -v "${frontendPath}/dist:/out" grammy sh -c "npm run build && cp -r dist/* /out"
+    if ($LASTEXITCODE -ne 0) {
+        Write-Host "❌ Frontend build failed" -ForegroundColor Red
+        Pop-Location
+        exit 1
+    }
+
+    Write-Host "✅ Frontend built successfully" -ForegroundColor Green
     Pop-Location
-    exit 1
+    python $changes record frontend
+} else {
+    Write-Host "`n✅ Frontend unchanged, skipping frontend build" -ForegroundColor Green
 }
 
-Write-Host "✅ Frontend built successfully" -ForegroundColor Green
-Pop-Location
-
-# Step 3: Deploy with CDK
-Write-Host "`n🌥️  Running CDK deploy..." -ForegroundColor Yellow
 Push-Location infrastructure/grammy
 
-if ($NoPrompt) {
-    cdk deploy --require-approval=never
+# Step 3: Synthesize, unless nothing the app reads has changed
+python $changes synth-needed
+if ($LASTEXITCODE -eq 0) {
+    Write-Host "`n🧩 Running CDK synth..." -ForegroundColor Yellow
+    cdk synth -q
+    if ($LASTEXITCODE -ne 0) {
+        Write-Host "`n❌ CDK synth failed" -ForegroundColor Red
+        Pop-Location
+        exit 1
+    }
+    python $changes record synth
+} else {
+    Write-Host "`n✅ Inputs unchanged, reusing cdk.out" -ForegroundColor Green
+}
+
+# Step 4: Deploy the stacks whose templates changed
+$stacks = @(python $changes changed-stacks cdk.out | Where-Object { $_ })
+$deployResult = 0
+if ($stacks.Count -eq 0) {
+    Write-Host "`n✅ No stack changed, nothing to deploy" -ForegroundColor Green
 } else {
-    cdk deploy
+    Write-Host "`n🌥️  Running CDK deploy for: $($stacks -join ' ')" -ForegroundColor Yellow
+    if ($NoPrompt) {
+        cdk deploy --app cdk.out --exclusively --require-approval=never @stacks
+    } else {
+        cdk deploy --app cdk.out --exclusively @stacks
+    }
+    $deployResult = $LASTEXITCODE
+    if ($deployResult -eq 0) {
+        python $changes record stacks cdk.out @stacks
+    }
 }
 
-$deployResult = $LASTEXITCODE
 Pop-Location
 
 if ($deployResult -eq 0) {
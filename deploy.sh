@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # Quick CDK Deploy Script
-# Builds Docker image, runs frontend build, and deploys with CDK
+# Builds the frontend in Docker if it changed, and deploys the CDK stacks that changed
 # Works on Windows (Git Bash/WSL), macOS, and Linux
 
 set -e  # Exit on error
@@ -14,6 +14,8 @@ CYAN='\033[0;36m'
 NC='\033[0m' # No Color
 
 NO_PROMPT=false
+# --all rebuilds and deploys everything, ignoring what was deployed last time
+ALL=false
 
 # Parse arguments
 while [[ $# -gt 0 ]]; do
@@ -22,6 +24,10 @@ while [[ $# -gt 0 ]]; do
             NO_PROMPT=true
             shift
             ;;
+        --all)
+            ALL=true
+            shift
+            ;;
         *)
             shift
             ;;
@@ -30,26 +36,52 @@ done
 
 echo -e "${CYAN}🚀 Starting Quick CDK Deploy...${NC}"
 
-# Step 1: Build Docker image
-echo -e "\n${YELLOW}📦 Building Docker image...${NC}"
-cd frontend
-docker build -t grammy .
+# Tracks what was last built and deployed: tools/deploy_changes.py
+CHANGES="python $(pwd)/tools/deploy_changes.py"
+if [ "$ALL" = true ]; then
+    rm -f infrastructure/grammy/build/deploy-state.json
+fi
 
-# Step 2: Run container and build frontend
-echo -e "\n${YELLOW}🏗️  Running frontend build in Docker...${NC}"
-FRONTEND_PATH="$(pwd)"
-docker run --rm -v "${FRONTEND_PATH}/dist:/out" grammy sh -c "npm run build && cp -r dist/* /out"
-echo -e "${GREEN}✅ Frontend built successfully${NC}"
-cd ..
+if $CHANGES frontend-changed; then
+    # Step 1: Build Docker image
+    echo -e "\n${YELLOW}📦 Building Docker image...${NC}"
+    cd frontend
+    docker build -t grammy .
+
+    # Step 2: Run container and build frontend
+    echo -e "\n${YELLOW}🏗️  Running frontend build in Docker...${NC}"
+    FRONTEND_PATH="$(pwd)"
+    docker run --rm -v "${FRONTEND_PATH}/dist:/out" grammy sh -c "npm run build && cp -r dist/* /out"
+    echo -e "${GREEN}✅ Frontend built successfully${NC}"
+    cd ..
+    $CHANGES record frontend
+else
+    echo -e "\n${GREEN}✅ frontend/src unchanged, skipping frontend build${NC}"
+fi
 
-# Step 3: Deploy with CDK
-echo -e "\n${YELLOW}🌥️  Running CDK deploy...${NC}"
 cd infrastructure/grammy
 
-if [ "$NO_PROMPT" = true ]; then
-    cdk deploy --require-approval=never
+# Step 3: Synthesize, unless nothing the app reads has changed
+if $CHANGES synth-needed; then
+    echo -e "\n${YELLOW}🧩 Running CDK synth...${NC}"
+    cdk synth -q
+    $CHANGES record synth
+else
+    echo -e "\n${GREEN}✅ Inputs unchanged, reusing cdk.out${NC}"
+fi
+
+# Step 4: Deploy the stacks whose templates changed
+STACKS=$($CHANGES changed-stacks cdk.out)
+if [ -z "$STACKS" ]; then
+    echo -e "\n${GREEN}✅ No stack changed, nothing to deploy${NC}"
 else
-    cdk deploy GrammyDataStack GrammyBackendStack GrammyFrontendStack
+    echo -e "\n${YELLOW}🌥️  Running CDK deploy for:${NC} $(echo $STACKS)"
+    if [ "$NO_PROMPT" = true ]; then
+        cdk deploy --app cdk.out --exclusively --require-approval=never $STACKS
+    else
+        cdk deploy --app cdk.out --exclusively $STACKS
+    fi
+    $CHANGES record stacks cdk.out $STACKS
 fi
 
 cd ../..
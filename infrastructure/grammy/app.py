@@ -18,14 +18,20 @@ backend_stack = BackendStack(
     "GrammyBackendStack",
     table_name=data_stack.table.table_name,
     table_arn=data_stack.table.table_arn,
+    table_stream_arn=data_stack.table.table_stream_arn,
+    backup_bucket_name=data_stack.backup_bucket.bucket_name,
+    assets_bucket_name=data_stack.assets_bucket.bucket_name,
 )
 
 frontend_stack = FrontendStack(
     app,
     "GrammyFrontendStack",
-    api_url=backend_stack.base_api.url,
+    api_domain_name=backend_stack.api_domain_name,
+    api_stage_name=backend_stack.base_api.deployment_stage.stage_name,
     user_pool_id=backend_stack.user_pool.user_pool_id,
     user_pool_client_id=backend_stack.user_pool_client.user_pool_client_id,
+    assets_bucket_domain_name=data_stack.assets_bucket.bucket_regional_domain_name,
+    asset_key_group_id=backend_stack.asset_key_group_id,
 )
 
 # Add explicit dependencies
@@ -1,16 +1,74 @@
 """API Gateway route definitions and builders."""
-from typing import NamedTuple, List, Optional
+import re
+from collections import Counter
+from typing import Dict, NamedTuple, List, Optional, Sequence, Tuple
+from aws_cdk import Duration
 from aws_cdk import aws_apigateway as apigateway
+from aws_cdk import aws_cognito as cognito
 from aws_cdk import aws_lambda as _lambda
+from constructs import Construct
 
 
 class RouteConfig(NamedTuple):
     """Configuration for an API Gateway route."""
     path: str
     method: str
-    lambda_function: _lambda.Function
+    lambda_function: _lambda.IFunction
     api_key_required: bool = False
     auth_required: bool = True  # NEW
+    # Stage caching; 0 disables caching for the route
+    cache_ttl_seconds: int = 0
+    # Query string parameters that are part of the cache key
+    cache_key_parameters: Sequence[str] = ()
+    # Authorizer result caching: how long a verified token is trusted
+    # without re-checking it (0 disables), and the request parameter holding
+    # the token, which is the authorizer cache key
+    authorizer_cache_ttl_seconds: int = 300
+    authorizer_identity_source: str = "method.request.header.Authorization"
+    # Stage method throttling, for all callers together: steady requests
+    # per second and bucket size; None leaves the stage default
+    throttle_rate_limit: Optional[float] = None
+    throttle_burst_limit: Optional[int] = None
+
+
+def _authorizer_key(route: RouteConfig) -> Tuple[int, str]:
+    return route.authorizer_cache_ttl_seconds, route.authorizer_identity_source
+
+
+def create_authorizers(
+    scope: Construct,
+    construct_id: str,
+    user_pools: List[cognito.IUserPool],
+    routes: List[RouteConfig],
+) -> Dict[Tuple[int, str], apigateway.IAuthorizer]:
+    """Create one Cognito authorizer per caching setting used by ``routes``.
+
+    Result caching is a property of the authorizer, not of the method, so
+    routes with the same TTL and identity source share an authorizer. The
+    one for the defaults keeps ``construct_id``.
+    """
+    default_key = (
+        RouteConfig._field_defaults["authorizer_cache_ttl_seconds"],
+        RouteConfig._field_defaults["authorizer_identity_source"],
+    )
+    authorizers = {}
+    for route in routes:
+        key = _authorizer_key(route)
+        if not route.auth_required or key in authorizers:
+            continue
+        ttl, identity_source = key
+        authorizers[key] = apigateway.CognitoUserPoolsAuthorizer(
+            scope,
+            (
+                construct_id
+                if key == default_key
+                else f"{construct_id}-{identity_source.rsplit('.', 1)[-1]}-{ttl}s"
+            ),
+            cognito_user_pools=user_pools,
+            identity_source=identity_source,
+            results_cache_ttl=Duration.seconds(ttl),
+        )
+    return authorizers
 
 
 def _get_or_create_resource(root: apigateway.IResource, path: str) -> apigateway.IResource:
@@ -24,28 +82,133 @@ def _get_or_create_resource(root: apigateway.IResource, path: str) -> apigateway
     return current
 
 
+def _cache_key_parameters(route: RouteConfig) -> List[str]:
+    """Return the request parameters a cached response is keyed on.
+
+    Path parameters, ``If-None-Match`` and ``Accept-Encoding`` are always
+    part of the key, so different items, conditional requests and content
+    codings never share a cache entry.
+    """
+    if not route.cache_ttl_seconds:
+        return []
+    return (
+        [f"method.request.path.{name}" for name in re.findall(r"{(\w+)}", route.path)]
+        + [f"method.request.querystring.{name}" for name in route.cache_key_parameters]
+        + [
+            "method.request.header.If-None-Match",
+            "method.request.header.Accept-Encoding",
+        ]
+    )
+
+
+def _method_setting(
+    route: RouteConfig,
+) -> Optional[apigateway.CfnStage.MethodSettingProperty]:
+    """Return the stage method setting for ``route``'s caching and throttling."""
+    throttled = (
+        route.throttle_rate_limit is not None or route.throttle_burst_limit is not None
+    )
+    if not route.cache_ttl_seconds and not throttled:
+        return None
+    return apigateway.CfnStage.MethodSettingProperty(
+        http_method=route.method,
+        resource_path="/" + ("/" + route.path.strip("/")).replace("/", "~1"),
+        caching_enabled=bool(route.cache_ttl_seconds) or None,
+        cache_ttl_in_seconds=route.cache_ttl_seconds or None,
+        throttling_rate_limit=route.throttle_rate_limit,
+        throttling_burst_limit=route.throttle_burst_limit,
+    )
+
+
+def _add_method_settings(
+    base_api: apigateway.RestApi,
+    method_settings: List[apigateway.CfnStage.MethodSettingProperty],
+    cache_cluster_size: Optional[str],
+) -> None:
+    """Add method settings to the API's deployment stage.
+
+    The cache cluster is provisioned only when ``cache_cluster_size`` is
+    given, i.e. when a route enables caching.
+    """
+    stage = base_api.deployment_stage.node.default_child
+    if cache_cluster_size:
+        stage.cache_cluster_enabled = True
+        stage.cache_cluster_size = cache_cluster_size
+    stage.method_settings = list(stage.method_settings or []) + method_settings
+
+
+def _create_usage_plans(
+    base_api: apigateway.RestApi, usage_plans: Sequence[dict]
+) -> Dict[str, apigateway.UsagePlan]:
+    """Create one usage plan, with its own API key, per tier.
+
+    A plan throttles and meters each of its keys separately; it applies to
+    routes with ``api_key_required``, which reject requests without a key.
+    Key values are generated; read them with ``aws apigateway get-api-key
+    --include-value``.
+    """
+    plans = {}
+    for tier in usage_plans:
+        plan = base_api.add_usage_plan(
+            f"usage-plan-{tier['name']}",
+            name=f"{base_api.rest_api_name} {tier['name']}",
+            throttle=apigateway.ThrottleSettings(
+                rate_limit=tier["rate_limit"], burst_limit=tier["burst_limit"]
+            ),
+            quota=apigateway.QuotaSettings(
+                limit=tier["quota_per_day"], period=apigateway.Period.DAY
+            ),
+            api_stages=[apigateway.UsagePlanPerApiStage(stage=base_api.deployment_stage)],
+        )
+        plan.add_api_key(base_api.add_api_key(f"api-key-{tier['name']}"))
+        plans[tier["name"]] = plan
+    return plans
+
+
 def create_api_routes(
     base_api: apigateway.RestApi,
     routes: List[RouteConfig],
-    authorizer: Optional[apigateway.IAuthorizer] = None,
+    authorizers: Optional[Dict[Tuple[int, str], apigateway.IAuthorizer]] = None,
+    cache_cluster_size: str = "0.5",
+    usage_plans: Sequence[dict] = (),
 ) -> None:
-    """Create API Gateway routes from configuration."""
+    """Create API Gateway routes from configuration.
+
+    ``authorizers`` are keyed by caching setting, see ``create_authorizers``.
+    ``usage_plans`` are created when a route requires an API key, see
+    ``_create_usage_plans``.
+    """
+    method_settings = []
+    # Router-mode functions serve many routes; one API-wide invoke permission
+    # keeps their resource policy from growing with every route.
+    routes_per_function = Counter(route.lambda_function.node.path for route in routes)
     for route in routes:
         resource = _get_or_create_resource(base_api.root, route.path)
+        cache_key_parameters = _cache_key_parameters(route)
+        request_parameters = {
+            parameter: parameter.startswith("method.request.path.")
+            for parameter in cache_key_parameters
+        }
 
         integration = apigateway.LambdaIntegration(
             route.lambda_function,
             proxy=True,
+            cache_key_parameters=cache_key_parameters or None,
+            scope_permission_to_method=routes_per_function[route.lambda_function.node.path] == 1,
         )
+        method_setting = _method_setting(route)
+        if method_setting:
+            method_settings.append(method_setting)
 
         # CDK 2.1012: ustawienia przekazujemy jako keyword args, bez MethodOptions/options=
-        if authorizer and route.auth_required:
+        if authorizers and route.auth_required:
             resource.add_method(
                 route.method,
                 integration,
                 api_key_required=route.api_key_required,
                 authorization_type=apigateway.AuthorizationType.COGNITO,
-                authorizer=authorizer,
+                authorizer=authorizers[_authorizer_key(route)],
+                request_parameters=request_parameters or None,
             )
         else:
             resource.add_method(
@@ -53,4 +216,14 @@ def create_api_routes(
                 integration,
                 api_key_required=route.api_key_required,
                 authorization_type=apigateway.AuthorizationType.NONE,
+                request_parameters=request_parameters or None,
             )
+
+    if method_settings:
+        _add_method_settings(
+            base_api,
+            method_settings,
+            cache_cluster_size if any(route.cache_ttl_seconds for route in routes) else None,
+        )
+    if any(route.api_key_required for route in routes):
+        _create_usage_plans(base_api, usage_plans)
@@ -1,18 +1,104 @@
 """Backend Stack - Lambda, API Gateway, Cognito, IAM"""
+import json
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Optional
 from aws_cdk import (
     Stack,
     CfnOutput,
     RemovalPolicy,
     Duration,
+    Size,
+    ArnFormat,
     aws_lambda as _lambda,
+    aws_lambda_event_sources as event_sources,
+    aws_dynamodb as dynamodb,
     aws_apigateway as apigateway,
+    aws_cloudfront as cloudfront,
     aws_cognito as cognito,
     aws_iam as iam,
+    aws_logs as logs,
+    aws_xray as xray,
+    aws_s3 as s3,
+    aws_secretsmanager as secretsmanager,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_sqs as sqs,
+    aws_sns as sns,
+    aws_sns_subscriptions as subscriptions,
+    aws_cloudwatch as cloudwatch,
+    aws_cloudwatch_actions as cloudwatch_actions,
 )
 from constructs import Construct
-from .config import PROJECT_NAME, HANDLERS, ROUTES, CLOUDFRONT_DOMAIN
-from .handlers import create_lambda_function
-from .api_routes import create_api_routes, RouteConfig
+from .config import (
+    PROJECT_NAME,
+    BACKEND,
+    HANDLERS,
+    ROUTES,
+    CLOUDFRONT_DOMAIN,
+    SHARED_LAYER,
+    API_CACHE_CLUSTER_SIZE,
+    DEPLOYMENT_MODE,
+    API_LOGGING_LEVEL,
+    API_DATA_TRACE_ENABLED,
+    TRACE_SAMPLING_RATE,
+    API_MIN_COMPRESSION_BYTES,
+    API_BINARY_MEDIA_TYPES,
+    STREAM_HANDLERS,
+    STREAM_SOURCES,
+    JOB_HANDLERS,
+    SCHEDULED_JOBS,
+    ASSET_HANDLERS,
+    ASSET_EVENT_HANDLERS,
+    SONG_ASSETS_PATH,
+    SONG_ASSET_PART_SIZE_MB,
+    SONG_ASSET_MAX_SIZE_MB,
+    SONG_ASSET_URL_EXPIRY_SECONDS,
+    SONG_ASSET_SIGNING_PUBLIC_KEY_FILE,
+    SONG_ASSET_SIGNING_SECRET,
+    SONG_ASSET_UNSIGNED_DOWNLOADS,
+    AUTHORIZER_CACHE_TTL_SECONDS,
+    AUTHORIZER_IDENTITY_SOURCE,
+    READ_THROTTLE,
+    WRITE_THROTTLE,
+    WRITE_DURATION_SECONDS,
+    ACCOUNT_CONCURRENCY_LIMIT,
+    RESERVED_CONCURRENCY_SHARE,
+    USAGE_PLANS,
+    BACKUP_EXPORT_HANDLER,
+    BACKUP_EXPORT_SEGMENTS,
+    FULL_EXPORT_INTERVAL_DAYS,
+    BACKUP_RESTORE_HANDLER,
+    BACKUP_RESTORE_TABLES,
+    STREAM_FAILURE_RETENTION_DAYS,
+    ALARM_EMAIL,
+    IDEMPOTENCY_TTL_SECONDS,
+)
+from .handlers import (
+    HandlerConfig,
+    create_lambda_alias,
+    create_lambda_function,
+    create_router_config,
+    create_shared_layer,
+)
+from .api_routes import create_api_routes, create_authorizers, RouteConfig
+
+
+# One JSON line per request: enough to see where the time went without
+# logging request and response bodies
+ACCESS_LOG_FIELDS = {
+    "requestId": apigateway.AccessLogField.context_request_id(),
+    "traceId": apigateway.AccessLogField.context_xray_trace_id(),
+    "method": apigateway.AccessLogField.context_http_method(),
+    "resource": apigateway.AccessLogField.context_resource_path(),
+    "status": apigateway.AccessLogField.context_status(),
+    "responseLength": apigateway.AccessLogField.context_response_length(),
+    "responseLatency": apigateway.AccessLogField.context_response_latency(),
+    "integrationLatency": apigateway.AccessLogField.context_integration_latency(),
+    "integrationStatus": apigateway.AccessLogField.context_integration_status(),
+    "errorType": apigateway.AccessLogField.context_error_response_type(),
+}
 
 
 class BackendStack(Stack):
@@ -24,12 +110,27 @@ class BackendStack(Stack):
         construct_id: str,
         table_name: str,
         table_arn: str,
+        table_stream_arn: str,
+        backup_bucket_name: str,
+        assets_bucket_name: str,
         **kwargs
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         self.table_name = table_name
         self.table_arn = table_arn
+        self.table = dynamodb.Table.from_table_attributes(
+            self,
+            f"{PROJECT_NAME}-table",
+            table_arn=table_arn,
+            table_stream_arn=table_stream_arn,
+        )
+        self.backup_bucket = s3.Bucket.from_bucket_name(
+            self, f"{PROJECT_NAME}-backup-bucket", backup_bucket_name
+        )
+        self.assets_bucket = s3.Bucket.from_bucket_name(
+            self, f"{PROJECT_NAME}-assets-bucket", assets_bucket_name
+        )
 
         # ───────────── Cognito User Pool ─────────────
         self.user_pool = cognito.UserPool(
@@ -59,20 +160,48 @@ class BackendStack(Stack):
 
         # ───────────── API Gateway ─────────────
         self.base_api = self._create_api_gateway()
+        # Origin of the distribution's /api/* behaviors
+        self.api_domain_name = (
+            f"{self.base_api.rest_api_id}.execute-api.{self.region}.{self.url_suffix}"
+        )
+
+        # ───────────── Song asset download signing ─────────────
+        # The distribution only serves assets with URLs signed by this key
+        self.asset_public_key = self._create_asset_signing_key()
+        self.asset_key_group_id = None
+        if self.asset_public_key is not None:
+            self.asset_key_group_id = cloudfront.KeyGroup(
+                self,
+                f"{PROJECT_NAME}-asset-key-group",
+                items=[self.asset_public_key],
+            ).key_group_id
+
+        # ───────────── Shared Lambda layer ─────────────
+        self.shared_layer = create_shared_layer(self, SHARED_LAYER, PROJECT_NAME)
 
         # ───────────── Lambda functions ─────────────
         self.lambda_functions = self._create_lambda_functions()
 
-        # ───────────── Cognito Authorizer ─────────────
-        self.authorizer = apigateway.CognitoUserPoolsAuthorizer(
-            self.base_api,
-            f"{PROJECT_NAME}-authorizer",
-            cognito_user_pools=[self.user_pool],
-            identity_source="method.request.header.Authorization",
+        # ───────────── Alarms ─────────────
+        self.alarm_topic = sns.Topic(
+            self, f"{PROJECT_NAME}-alarms", topic_name=f"{PROJECT_NAME}-alarms"
         )
+        if ALARM_EMAIL:
+            self.alarm_topic.add_subscription(
+                subscriptions.EmailSubscription(ALARM_EMAIL)
+            )
+
+        # ───────────── Stream consumers ─────────────
+        self.stream_functions = self._create_stream_consumers()
+
+        # ───────────── Song asset events ─────────────
+        self.asset_event_functions = self._create_asset_consumers()
 
-        # ───────────── API Routes ─────────────
-        self._create_routes(self.base_api, self.lambda_functions, self.authorizer)
+        # ───────────── Jobs ─────────────
+        self.job_functions = self._create_jobs()
+
+        # ───────────── API Routes and Cognito Authorizers ─────────────
+        self.authorizers = self._create_routes(self.base_api, self.lambda_functions)
 
         # ───────────── Outputs ─────────────
         CfnOutput(
@@ -96,10 +225,19 @@ class BackendStack(Stack):
 
     def _create_api_gateway(self) -> apigateway.RestApi:
         """Create and configure API Gateway."""
-        return apigateway.RestApi(
+        stage_name = "dev"
+        access_logs = logs.LogGroup(
+            self,
+            f"{PROJECT_NAME}-api-access-logs",
+            retention=logs.RetentionDays.TWO_WEEKS,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        api = apigateway.RestApi(
             self,
             f"{PROJECT_NAME}-base-api",
             rest_api_name=f"{PROJECT_NAME} Base API",
+            min_compression_size=Size.bytes(API_MIN_COMPRESSION_BYTES),
+            binary_media_types=API_BINARY_MEDIA_TYPES,
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=[
                     f"https://{CLOUDFRONT_DOMAIN}",
@@ -109,50 +247,452 @@ class BackendStack(Stack):
                 allow_headers=[
                     "Content-Type",
                     "Authorization",
+                    "X-Api-Key",
+                    "Idempotency-Key",
                 ],
             ),
             deploy_options=apigateway.StageOptions(
-                stage_name="dev",
-                logging_level=apigateway.MethodLoggingLevel.INFO,
+                stage_name=stage_name,
+                logging_level=apigateway.MethodLoggingLevel(API_LOGGING_LEVEL),
                 metrics_enabled=True,
-                data_trace_enabled=True,
+                data_trace_enabled=API_DATA_TRACE_ENABLED,
+                tracing_enabled=True,
+                access_log_destination=apigateway.LogGroupLogDestination(access_logs),
+                access_log_format=apigateway.AccessLogFormat.custom(
+                    json.dumps(ACCESS_LOG_FIELDS)
+                ),
+            ),
+        )
+
+        # Sample traces at the API; Lambda follows the sampling decision
+        xray.CfnSamplingRule(
+            self,
+            f"{PROJECT_NAME}-api-sampling-rule",
+            sampling_rule=xray.CfnSamplingRule.SamplingRuleProperty(
+                rule_name=f"{PROJECT_NAME}-api",
+                priority=100,
+                fixed_rate=TRACE_SAMPLING_RATE,
+                reservoir_size=1,
+                service_name=f"{api.rest_api_name}/{stage_name}",
+                service_type="AWS::ApiGateway::Stage",
+                host="*",
+                http_method="*",
+                url_path="*",
+                resource_arn="*",
+                version=1,
             ),
         )
+        return api
 
     def _create_lambda_functions(self) -> dict:
-        """Create all Lambda functions and return mapping by name."""
+        """Create all Lambda functions and return mapping by handler name.
+
+        Values are what API Gateway invokes: the ``live`` alias for functions
+        that publish versions, otherwise the function. In router modes
+        several handler names map to the same function.
+        """
+        # For grammy_common.auth, which verifies tokens against this pool
+        auth_environment = {
+            "USER_POOL_ID": self.user_pool.user_pool_id,
+            "USER_POOL_CLIENT_ID": self.user_pool_client.user_pool_client_id,
+        }
+        handler_configs = self._budget_reserved_concurrency(
+            [self._reserve_write_concurrency(handler_config) for handler_config in HANDLERS]
+        )
+        if DEPLOYMENT_MODE == "per_route":
+            return {
+                handler_config.name: self._create_lambda_function(
+                    handler_config,
+                    environment={
+                        "WRITE_ROUTES": json.dumps(self._write_routes([handler_config])),
+                        **auth_environment,
+                    },
+                    assets=handler_config.name in ASSET_HANDLERS,
+                )
+                for handler_config in handler_configs
+            }
+
+        groups = defaultdict(list)
+        for handler_config in handler_configs:
+            groups[self._router_group(handler_config)].append(handler_config)
+
         lambda_functions = {}
-        for handler_config in HANDLERS:
-            fn = create_lambda_function(self, handler_config, PROJECT_NAME)
-            if fn.log_group:
-                fn.log_group.apply_removal_policy(RemovalPolicy.DESTROY)
-            
-            # Grant DynamoDB access
-            fn.add_environment("TABLE_NAME", self.table_name)
+        for group, handler_configs in groups.items():
+            fn = self._create_lambda_function(
+                create_router_config(group, handler_configs, BACKEND),
+                environment={
+                    "ROUTE_TABLE": json.dumps(self._route_table(handler_configs)),
+                    "WRITE_ROUTES": json.dumps(self._write_routes(handler_configs)),
+                    **auth_environment,
+                },
+                assets=any(
+                    handler_config.name in ASSET_HANDLERS
+                    for handler_config in handler_configs
+                ),
+            )
+            for handler_config in handler_configs:
+                lambda_functions[handler_config.name] = fn
+        return lambda_functions
+
+    def _create_stream_consumers(self) -> dict:
+        """Create the table's stream consumers and return them by handler name.
+
+        Only changes to items with the configured key prefixes reach a
+        consumer, and it reports failed records, so a bad record is retried
+        on its own instead of blocking its shard. Records still failing after
+        the retries are sent to the consumer's failure queue, which alarms.
+        """
+        handler_configs = {config.name: config for config in STREAM_HANDLERS}
+        stream_functions = {}
+        for source in STREAM_SOURCES:
+            fn = self._create_lambda_function(handler_configs[source["handler"]])
+            if source.get("backup_bucket"):
+                self._grant_backups(fn)
+            filters = []
+            if "key_prefixes" in source:
+                filters.append(
+                    _lambda.FilterCriteria.filter(
+                        {
+                            "dynamodb": {
+                                "Keys": {
+                                    "PK": {
+                                        "S": [
+                                            {"prefix": prefix}
+                                            for prefix in source["key_prefixes"]
+                                        ]
+                                    }
+                                }
+                            }
+                        }
+                    )
+                )
+            failures = sqs.Queue(
+                self,
+                f"{PROJECT_NAME}-{source['handler']}-failures",
+                retention_period=Duration.days(STREAM_FAILURE_RETENTION_DAYS),
+                enforce_ssl=True,
+            )
+            alarm = cloudwatch.Alarm(
+                self,
+                f"{PROJECT_NAME}-{source['handler']}-failures-alarm",
+                alarm_description=(
+                    f"{source['handler']} gave up on stream records; "
+                    "they are in its failure queue"
+                ),
+                metric=failures.metric_approximate_number_of_messages_visible(
+                    period=Duration.minutes(5), statistic="Maximum"
+                ),
+                threshold=1,
+                evaluation_periods=1,
+                comparison_operator=(
+                    cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD
+                ),
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+            )
+            alarm.add_alarm_action(cloudwatch_actions.SnsAction(self.alarm_topic))
+            fn.add_event_source(
+                event_sources.DynamoEventSource(
+                    self.table,
+                    starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+                    batch_size=source["batch_size"],
+                    max_batching_window=Duration.seconds(
+                        source["max_batching_window_seconds"]
+                    ),
+                    report_batch_item_failures=True,
+                    bisect_batch_on_error=source.get("bisect_batch_on_error", True),
+                    retry_attempts=source.get("retry_attempts", 10),
+                    on_failure=event_sources.SqsDlq(failures),
+                    filters=filters or None,
+                )
+            )
+            stream_functions[source["handler"]] = fn
+        return stream_functions
+
+    def _create_asset_consumers(self) -> dict:
+        """Create the song asset event consumers, by handler name.
+
+        The assets bucket is in DataStack, which cannot refer to functions
+        of this stack, so its "Object Created" events come through
+        EventBridge rather than bucket notifications.
+        """
+        asset_event_functions = {}
+        for handler_config in ASSET_EVENT_HANDLERS:
+            fn = self._create_lambda_function(handler_config)
+            self.assets_bucket.grant_read(fn, f"{SONG_ASSETS_PATH}/*")
+            self.assets_bucket.grant_delete(fn, f"{SONG_ASSETS_PATH}/*")
+            for key, value in self._asset_environment().items():
+                fn.add_environment(key, value)
+            events.Rule(
+                self,
+                f"{PROJECT_NAME}-{handler_config.name}-events",
+                event_pattern=events.EventPattern(
+                    source=["aws.s3"],
+                    detail_type=["Object Created"],
+                    detail={
+                        "bucket": {"name": [self.assets_bucket.bucket_name]},
+                        "object": {"key": [{"prefix": f"{SONG_ASSETS_PATH}/"}]},
+                    },
+                ),
+                targets=[targets.LambdaFunction(fn)],
+            )
+            asset_event_functions[handler_config.name] = fn
+        return asset_event_functions
+
+    def _create_jobs(self) -> dict:
+        """Create the scheduled and on-demand jobs, by handler name.
+
+        Jobs work on backups: they get the backup bucket and may Scan the
+        table, which API handlers may not. The export job may invoke itself,
+        once per segment, and the restore job may also write to tables named
+        like ``BACKUP_RESTORE_TABLES``.
+        """
+        job_functions = {}
+        for handler_config in JOB_HANDLERS:
+            fn = self._create_lambda_function(handler_config)
+            self._grant_backups(fn)
             fn.add_to_role_policy(
                 iam.PolicyStatement(
-                    actions=[
-                        "dynamodb:GetItem",
-                        "dynamodb:PutItem",
-                        "dynamodb:UpdateItem",
-                        "dynamodb:DeleteItem",
-                        "dynamodb:Query",
-                        "dynamodb:Scan",
-                    ],
-                    resources=[self.table_arn],
+                    actions=["dynamodb:Scan"], resources=[self.table_arn]
                 )
             )
-            
-            lambda_functions[handler_config.name] = fn
-        return lambda_functions
+            if handler_config.name == BACKUP_EXPORT_HANDLER:
+                # By name: the function's own ARN would make its role
+                # policy depend on it, and it on the policy
+                fn.add_to_role_policy(
+                    iam.PolicyStatement(
+                        actions=["lambda:InvokeFunction"],
+                        resources=[
+                            self.format_arn(
+                                service="lambda",
+                                resource="function",
+                                resource_name=(
+                                    f"{PROJECT_NAME}-{handler_config.function_name}"
+                                ),
+                                arn_format=ArnFormat.COLON_RESOURCE_NAME,
+                            )
+                        ],
+                    )
+                )
+            if handler_config.name == BACKUP_RESTORE_HANDLER:
+                fn.add_to_role_policy(
+                    iam.PolicyStatement(
+                        actions=["dynamodb:BatchWriteItem"],
+                        resources=[
+                            self.format_arn(
+                                service="dynamodb",
+                                resource="table",
+                                resource_name=BACKUP_RESTORE_TABLES,
+                            )
+                        ],
+                    )
+                )
+                fn.add_environment("RESTORE_TABLES", BACKUP_RESTORE_TABLES)
+            job_functions[handler_config.name] = fn
+        for job in SCHEDULED_JOBS:
+            events.Rule(
+                self,
+                f"{PROJECT_NAME}-{job['handler']}-schedule",
+                schedule=events.Schedule.expression(job["schedule"]),
+                targets=[targets.LambdaFunction(job_functions[job["handler"]])],
+            )
+        return job_functions
+
+    def _grant_backups(self, fn: _lambda.IFunction) -> None:
+        """Give ``fn`` the backup bucket and the export settings."""
+        self.backup_bucket.grant_read_write(fn)
+        fn.add_environment("BACKUP_BUCKET", self.backup_bucket.bucket_name)
+        fn.add_environment("EXPORT_SEGMENTS", str(BACKUP_EXPORT_SEGMENTS))
+        fn.add_environment(
+            "FULL_EXPORT_INTERVAL_DAYS", str(FULL_EXPORT_INTERVAL_DAYS)
+        )
+
+    def _create_asset_signing_key(self) -> Optional[cloudfront.PublicKey]:
+        """Return the CloudFront key that signs asset downloads, if configured."""
+        if not SONG_ASSET_SIGNING_PUBLIC_KEY_FILE:
+            return None
+        with open(SONG_ASSET_SIGNING_PUBLIC_KEY_FILE) as file:
+            encoded_key = file.read()
+        return cloudfront.PublicKey(
+            self,
+            f"{PROJECT_NAME}-asset-signing-key",
+            encoded_key=encoded_key,
+            comment="Signs song asset download URLs",
+        )
+
+    def _asset_environment(self) -> Dict[str, str]:
+        """Return the settings of grammy_common.assets."""
+        environment = {
+            "ASSETS_BUCKET": self.assets_bucket.bucket_name,
+            "ASSETS_PATH": SONG_ASSETS_PATH,
+            "ASSETS_DOMAIN": CLOUDFRONT_DOMAIN,
+            "ASSET_PART_SIZE_MB": str(SONG_ASSET_PART_SIZE_MB),
+            "ASSET_MAX_SIZE_MB": str(SONG_ASSET_MAX_SIZE_MB),
+            "ASSET_URL_EXPIRY_SECONDS": str(SONG_ASSET_URL_EXPIRY_SECONDS),
+        }
+        if self.asset_public_key is not None:
+            environment["ASSET_SIGNING_KEY_PAIR_ID"] = self.asset_public_key.public_key_id
+            environment["ASSET_SIGNING_KEY_SECRET"] = SONG_ASSET_SIGNING_SECRET
+        elif SONG_ASSET_UNSIGNED_DOWNLOADS:
+            environment["ASSET_UNSIGNED_DOWNLOADS"] = "1"
+        return environment
+
+    def _grant_assets(self, fn: _lambda.IFunction) -> None:
+        """Let ``fn`` start and complete asset uploads and sign downloads."""
+        # Presigned part URLs act with the function's permissions
+        self.assets_bucket.grant_put(fn, f"{SONG_ASSETS_PATH}/*")
+        for key, value in self._asset_environment().items():
+            fn.add_environment(key, value)
+        if self.asset_public_key is not None:
+            secretsmanager.Secret.from_secret_name_v2(
+                self, f"{fn.node.id}-asset-signing-secret", SONG_ASSET_SIGNING_SECRET
+            ).grant_read(fn)
+
+    @staticmethod
+    def _route_throttle(route_def: dict) -> dict:
+        """Return a route's throttle: its own, else the one for writes or reads."""
+        if route_def.get("write"):
+            return route_def.get("throttle", WRITE_THROTTLE)
+        return route_def.get("throttle", READ_THROTTLE)
+
+    @classmethod
+    def _reserve_write_concurrency(cls, handler_config: HandlerConfig) -> HandlerConfig:
+        """Reserve concurrency for a handler that only serves write routes.
+
+        Enough for the routes' burst at ``WRITE_DURATION_SECONDS`` each; API
+        Gateway throttles beyond that anyway. Router functions sum the
+        reservations of their handlers, and reserve nothing if one of them
+        serves reads.
+        """
+        if handler_config.reserved_concurrency is not None:
+            return handler_config
+        route_defs = [
+            route_def for route_def in ROUTES if route_def["handler"] == handler_config.name
+        ]
+        if not route_defs or not all(route_def.get("write") for route_def in route_defs):
+            return handler_config
+        burst = sum(
+            cls._route_throttle(route_def)["burst_limit"] for route_def in route_defs
+        )
+        return handler_config._replace(
+            reserved_concurrency=math.ceil(burst * WRITE_DURATION_SECONDS)
+        )
+
+    @staticmethod
+    def _budget_reserved_concurrency(handler_configs: list) -> list:
+        """Scale reservations down to fit the account's concurrency limit.
+
+        All reservations together stay within RESERVED_CONCURRENCY_SHARE of
+        ACCOUNT_CONCURRENCY_LIMIT, leaving Lambda's 100 unreserved.
+        """
+        budget = max(
+            0,
+            min(
+                math.floor(ACCOUNT_CONCURRENCY_LIMIT * RESERVED_CONCURRENCY_SHARE),
+                ACCOUNT_CONCURRENCY_LIMIT - 100,
+            ),
+        )
+        reserved = sum(
+            handler_config.reserved_concurrency or 0 for handler_config in handler_configs
+        )
+        if reserved <= budget:
+            return handler_configs
+        scaled = []
+        for handler_config in handler_configs:
+            if handler_config.reserved_concurrency:
+                concurrency = handler_config.reserved_concurrency * budget // reserved
+                handler_config = handler_config._replace(
+                    reserved_concurrency=concurrency or None
+                )
+            scaled.append(handler_config)
+        return scaled
+
+    @staticmethod
+    def _router_group(handler_config: HandlerConfig) -> str:
+        """Return the router function a handler is bundled into."""
+        if DEPLOYMENT_MODE == "single":
+            return "api"
+        if DEPLOYMENT_MODE == "per_resource":
+            return os.path.relpath(handler_config.code_path, BACKEND).split(os.sep)[0]
+        raise ValueError(f"Unknown DEPLOYMENT_MODE: {DEPLOYMENT_MODE}")
+
+    @staticmethod
+    def _route_table(handler_configs: list) -> dict:
+        """Map "<METHOD> /<path>" to handler code paths relative to BACKEND."""
+        code_paths = {
+            handler_config.name: os.path.relpath(
+                handler_config.code_path, BACKEND
+            ).replace(os.sep, "/")
+            for handler_config in handler_configs
+        }
+        return {
+            f"{route_def.get('method', 'GET')} /{route_def['path']}": (
+                code_paths[route_def["handler"]]
+            )
+            for route_def in ROUTES
+            if route_def["handler"] in code_paths
+        }
+
+    @staticmethod
+    def _write_routes(handler_configs: list) -> list:
+        """Return "<METHOD> /<path>" of the write routes the handlers serve."""
+        names = {handler_config.name for handler_config in handler_configs}
+        return [
+            f"{route_def['method']} /{route_def['path']}"
+            for route_def in ROUTES
+            if route_def["handler"] in names and route_def.get("write")
+        ]
+
+    def _create_lambda_function(
+        self,
+        handler_config: HandlerConfig,
+        environment: Optional[Dict[str, str]] = None,
+        assets: bool = False,
+    ) -> _lambda.IFunction:
+        """Create one Lambda function with the shared layer and table access.
+
+        With ``assets``, the function also gets the song assets bucket.
+        """
+        fn = create_lambda_function(
+            self, handler_config, PROJECT_NAME, layers=[self.shared_layer]
+        )
+        for key, value in (environment or {}).items():
+            fn.add_environment(key, value)
+        if assets:
+            self._grant_assets(fn)
+        if fn.log_group:
+            fn.log_group.apply_removal_policy(RemovalPolicy.DESTROY)
+        
+        # Grant DynamoDB access; listings are paged Queries, so no Scan
+        fn.add_environment("TABLE_NAME", self.table_name)
+        fn.add_environment("COMPRESSION_MIN_BYTES", str(API_MIN_COMPRESSION_BYTES))
+        fn.add_environment("IDEMPOTENCY_TTL_SECONDS", str(IDEMPOTENCY_TTL_SECONDS))
+        fn.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "dynamodb:GetItem",
+                    "dynamodb:PutItem",
+                    "dynamodb:UpdateItem",
+                    "dynamodb:DeleteItem",
+                    "dynamodb:BatchGetItem",
+                    "dynamodb:BatchWriteItem",
+                ],
+                resources=[self.table_arn],
+            )
+        )
+        fn.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:Query"],
+                resources=[self.table_arn, f"{self.table_arn}/index/*"],
+            )
+        )
+        return create_lambda_alias(fn, handler_config) or fn
 
     def _create_routes(
         self,
         base_api: apigateway.RestApi,
         lambda_functions: dict,
-        authorizer: apigateway.CognitoUserPoolsAuthorizer,
-    ) -> None:
-        """Create API routes."""
+    ) -> dict:
+        """Create API routes and return their authorizers."""
         routes = [
             RouteConfig(
                 path=route_def["path"],
@@ -160,7 +700,42 @@ class BackendStack(Stack):
                 lambda_function=lambda_functions[route_def["handler"]],
                 api_key_required=route_def.get("api_key_required", False),
                 auth_required=route_def.get("auth_required", True),
+                cache_ttl_seconds=route_def.get("cache_ttl_seconds", 0),
+                cache_key_parameters=route_def.get("cache_key_parameters", ()),
+                authorizer_cache_ttl_seconds=route_def.get(
+                    "authorizer_cache_ttl_seconds", AUTHORIZER_CACHE_TTL_SECONDS
+                ),
+                authorizer_identity_source=route_def.get(
+                    "authorizer_identity_source", AUTHORIZER_IDENTITY_SOURCE
+                ),
+                throttle_rate_limit=self._route_throttle(route_def)["rate_limit"],
+                throttle_burst_limit=self._route_throttle(route_def)["burst_limit"],
             )
             for route_def in ROUTES
         ]
-        create_api_routes(base_api, routes, authorizer=authorizer)
+        authorizers = create_authorizers(
+            base_api, f"{PROJECT_NAME}-authorizer", [self.user_pool], routes
+        )
+        create_api_routes(
+            base_api,
+            routes,
+            authorizers=authorizers,
+            cache_cluster_size=API_CACHE_CLUSTER_SIZE,
+            usage_plans=USAGE_PLANS,
+        )
+        self._convert_preflight_to_text(base_api)
+        return authorizers
+
+    @staticmethod
+    def _convert_preflight_to_text(base_api: apigateway.RestApi) -> None:
+        """Keep the CORS preflight mock integrations working.
+
+        With every media type binary, API Gateway passes the mock request
+        template through as binary and the mock cannot read its status code;
+        the preflight methods convert it to text instead.
+        """
+        for method in base_api.methods:
+            if method.http_method == "OPTIONS":
+                method.node.default_child.add_property_override(
+                    "Integration.ContentHandling", "CONVERT_TO_TEXT"
+                )
@@ -0,0 +1,248 @@
+"""Content-hashed Lambda artifacts.
+
+``Code.from_asset`` on a directory makes CDK fingerprint and zip the whole
+tree on every synth, including ``__pycache__`` and other build litter, so an
+unchanged handler can still get a new asset hash and be uploaded again.
+Instead, each code directory is bundled once per content hash into a
+deterministic zip under ``BUNDLE_DIR``:
+
+    build/assets/<name>-<sha256>.zip
+
+The hash covers the relative path and bytes of every bundled file. File
+digests are cached by size and modification time in ``HASH_CACHE``, so a
+synth only reads the files that changed.
+
+Third-party packages are declared in a ``requirements.txt`` next to the
+handler code. They are installed into the bundle as binary wheels for the
+function's platform and Python version, which are part of the hash too, so
+pip only runs when the requirements, the code or the runtime change. A zip whose hash already exists is
+reused as is; CDK stages it under the same hash, and ``cdk deploy`` skips the
+upload when the asset is already in the bootstrap bucket.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from aws_cdk import aws_lambda as _lambda
+
+INFRASTRUCTURE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Overridable so benchmarks can synth from an empty build directory.
+BUILD_DIR = os.environ.get("GRAMMY_BUILD_DIR") or os.path.join(INFRASTRUCTURE, "build")
+BUNDLE_DIR = os.path.join(BUILD_DIR, "assets")
+HASH_CACHE = os.path.join(BUILD_DIR, "file-hashes.json")
+
+# Never shipped: bytecode, caches and editor/OS files.
+EXCLUDE = (
+    "__pycache__",
+    "*.pyc",
+    "*.pyo",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    ".DS_Store",
+    "*.swp",
+)
+
+# Fixed timestamp so the same files always give a byte-identical zip.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+REQUIREMENTS = "requirements.txt"
+# Wheel platform for each Lambda architecture
+PIP_PLATFORMS = {
+    _lambda.Architecture.ARM_64.name: "manylinux2014_aarch64",
+    _lambda.Architecture.X86_64.name: "manylinux2014_x86_64",
+}
+
+_file_hashes: Dict[str, list] = {}
+_cache_loaded = False
+_cache_dirty = False
+_lock = threading.Lock()
+
+
+def _excluded(name: str) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in EXCLUDE)
+
+
+def _files(
+    root: str, include: Optional[Sequence[str]] = None
+) -> Iterator[Tuple[str, str]]:
+    """Yield ``(relative path, absolute path)`` of bundled files, sorted.
+
+    With ``include``, only those subdirectories of ``root`` are bundled.
+    """
+    tops = [os.path.join(root, sub) for sub in sorted(include)] if include else [root]
+    for top in tops:
+        for directory, subdirectories, names in os.walk(top):
+            subdirectories[:] = sorted(d for d in subdirectories if not _excluded(d))
+            for name in sorted(names):
+                if _excluded(name):
+                    continue
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, root).replace(os.sep, "/"), path
+
+
+def _load_cache() -> None:
+    global _cache_loaded
+    if _cache_loaded:
+        return
+    _cache_loaded = True
+    try:
+        with open(HASH_CACHE) as file:
+            _file_hashes.update(json.load(file))
+    except (OSError, ValueError):
+        pass
+
+
+def _save_cache() -> None:
+    global _cache_dirty
+    if not _cache_dirty:
+        return
+    _cache_dirty = False
+    os.makedirs(os.path.dirname(HASH_CACHE), exist_ok=True)
+    temporary = f"{HASH_CACHE}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(_file_hashes, file)
+    os.replace(temporary, HASH_CACHE)
+
+
+def _file_hash(path: str) -> str:
+    global _cache_dirty
+    stat = os.stat(path)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    _file_hashes[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    _cache_dirty = True
+    return digest.hexdigest()
+
+
+def _requirements(root: str, include: Optional[Sequence[str]] = None) -> list:
+    """Return the requirements files bundled from ``root``."""
+    return [
+        path
+        for relative, path in _files(root, include)
+        if os.path.basename(relative) == REQUIREMENTS
+    ]
+
+
+def _install_requirements(
+    root: str,
+    target: str,
+    platform: Tuple[str, str],
+    include: Optional[Sequence[str]] = None,
+) -> None:
+    """Install the wheels ``root`` requires for ``platform`` into ``target``."""
+    pip_platform, python_version = platform
+    for requirements in _requirements(root, include):
+        subprocess.run(
+            [
+                sys.executable, "-m", "pip", "install", "--quiet",
+                "--requirement", requirements,
+                "--target", target,
+                "--platform", pip_platform,
+                "--python-version", python_version,
+                "--implementation", "cp",
+                "--only-binary=:all:",
+                "--no-compile",
+            ],
+            check=True,
+        )
+
+
+def content_hash(
+    root: str,
+    platform: Optional[Tuple[str, str]] = None,
+    include: Optional[Sequence[str]] = None,
+) -> str:
+    """Return the hash of the files ``root`` bundles.
+
+    ``platform`` is the (wheel platform, Python version) that requirements
+    are installed for; it only counts when ``root`` has requirements.
+    ``include`` limits the bundle to some subdirectories of ``root``.
+    """
+    with _lock:
+        _load_cache()
+        digest = hashlib.sha256()
+        if platform and _requirements(root, include):
+            digest.update("/".join(platform).encode())
+            digest.update(b"\0")
+        for relative, path in _files(root, include):
+            digest.update(relative.encode())
+            digest.update(b"\0")
+            digest.update(_file_hash(path).encode())
+            digest.update(b"\0")
+        _save_cache()
+    return digest.hexdigest()
+
+
+def _write_zip(path: str, roots: list) -> None:
+    """Zip the files of ``roots``, ``(root, include)`` pairs, into ``path``."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, include in roots:
+            for relative, file_path in _files(root, include):
+                info = zipfile.ZipInfo(relative, ZIP_DATE_TIME)
+                info.external_attr = 0o644 << 16
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(file_path, "rb") as file:
+                    archive.writestr(info, file.read())
+
+
+def bundle(
+    root: str,
+    name: str,
+    platform: Optional[Tuple[str, str]] = None,
+    include: Optional[Sequence[str]] = None,
+) -> str:
+    """Return the zip of ``root``, building it if its content changed."""
+    digest = content_hash(root, platform, include)
+    path = os.path.join(BUNDLE_DIR, f"{name}-{digest}.zip")
+    if os.path.exists(path):
+        return path
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    temporary = f"{path}.tmp"
+    if platform and _requirements(root, include):
+        with tempfile.TemporaryDirectory() as packages:
+            _install_requirements(root, packages, platform, include)
+            _write_zip(temporary, [(packages, None), (root, include)])
+    else:
+        _write_zip(temporary, [(root, include)])
+    os.replace(temporary, path)
+    # Older bundles of the same code are superseded.
+    pattern = re.compile(re.escape(name) + r"-[0-9a-f]{64}\.zip")
+    for stale in os.listdir(BUNDLE_DIR):
+        if pattern.fullmatch(stale) and stale != os.path.basename(path):
+            os.remove(os.path.join(BUNDLE_DIR, stale))
+    return path
+
+
+def asset_code(
+    root: str,
+    name: str,
+    runtime: Optional[_lambda.Runtime] = None,
+    architecture: Optional[_lambda.Architecture] = None,
+    include: Optional[Sequence[str]] = None,
+) -> _lambda.Code:
+    """Return Lambda code for ``root`` from its content-hashed bundle.
+
+    ``runtime`` and ``architecture`` select the wheels of its requirements;
+    ``include`` limits the bundle to some subdirectories of ``root``.
+    """
+    platform = None
+    if runtime is not None and architecture is not None:
+        platform = (
+            PIP_PLATFORMS[architecture.name],
+            runtime.name.removeprefix("python"),
+        )
+    return _lambda.Code.from_asset(bundle(root, name, platform, include))
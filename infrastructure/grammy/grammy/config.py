@@ -2,19 +2,151 @@
 
 Routes now support specifying HTTP methods. Each route is a dict with
 `path`, `handler` (the `HandlerConfig.name`) and optional `method`.
+Cacheable GET routes also set `cache_ttl_seconds` and the query string
+`cache_key_parameters` their responses vary on. Routes that also set
+`edge_cache` are cached by CloudFront as well, for the same TTL and keyed on
+the same parameters.
 """
 import os
-from typing import List, Dict
+from typing import Any, List, Dict
 from .handlers import HandlerConfig
 
 
 # Project constants
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
 BACKEND = os.path.join(PROJECT_ROOT, "backend")
+# Lambda layer with the `grammy_common` package imported by every handler
+SHARED_LAYER = os.path.join(BACKEND, "shared")
 PROJECT_NAME = "grammy"
 
 # CloudFront domain for CORS - update if your distribution domain changes
 CLOUDFRONT_DOMAIN = "d3cfmp200ge6w8.cloudfront.net"
+# Id of that distribution, the CloudFrontDistributionId output of the frontend
+# stack. Only this distribution may read the song assets bucket, so asset
+# downloads work once it is set. DataStack is deployed before the
+# distribution exists and cannot refer to it.
+CLOUDFRONT_DISTRIBUTION_ID = os.environ.get("GRAMMY_DISTRIBUTION_ID")
+# The distribution also serves the API under this path, so the SPA calls it
+# same-origin, without CORS preflights. CORS remains for direct callers and
+# the local dev server.
+API_PATH_PREFIX = "api"
+
+# Frontend caching: Vite writes content-hashed files to assets/, which never
+# change once deployed; the entry files (index.html, config.js) that name
+# them are revalidated by browsers and kept briefly at the edge, and are the
+# only paths invalidated on deploy
+FRONTEND_ASSETS_PATH = "assets"
+FRONTEND_ASSET_MAX_AGE_DAYS = 365
+FRONTEND_ENTRY_EDGE_TTL_SECONDS = 60
+
+# Global secondary indexes of DataStack.table, in the order they were added,
+# with their projections; the key layout of each is documented in
+# grammy_common.keys. DynamoDB creates at most one GSI per table update, so
+# an existing table is brought up to date one index per deploy: set
+# GRAMMY_TABLE_INDEXES to the number of indexes to deploy (the first n of
+# TABLE_INDEXES), one more each time. A new table gets them all at once.
+TABLE_INDEXES = [
+    ("GSI1", "ALL"),
+    ("GSI2", "KEYS_ONLY"),
+    ("GSI3", "ALL"),
+    ("GSI4", "ALL"),
+]
+TABLE_INDEX_COUNT = int(os.environ.get("GRAMMY_TABLE_INDEXES", len(TABLE_INDEXES)))
+
+# Lambda deployment mode:
+#   "per_route"    - one function per HandlerConfig
+#   "per_resource" - one router function per resource (projects, songs, ...)
+#   "single"       - one router function for the whole API
+# Router functions dispatch in-process on `httpMethod` and `resource` and
+# emit per-route metrics, so routes share warm containers.
+DEPLOYMENT_MODE = "per_route"
+
+# API Gateway stage logging: execution logs only for errors, one structured
+# access log line per request instead of full request/response data tracing,
+# and X-Ray traces for a sample of requests
+API_LOGGING_LEVEL = "ERROR"
+API_DATA_TRACE_ENABLED = False
+TRACE_SAMPLING_RATE = 0.05
+
+# API Gateway stage cache, provisioned only when a route enables caching
+API_CACHE_CLUSTER_SIZE = "0.5"
+REFERENCE_CACHE_TTL_SECONDS = 300
+LIST_CACHE_KEY_PARAMETERS = ["limit", "cursor", "from", "to", "fields"]
+ITEM_CACHE_KEY_PARAMETERS = ["fields"]
+
+# Cognito authorizer result caching: a verified token is trusted for this
+# long without being checked again; routes may set their own
+# `authorizer_cache_ttl_seconds` (0 disables caching) and
+# `authorizer_identity_source`. Handlers read the caller from the verified
+# claims with grammy_common.auth.
+AUTHORIZER_CACHE_TTL_SECONDS = 300
+AUTHORIZER_IDENTITY_SOURCE = "method.request.header.Authorization"
+
+# Throttling: each route gets stage method limits for all callers together,
+# `rate_limit` requests per second with bursts up to `burst_limit`. Routes
+# that change data are marked `"write": True` in ROUTES (a POST that only
+# computes, like transpose, is not) and default to WRITE_THROTTLE, the others
+# to READ_THROTTLE; a route may set its own `throttle`. A handler that serves
+# only writes also gets reserved concurrency for its burst limit at
+# WRITE_DURATION_SECONDS per request, unless its HandlerConfig sets
+# `reserved_concurrency`: a write storm is capped in Lambda too, and the
+# unreserved pool stays with reads.
+READ_THROTTLE = {"rate_limit": 500, "burst_limit": 1000}
+WRITE_THROTTLE = {"rate_limit": 50, "burst_limit": 100}
+BATCH_THROTTLE = {"rate_limit": 5, "burst_limit": 10}
+WRITE_DURATION_SECONDS = 0.1
+# Batch writes run for seconds, so their handlers reserve this much instead
+BATCH_WRITE_CONCURRENCY = 10
+# Reservations come out of the account's Lambda concurrency limit (1000 by
+# default, as low as 10 on new accounts), of which Lambda keeps 100
+# unreserved. Together they may take RESERVED_CONCURRENCY_SHARE of the
+# limit; beyond that every reservation is scaled down, and one that would
+# round to nothing is dropped rather than set to 0, which blocks a function.
+ACCOUNT_CONCURRENCY_LIMIT = int(os.environ.get("GRAMMY_ACCOUNT_CONCURRENCY", "1000"))
+RESERVED_CONCURRENCY_SHARE = 0.2
+
+# Usage plans for routes with `api_key_required` (the batch routes): one API
+# key per tier, each throttled and given a daily quota per key
+USAGE_PLANS: List[Dict[str, Any]] = [
+    {"name": "standard", "rate_limit": 2, "burst_limit": 5, "quota_per_day": 2000},
+    {"name": "bulk", "rate_limit": 5, "burst_limit": 10, "quota_per_day": 50000},
+]
+
+# Song assets (audio, tabs, stems) move directly between clients and the
+# assets bucket in DataStack: the API only hands out presigned multipart
+# upload URLs, one per part, and download URLs on the CloudFront
+# distribution, which serves the bucket's SONG_ASSETS_PATH. Handlers in
+# ASSET_HANDLERS get the bucket; ASSET_EVENT_HANDLERS receive the bucket's
+# "Object Created" events and record each asset on its song.
+SONG_ASSETS_PATH = "song-assets"
+SONG_ASSET_PART_SIZE_MB = 16
+SONG_ASSET_MAX_SIZE_MB = 2048
+SONG_ASSET_URL_EXPIRY_SECONDS = 3600
+# Multipart uploads that are never completed are aborted, parts and all
+SONG_ASSET_ABORT_UPLOAD_DAYS = 1
+# Download URLs are signed with a CloudFront key: its public key (PEM) is
+# read from this file at synth, and the private key (PEM) from the Secrets
+# Manager secret at run time. Without a public key file, the API hands out no
+# download URLs, unless unsigned downloads are turned on with
+# GRAMMY_ASSET_UNSIGNED_DOWNLOADS=1; only the unguessable asset ids then keep
+# assets private.
+SONG_ASSET_SIGNING_PUBLIC_KEY_FILE = os.environ.get("GRAMMY_ASSET_SIGNING_KEY")
+SONG_ASSET_SIGNING_SECRET = f"{PROJECT_NAME}/song-asset-signing-key"
+SONG_ASSET_UNSIGNED_DOWNLOADS = os.environ.get("GRAMMY_ASSET_UNSIGNED_DOWNLOADS") == "1"
+
+# Idempotency: requests to routes marked `"write": True` in ROUTES that
+# carry an Idempotency-Key header run at most once per key and caller; the
+# response is kept in the table for IDEMPOTENCY_TTL_SECONDS, expiring through
+# its TTL attribute, and replayed to retries (see grammy_common.idempotency).
+# Functions get the setting, and their write routes as WRITE_ROUTES, in
+# their environment.
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+
+# Compression: API Gateway compresses responses at least this large, and
+# handlers gzip them and return them as binary, which API Gateway passes
+# through for every media type (the CORS preflight mocks convert to text)
+API_MIN_COMPRESSION_BYTES = 1024
+API_BINARY_MEDIA_TYPES = ["*/*"]
 
 # Handler configurations
 HANDLERS: List[HandlerConfig] = [
@@ -43,11 +175,29 @@ HANDLERS: List[HandlerConfig] = [
         function_name="projects-put-handler",
         code_path=os.path.join(BACKEND, "projects/put"),
     ),
+    HandlerConfig(
+        name="ProjectsPatchHandler",
+        function_name="projects-patch-handler",
+        code_path=os.path.join(BACKEND, "projects/patch"),
+    ),
     HandlerConfig(
         name="ProjectsDeleteHandler",
         function_name="projects-delete-handler",
         code_path=os.path.join(BACKEND, "projects/delete"),
     ),
+    HandlerConfig(
+        name="ProjectsBatchPostHandler",
+        function_name="projects-batch-post-handler",
+        code_path=os.path.join(BACKEND, "projects/batch_post"),
+        timeout_seconds=29,
+        reserved_concurrency=BATCH_WRITE_CONCURRENCY,
+    ),
+    HandlerConfig(
+        name="ProjectsBatchGetHandler",
+        function_name="projects-batch-get-handler",
+        code_path=os.path.join(BACKEND, "projects/batch_get"),
+        timeout_seconds=29,
+    ),
     HandlerConfig(
         name="SongsGetHandler",
         function_name="songs-get-handler",
@@ -68,11 +218,53 @@ HANDLERS: List[HandlerConfig] = [
         function_name="songs-put-handler",
         code_path=os.path.join(BACKEND, "songs/put")
     ),
+    HandlerConfig(
+        name="SongsPatchHandler",
+        function_name="songs-patch-handler",
+        code_path=os.path.join(BACKEND, "songs/patch")
+    ),
     HandlerConfig(
         name="SongsDeleteHandler",
         function_name="songs-delete-handler",
         code_path=os.path.join(BACKEND, "songs/delete")
     ),
+    HandlerConfig(
+        name="SongsBatchPostHandler",
+        function_name="songs-batch-post-handler",
+        code_path=os.path.join(BACKEND, "songs/batch_post"),
+        timeout_seconds=29,
+        reserved_concurrency=BATCH_WRITE_CONCURRENCY,
+    ),
+    HandlerConfig(
+        name="SongsBatchGetHandler",
+        function_name="songs-batch-get-handler",
+        code_path=os.path.join(BACKEND, "songs/batch_get"),
+        timeout_seconds=29,
+    ),
+    # Ships NumPy (see its requirements.txt); the extra memory is CPU for the
+    # array work
+    HandlerConfig(
+        name="SongsTransposeHandler",
+        function_name="songs-transpose-handler",
+        code_path=os.path.join(BACKEND, "songs/transpose"),
+        memory_size=1024,
+    ),
+    HandlerConfig(
+        name="SongsAssetUploadHandler",
+        function_name="songs-asset-upload-handler",
+        code_path=os.path.join(BACKEND, "songs/asset_upload"),
+    ),
+    HandlerConfig(
+        name="SongsAssetCompleteHandler",
+        function_name="songs-asset-complete-handler",
+        code_path=os.path.join(BACKEND, "songs/asset_complete"),
+    ),
+    # Ships cryptography, to sign CloudFront URLs
+    HandlerConfig(
+        name="SongsAssetDownloadHandler",
+        function_name="songs-asset-download-handler",
+        code_path=os.path.join(BACKEND, "songs/asset_download"),
+    ),
     HandlerConfig(
         name="InstrumentsGetHandler",
         function_name="instruments-get-handler",
@@ -93,11 +285,29 @@ HANDLERS: List[HandlerConfig] = [
         function_name="instruments-put-handler",
         code_path=os.path.join(BACKEND, "instruments/put"),
     ),
+    HandlerConfig(
+        name="InstrumentsPatchHandler",
+        function_name="instruments-patch-handler",
+        code_path=os.path.join(BACKEND, "instruments/patch"),
+    ),
     HandlerConfig(
         name="InstrumentsDeleteHandler",
         function_name="instruments-delete-handler",
         code_path=os.path.join(BACKEND, "instruments/delete"),
     ),
+    HandlerConfig(
+        name="InstrumentsBatchPostHandler",
+        function_name="instruments-batch-post-handler",
+        code_path=os.path.join(BACKEND, "instruments/batch_post"),
+        timeout_seconds=29,
+        reserved_concurrency=BATCH_WRITE_CONCURRENCY,
+    ),
+    HandlerConfig(
+        name="InstrumentsBatchGetHandler",
+        function_name="instruments-batch-get-handler",
+        code_path=os.path.join(BACKEND, "instruments/batch_get"),
+        timeout_seconds=29,
+    ),
     HandlerConfig(
         name="TuningsGetHandler",
         function_name="tunings-get-handler",
@@ -118,35 +328,335 @@ HANDLERS: List[HandlerConfig] = [
         function_name="tunings-put-handler",
         code_path=os.path.join(BACKEND, "tunings/put"),
     ),
+    HandlerConfig(
+        name="TuningsPatchHandler",
+        function_name="tunings-patch-handler",
+        code_path=os.path.join(BACKEND, "tunings/patch"),
+    ),
     HandlerConfig(
         name="TuningsDeleteHandler",
         function_name="tunings-delete-handler",
         code_path=os.path.join(BACKEND, "tunings/delete"),
     ),
+    HandlerConfig(
+        name="TuningsBatchPostHandler",
+        function_name="tunings-batch-post-handler",
+        code_path=os.path.join(BACKEND, "tunings/batch_post"),
+        timeout_seconds=29,
+        reserved_concurrency=BATCH_WRITE_CONCURRENCY,
+    ),
+    HandlerConfig(
+        name="TuningsBatchGetHandler",
+        function_name="tunings-batch-get-handler",
+        code_path=os.path.join(BACKEND, "tunings/batch_get"),
+        timeout_seconds=29,
+    ),
+    # The search index lives in memory, and more memory also means more CPU
+    HandlerConfig(
+        name="SearchGetHandler",
+        function_name="search-get-handler",
+        code_path=os.path.join(BACKEND, "search/get"),
+        memory_size=1024,
+    ),
+]
+
+# Stream consumers: functions fed by the table's DynamoDB stream instead of
+# API routes. Each source names a handler in STREAM_HANDLERS, the `PK`
+# prefixes of the items whose changes it receives (all of them when omitted;
+# entity items are keyed `<TYPE>#<id>`), whether
+# it writes to the backup bucket, and how records are batched.
+STREAM_HANDLERS: List[HandlerConfig] = [
+    HandlerConfig(
+        name="SearchIndexerHandler",
+        function_name="search-indexer",
+        code_path=os.path.join(BACKEND, "search/indexer"),
+        timeout_seconds=60,
+    ),
+    HandlerConfig(
+        name="SummaryAggregatorHandler",
+        function_name="summary-aggregator",
+        code_path=os.path.join(BACKEND, "summaries/aggregator"),
+        timeout_seconds=60,
+    ),
+    HandlerConfig(
+        name="BackupChangesHandler",
+        function_name="backup-changes",
+        code_path=os.path.join(BACKEND, "backup/changes"),
+        timeout_seconds=60,
+    ),
+]
+
+STREAM_SOURCES: List[Dict[str, Any]] = [
+    {
+        "handler": "SearchIndexerHandler",
+        "key_prefixes": ["PROJECT#", "SONG#", "INSTRUMENT#", "TUNING#"],
+        "batch_size": 100,
+        "max_batching_window_seconds": 1,
+    },
+    {
+        "handler": "SummaryAggregatorHandler",
+        "key_prefixes": ["PROJECT#", "SONG#", "INSTRUMENT#", "TUNING#"],
+        "batch_size": 100,
+        "max_batching_window_seconds": 5,
+        # Retries must start where a summary transaction started
+        "bisect_batch_on_error": False,
+    },
+    # Every change, one delta object per batch
+    {
+        "handler": "BackupChangesHandler",
+        "backup_bucket": True,
+        "batch_size": 1000,
+        "max_batching_window_seconds": 60,
+    },
+]
+# Records a consumer still fails after its retries go to a failure queue of
+# its own instead of being dropped; a message there raises an alarm, sent to
+# this address when set
+STREAM_FAILURE_RETENTION_DAYS = 14
+ALARM_EMAIL = os.environ.get("GRAMMY_ALARM_EMAIL")
+
+ASSET_HANDLERS = [
+    "SongsAssetUploadHandler",
+    "SongsAssetCompleteHandler",
+    "SongsAssetDownloadHandler",
+]
+
+ASSET_EVENT_HANDLERS: List[HandlerConfig] = [
+    HandlerConfig(
+        name="SongAssetRecorderHandler",
+        function_name="song-asset-recorder",
+        code_path=os.path.join(BACKEND, "songs/asset_recorder"),
+    ),
+]
+
+# Jobs: functions invoked on a schedule or by hand, not through the API. They
+# get read/write access to the backup bucket and may Scan the table.
+# Segments of the parallel full export Scan, one invocation of the export
+# job each
+BACKUP_EXPORT_HANDLER = "BackupExportHandler"
+BACKUP_EXPORT_SEGMENTS = 16
+# Between full exports, backups are the stream deltas
+FULL_EXPORT_INTERVAL_DAYS = 7
+# Restores write to this stack's table or to a new one named like this
+BACKUP_RESTORE_HANDLER = "BackupRestoreHandler"
+BACKUP_RESTORE_TABLES = f"{PROJECT_NAME}-restore-*"
+
+JOB_HANDLERS: List[HandlerConfig] = [
+    # Memory also buys CPU and network bandwidth: 1769 MB is one full vCPU,
+    # for compressing a segment
+    HandlerConfig(
+        name="BackupExportHandler",
+        function_name="backup-export",
+        code_path=os.path.join(BACKEND, "backup/export"),
+        timeout_seconds=900,
+        memory_size=1769,
+    ),
+    # Invoked by hand: {"export": "full/<started>/", "table": ..., "until": ...}
+    HandlerConfig(
+        name="BackupRestoreHandler",
+        function_name="backup-restore",
+        code_path=os.path.join(BACKEND, "backup/restore"),
+        timeout_seconds=900,
+        memory_size=3008,
+    ),
+]
+
+SCHEDULED_JOBS: List[Dict[str, Any]] = [
+    {"handler": "BackupExportHandler", "schedule": "rate(1 day)"},
 ]
 
 # API routes - list of route definitions supporting different HTTP methods
 # Example: {"path": "items", "handler": "ItemsHandler", "method": "POST"}
-ROUTES: List[Dict[str, str]] = [
+ROUTES: List[Dict[str, Any]] = [
     {"path": "health", "handler": "HealthHandler", "method": "GET"},
     {"path": "projects", "handler": "ProjectsGetHandler", "method": "GET"},
     {"path": "projects/{id}", "handler": "ProjectsGetIdHandler", "method": "GET"},
-    {"path": "projects", "handler": "ProjectsPostHandler", "method": "POST"},
-    {"path": "projects", "handler": "ProjectsPutHandler", "method": "PUT"},
-    {"path": "projects", "handler": "ProjectsDeleteHandler", "method": "DELETE"},
+    {
+        "path": "projects",
+        "handler": "ProjectsPostHandler",
+        "method": "POST",
+        "write": True,
+    },
+    {
+        "path": "projects",
+        "handler": "ProjectsPutHandler",
+        "method": "PUT",
+        "write": True,
+    },
+    {
+        "path": "projects/{id}",
+        "handler": "ProjectsPatchHandler",
+        "method": "PATCH",
+        "write": True,
+    },
+    {
+        "path": "projects",
+        "handler": "ProjectsDeleteHandler",
+        "method": "DELETE",
+        "write": True,
+    },
+    {
+        "path": "projects/batch",
+        "handler": "ProjectsBatchPostHandler",
+        "method": "POST",
+        "write": True,
+        "api_key_required": True,
+        "throttle": BATCH_THROTTLE,
+    },
+    {
+        "path": "projects/batch",
+        "handler": "ProjectsBatchGetHandler",
+        "method": "GET",
+        "api_key_required": True,
+    },
     {"path": "songs", "handler": "SongsGetHandler", "method": "GET"},
     {"path": "songs/{id}", "handler": "SongsGetIdHandler", "method": "GET"},
-    {"path": "songs", "handler": "SongsPostHandler", "method": "POST"},
-    {"path": "songs", "handler": "SongsPutHandler", "method": "PUT"},
-    {"path": "songs", "handler": "SongsDeleteHandler", "method": "DELETE"},
-    {"path": "instruments", "handler": "InstrumentsGetHandler", "method": "GET"},
-    {"path": "instruments/{id}", "handler": "InstrumentsGetIdHandler", "method": "GET"},
-    {"path": "instruments", "handler": "InstrumentsPostHandler", "method": "POST"},
-    {"path": "instruments", "handler": "InstrumentsPutHandler", "method": "PUT"},
-    {"path": "instruments", "handler": "InstrumentsDeleteHandler", "method": "DELETE"},
-    {"path": "tunings", "handler": "TuningsGetHandler", "method": "GET"},
-    {"path": "tunings/{id}", "handler": "TuningsGetIdHandler", "method": "GET"},
-    {"path": "tunings", "handler": "TuningsPostHandler", "method": "POST"},
-    {"path": "tunings", "handler": "TuningsPutHandler", "method": "PUT"},
-    {"path": "tunings", "handler": "TuningsDeleteHandler", "method": "DELETE"},
+    {"path": "songs", "handler": "SongsPostHandler", "method": "POST", "write": True},
+    {"path": "songs", "handler": "SongsPutHandler", "method": "PUT", "write": True},
+    {
+        "path": "songs/{id}",
+        "handler": "SongsPatchHandler",
+        "method": "PATCH",
+        "write": True,
+    },
+    {"path": "songs/{id}/transpose", "handler": "SongsTransposeHandler", "method": "POST"},
+    {
+        "path": "songs/{id}/assets",
+        "handler": "SongsAssetUploadHandler",
+        "method": "POST",
+        "write": True,
+    },
+    {
+        "path": "songs/{id}/assets/{assetId}/complete",
+        "handler": "SongsAssetCompleteHandler",
+        "method": "POST",
+        "write": True,
+    },
+    {
+        "path": "songs/{id}/assets/{assetId}",
+        "handler": "SongsAssetDownloadHandler",
+        "method": "GET",
+    },
+    {
+        "path": "songs",
+        "handler": "SongsDeleteHandler",
+        "method": "DELETE",
+        "write": True,
+    },
+    {
+        "path": "songs/batch",
+        "handler": "SongsBatchPostHandler",
+        "method": "POST",
+        "write": True,
+        "api_key_required": True,
+        "throttle": BATCH_THROTTLE,
+    },
+    {
+        "path": "songs/batch",
+        "handler": "SongsBatchGetHandler",
+        "method": "GET",
+        "api_key_required": True,
+    },
+    {
+        "path": "instruments",
+        "handler": "InstrumentsGetHandler",
+        "method": "GET",
+        "cache_ttl_seconds": REFERENCE_CACHE_TTL_SECONDS,
+        "cache_key_parameters": LIST_CACHE_KEY_PARAMETERS,
+        "edge_cache": True,
+    },
+    {
+        "path": "instruments/{id}",
+        "handler": "InstrumentsGetIdHandler",
+        "method": "GET",
+        "cache_ttl_seconds": REFERENCE_CACHE_TTL_SECONDS,
+        "cache_key_parameters": ITEM_CACHE_KEY_PARAMETERS,
+    },
+    {
+        "path": "instruments",
+        "handler": "InstrumentsPostHandler",
+        "method": "POST",
+        "write": True,
+    },
+    {
+        "path": "instruments",
+        "handler": "InstrumentsPutHandler",
+        "method": "PUT",
+        "write": True,
+    },
+    {
+        "path": "instruments/{id}",
+        "handler": "InstrumentsPatchHandler",
+        "method": "PATCH",
+        "write": True,
+    },
+    {
+        "path": "instruments",
+        "handler": "InstrumentsDeleteHandler",
+        "method": "DELETE",
+        "write": True,
+    },
+    {
+        "path": "instruments/batch",
+        "handler": "InstrumentsBatchPostHandler",
+        "method": "POST",
+        "write": True,
+        "api_key_required": True,
+        "throttle": BATCH_THROTTLE,
+    },
+    {
+        "path": "instruments/batch",
+        "handler": "InstrumentsBatchGetHandler",
+        "method": "GET",
+        "api_key_required": True,
+    },
+    {
+        "path": "tunings",
+        "handler": "TuningsGetHandler",
+        "method": "GET",
+        "cache_ttl_seconds": REFERENCE_CACHE_TTL_SECONDS,
+        "cache_key_parameters": LIST_CACHE_KEY_PARAMETERS,
+        "edge_cache": True,
+    },
+    {
+        "path": "tunings/{id}",
+        "handler": "TuningsGetIdHandler",
+        "method": "GET",
+        "cache_ttl_seconds": REFERENCE_CACHE_TTL_SECONDS,
+        "cache_key_parameters": ITEM_CACHE_KEY_PARAMETERS,
+    },
+    {
+        "path": "tunings",
+        "handler": "TuningsPostHandler",
+        "method": "POST",
+        "write": True,
+    },
+    {"path": "tunings", "handler": "TuningsPutHandler", "method": "PUT", "write": True},
+    {
+        "path": "tunings/{id}",
+        "handler": "TuningsPatchHandler",
+        "method": "PATCH",
+        "write": True,
+    },
+    {
+        "path": "tunings",
+        "handler": "TuningsDeleteHandler",
+        "method": "DELETE",
+        "write": True,
+    },
+    {
+        "path": "tunings/batch",
+        "handler": "TuningsBatchPostHandler",
+        "method": "POST",
+        "write": True,
+        "api_key_required": True,
+        "throttle": BATCH_THROTTLE,
+    },
+    {
+        "path": "tunings/batch",
+        "handler": "TuningsBatchGetHandler",
+        "method": "GET",
+        "api_key_required": True,
+    },
+    {"path": "search", "handler": "SearchGetHandler", "method": "GET"},
 ]
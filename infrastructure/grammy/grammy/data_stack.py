@@ -1,19 +1,28 @@
-"""Data Stack - DynamoDB, S3 backup, PITR"""
+"""Data Stack - DynamoDB, S3 backup and song assets, PITR"""
 from aws_cdk import (
     Stack,
     CfnOutput,
     RemovalPolicy,
     Duration,
     aws_dynamodb as dynamodb,
+    aws_iam as iam,
     aws_s3 as s3,
     aws_s3_deployment as s3deploy,
 )
 from constructs import Construct
-from .config import PROJECT_NAME
+from .config import (
+    PROJECT_NAME,
+    CLOUDFRONT_DOMAIN,
+    CLOUDFRONT_DISTRIBUTION_ID,
+    SONG_ASSETS_PATH,
+    SONG_ASSET_ABORT_UPLOAD_DAYS,
+    TABLE_INDEXES,
+    TABLE_INDEX_COUNT,
+)
 
 
 class DataStack(Stack):
-    """Stack for data-related resources: DynamoDB, backups, PITR."""
+    """Stack for data-related resources: DynamoDB, backups, song assets, PITR."""
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -33,9 +42,32 @@ class DataStack(Stack):
             ),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             point_in_time_recovery=True,  # Enable PITR
+            # Feeds the stream consumers in BackendStack (search indexer)
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+            # Expiry of idempotency records and search tombstones, in epoch
+            # seconds
+            time_to_live_attribute="ttl",
             removal_policy=RemovalPolicy.DESTROY,  # For development
         )
 
+        # ───────────── Sparse overloaded GSIs ─────────────
+        # Key layout per index is documented in backend/shared grammy_common.keys.
+        # DynamoDB creates one GSI per update: TABLE_INDEX_COUNT adds them to
+        # an existing table one deploy at a time (see config).
+        for index_name, projection_type in TABLE_INDEXES[:TABLE_INDEX_COUNT]:
+            self.table.add_global_secondary_index(
+                index_name=index_name,
+                partition_key=dynamodb.Attribute(
+                    name=f"{index_name}PK",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                sort_key=dynamodb.Attribute(
+                    name=f"{index_name}SK",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                projection_type=dynamodb.ProjectionType[projection_type],
+            )
+
         # ───────────── S3 Backup Bucket ─────────────
         self.backup_bucket = s3.Bucket(
             self,
@@ -52,9 +84,11 @@ class DataStack(Stack):
                             transition_after=Duration.days(30),
                             storage_class=s3.StorageClass.INFREQUENT_ACCESS,
                         ),
+                        # Instant retrieval: a restore reads old exports and
+                        # deltas with GetObject, which GLACIER would refuse
                         s3.Transition(
                             transition_after=Duration.days(90),
-                            storage_class=s3.StorageClass.GLACIER,
+                            storage_class=s3.StorageClass.GLACIER_INSTANT_RETRIEVAL,
                         ),
                     ],
                     expiration=Duration.days(365),
@@ -62,6 +96,57 @@ class DataStack(Stack):
             ],
         )
 
+        # ───────────── S3 Song Assets Bucket ─────────────
+        # Browsers upload parts with presigned URLs and read the ETags S3
+        # returns; new objects go to EventBridge, where BackendStack's
+        # recorder picks them up
+        self.assets_bucket = s3.Bucket(
+            self,
+            f"{PROJECT_NAME}-assets-bucket",
+            bucket_name=f"{PROJECT_NAME}-assets-{self.account}",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True,
+            event_bridge_enabled=True,
+            cors=[
+                s3.CorsRule(
+                    allowed_methods=[s3.HttpMethods.PUT],
+                    allowed_origins=[
+                        f"https://{CLOUDFRONT_DOMAIN}",
+                        "http://localhost:5173",
+                    ],
+                    allowed_headers=["*"],
+                    exposed_headers=["ETag"],
+                    max_age=3000,
+                )
+            ],
+            lifecycle_rules=[
+                s3.LifecycleRule(
+                    abort_incomplete_multipart_upload_after=Duration.days(
+                        SONG_ASSET_ABORT_UPLOAD_DAYS
+                    ),
+                )
+            ],
+        )
+        # Downloads go through the distribution's origin access control. The
+        # distribution is in FrontendStack, which depends on this stack, so
+        # the grant names it by its configured id; until that is set, no
+        # distribution may read assets.
+        if CLOUDFRONT_DISTRIBUTION_ID:
+            self.assets_bucket.add_to_resource_policy(
+                iam.PolicyStatement(
+                    actions=["s3:GetObject"],
+                    resources=[self.assets_bucket.arn_for_objects(f"{SONG_ASSETS_PATH}/*")],
+                    principals=[iam.ServicePrincipal("cloudfront.amazonaws.com")],
+                    conditions={
+                        "StringEquals": {
+                            "AWS:SourceArn": f"arn:aws:cloudfront::{self.account}:distribution/{CLOUDFRONT_DISTRIBUTION_ID}"
+                        }
+                    },
+                )
+            )
+
         # ───────────── Outputs ─────────────
         CfnOutput(
             self,
@@ -75,9 +160,21 @@ class DataStack(Stack):
             value=self.table.table_arn,
             export_name=f"{PROJECT_NAME}-table-arn",
         )
+        CfnOutput(
+            self,
+            "TableStreamArn",
+            value=self.table.table_stream_arn,
+            export_name=f"{PROJECT_NAME}-table-stream-arn",
+        )
         CfnOutput(
             self,
             "BackupBucketName",
             value=self.backup_bucket.bucket_name,
             export_name=f"{PROJECT_NAME}-backup-bucket",
         )
+        CfnOutput(
+            self,
+            "AssetsBucketName",
+            value=self.assets_bucket.bucket_name,
+            export_name=f"{PROJECT_NAME}-assets-bucket",
+        )
@@ -2,6 +2,7 @@
 from aws_cdk import (
     Stack,
     CfnOutput,
+    Duration,
     RemovalPolicy,
     aws_s3 as s3,
     aws_s3_deployment as s3deploy,
@@ -11,7 +12,40 @@ from aws_cdk import (
 )
 from constructs import Construct
 import json
-from .config import PROJECT_NAME
+from typing import Optional
+from .config import (
+    PROJECT_NAME,
+    API_PATH_PREFIX,
+    ROUTES,
+    FRONTEND_ASSETS_PATH,
+    FRONTEND_ASSET_MAX_AGE_DAYS,
+    FRONTEND_ENTRY_EDGE_TTL_SECONDS,
+    SONG_ASSETS_PATH,
+)
+
+
+# Paths without a file extension are SPA routes, served by index.html. This
+# replaces distribution-wide 403/404 error pages, which would also turn API
+# errors into index.html.
+SPA_ROUTING_FUNCTION = """
+function handler(event) {
+    var request = event.request;
+    if (request.uri.split("/").pop().indexOf(".") === -1) {
+        request.uri = "/index.html";
+    }
+    return request;
+}
+"""
+
+# /api/<path> on the distribution is /<stage>/<path> on API Gateway; the
+# stage is the origin path, this strips the prefix.
+API_PREFIX_FUNCTION = """
+function handler(event) {
+    var request = event.request;
+    request.uri = request.uri.substring(%d) || "/";
+    return request;
+}
+""" % (len(API_PATH_PREFIX) + 1)
 
 
 class FrontendStack(Stack):
@@ -21,9 +55,12 @@ class FrontendStack(Stack):
         self,
         scope: Construct,
         construct_id: str,
-        api_url: str,
+        api_domain_name: str,
+        api_stage_name: str,
         user_pool_id: str,
         user_pool_client_id: str,
+        assets_bucket_domain_name: str,
+        asset_key_group_id: Optional[str] = None,
         **kwargs
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -49,6 +86,58 @@ class FrontendStack(Stack):
             ),
         )
 
+        # ───────────── CloudFront Functions ─────────────
+        spa_routing = cloudfront.Function(
+            self,
+            "SpaRoutingFunction",
+            code=cloudfront.FunctionCode.from_inline(SPA_ROUTING_FUNCTION),
+            runtime=cloudfront.FunctionRuntime.JS_2_0,
+        )
+        api_prefix = cloudfront.Function(
+            self,
+            "ApiPrefixFunction",
+            code=cloudfront.FunctionCode.from_inline(API_PREFIX_FUNCTION),
+            runtime=cloudfront.FunctionRuntime.JS_2_0,
+        )
+
+        # ───────────── Frontend: cache policies ─────────────
+        # Hashed assets: cached for as long as CloudFront allows
+        asset_max_age = Duration.days(FRONTEND_ASSET_MAX_AGE_DAYS)
+        asset_cache_policy = cloudfront.CachePolicy(
+            self,
+            "AssetCachePolicy",
+            comment="Content-hashed frontend assets",
+            min_ttl=asset_max_age,
+            default_ttl=asset_max_age,
+            max_ttl=asset_max_age,
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True,
+        )
+        # Song assets: a new asset id for every upload, so objects never
+        # change; signed URLs differ per request but share the cache entry
+        song_asset_cache_policy = cloudfront.CachePolicy(
+            self,
+            "SongAssetCachePolicy",
+            comment="Song assets, immutable per asset id",
+            min_ttl=asset_max_age,
+            default_ttl=asset_max_age,
+            max_ttl=asset_max_age,
+            query_string_behavior=cloudfront.CacheQueryStringBehavior.none(),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True,
+        )
+        # Entry files and SPA routes: kept briefly, invalidated on deploy
+        entry_cache_policy = cloudfront.CachePolicy(
+            self,
+            "EntryCachePolicy",
+            comment="Frontend entry files",
+            min_ttl=Duration.seconds(0),
+            default_ttl=Duration.seconds(FRONTEND_ENTRY_EDGE_TTL_SECONDS),
+            max_ttl=Duration.seconds(FRONTEND_ENTRY_EDGE_TTL_SECONDS),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True,
+        )
+
         # ───────────── Frontend: CloudFront Distribution ─────────────
         self.distribution = cloudfront.CfnDistribution(
             self,
@@ -64,7 +153,54 @@ class FrontendStack(Stack):
                         s3_origin_config=cloudfront.CfnDistribution.S3OriginConfigProperty(
                             origin_access_identity=""
                         ),
-                    )
+                    ),
+                    cloudfront.CfnDistribution.OriginProperty(
+                        id="SongAssetsOrigin",
+                        domain_name=assets_bucket_domain_name,
+                        origin_access_control_id=oac.ref,
+                        s3_origin_config=cloudfront.CfnDistribution.S3OriginConfigProperty(
+                            origin_access_identity=""
+                        ),
+                    ),
+                    cloudfront.CfnDistribution.OriginProperty(
+                        id="ApiOrigin",
+                        domain_name=api_domain_name,
+                        origin_path=f"/{api_stage_name}",
+                        custom_origin_config=cloudfront.CfnDistribution.CustomOriginConfigProperty(
+                            origin_protocol_policy="https-only",
+                            origin_ssl_protocols=["TLSv1.2"],
+                        ),
+                    ),
+                ],
+                cache_behaviors=[
+                    cloudfront.CfnDistribution.CacheBehaviorProperty(
+                        path_pattern=f"/{FRONTEND_ASSETS_PATH}/*",
+                        target_origin_id="S3Origin",
+                        viewer_protocol_policy="redirect-to-https",
+                        allowed_methods=["GET", "HEAD"],
+                        cached_methods=["GET", "HEAD"],
+                        compress=True,
+                        cache_policy_id=asset_cache_policy.cache_policy_id,
+                    ),
+                    # Served as attachments, and never sniffed into HTML on
+                    # the application's origin
+                    cloudfront.CfnDistribution.CacheBehaviorProperty(
+                        path_pattern=f"/{SONG_ASSETS_PATH}/*",
+                        target_origin_id="SongAssetsOrigin",
+                        viewer_protocol_policy="https-only",
+                        allowed_methods=["GET", "HEAD"],
+                        cached_methods=["GET", "HEAD"],
+                        # Audio, video and archives are compressed already
+                        compress=False,
+                        cache_policy_id=song_asset_cache_policy.cache_policy_id,
+                        response_headers_policy_id=(
+                            cloudfront.ResponseHeadersPolicy.SECURITY_HEADERS.response_headers_policy_id
+                        ),
+                        trusted_key_groups=(
+                            [asset_key_group_id] if asset_key_group_id else None
+                        ),
+                    ),
+                    *self._api_cache_behaviors(api_prefix),
                 ],
                 default_cache_behavior=cloudfront.CfnDistribution.DefaultCacheBehaviorProperty(
                     target_origin_id="S3Origin",
@@ -72,23 +208,14 @@ class FrontendStack(Stack):
                     allowed_methods=["GET", "HEAD", "OPTIONS"],
                     cached_methods=["GET", "HEAD"],
                     compress=True,
-                    forwarded_values=cloudfront.CfnDistribution.ForwardedValuesProperty(
-                        query_string=False,
-                        cookies=cloudfront.CfnDistribution.CookiesProperty(forward="none"),
-                    ),
+                    cache_policy_id=entry_cache_policy.cache_policy_id,
+                    function_associations=[
+                        cloudfront.CfnDistribution.FunctionAssociationProperty(
+                            event_type="viewer-request",
+                            function_arn=spa_routing.function_arn,
+                        )
+                    ],
                 ),
-                custom_error_responses=[
-                    cloudfront.CfnDistribution.CustomErrorResponseProperty(
-                        error_code=403,
-                        response_code=200,
-                        response_page_path="/index.html",
-                    ),
-                    cloudfront.CfnDistribution.CustomErrorResponseProperty(
-                        error_code=404,
-                        response_code=200,
-                        response_page_path="/index.html",
-                    ),
-                ],
             ),
         )
 
@@ -108,7 +235,24 @@ class FrontendStack(Stack):
         )
 
         # ───────────── Deploy frontend with runtime config ─────────────
-        s3deploy.BucketDeployment(
+        # Hashed assets first and never pruned, so browsers still running
+        # the previous index.html can load its chunks
+        deploy_assets = s3deploy.BucketDeployment(
+            self,
+            "DeployFrontendAssets",
+            sources=[s3deploy.Source.asset("../../frontend/dist")],
+            destination_bucket=self.website_bucket,
+            exclude=["*"],
+            include=[f"{FRONTEND_ASSETS_PATH}/*"],
+            prune=False,
+            retain_on_delete=False,
+            cache_control=[
+                s3deploy.CacheControl.set_public(),
+                s3deploy.CacheControl.max_age(asset_max_age),
+                s3deploy.CacheControl.immutable(),
+            ],
+        )
+        deploy_entry = s3deploy.BucketDeployment(
             self,
             "DeployFrontend",
             sources=[
@@ -116,18 +260,30 @@ class FrontendStack(Stack):
                 s3deploy.Source.data(
                     "config.js",
                     "window.__GRAMMY_CONFIG__ = " + json.dumps({
-                        "API_URL": api_url.rstrip("/"),
+                        "API_URL": f"/{API_PATH_PREFIX}",
                         "USER_POOL_ID": user_pool_id,
                         "USER_POOL_CLIENT_ID": user_pool_client_id,
                     }) + ";",
                 ),
             ],
             destination_bucket=self.website_bucket,
+            exclude=[f"{FRONTEND_ASSETS_PATH}/*"],
             prune=True,
             retain_on_delete=False,
+            # Browsers revalidate every time; the edge keeps them briefly
+            cache_control=[
+                s3deploy.CacheControl.set_public(),
+                s3deploy.CacheControl.max_age(Duration.seconds(0)),
+                s3deploy.CacheControl.must_revalidate(),
+                s3deploy.CacheControl.s_max_age(
+                    Duration.seconds(FRONTEND_ENTRY_EDGE_TTL_SECONDS)
+                ),
+            ],
             distribution=self.distribution,
-            distribution_paths=["/*"],
+            # SPA routes are served as /index.html, so this covers them too
+            distribution_paths=["/index.html", "/config.js"],
         )
+        deploy_entry.node.add_dependency(deploy_assets)
 
         # ───────────── Outputs ─────────────
         CfnOutput(
@@ -148,3 +304,75 @@ class FrontendStack(Stack):
             value=self.distribution.ref,
             export_name=f"{PROJECT_NAME}-cloudfront-id",
         )
+
+    def _api_cache_behaviors(self, api_prefix: cloudfront.IFunction) -> list:
+        """Return the cache behaviors that route ``/api/*`` to API Gateway.
+
+        Routes with ``edge_cache`` get their own behavior whose cache key is
+        the route's query string parameters plus ``Authorization``, so only
+        callers holding the same token share an entry and the authorizer
+        still sees every token. Everything else under ``/api/*`` is not
+        cached. CloudFront never caches writes, so the per-route behaviors
+        pass them straight through too.
+        """
+        behaviors = []
+        for route_def in ROUTES:
+            if not route_def.get("edge_cache"):
+                continue
+            ttl = Duration.seconds(route_def["cache_ttl_seconds"])
+            cache_policy = cloudfront.CachePolicy(
+                self,
+                f"ApiCachePolicy-{route_def['path'].replace('/', '-')}",
+                comment=f"GET /{API_PATH_PREFIX}/{route_def['path']}",
+                min_ttl=Duration.seconds(0),
+                default_ttl=ttl,
+                max_ttl=ttl,
+                header_behavior=cloudfront.CacheHeaderBehavior.allow_list(
+                    "Authorization"
+                ),
+                query_string_behavior=cloudfront.CacheQueryStringBehavior.allow_list(
+                    *route_def.get("cache_key_parameters", ())
+                ),
+                cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+                enable_accept_encoding_gzip=True,
+                enable_accept_encoding_brotli=True,
+            )
+            behaviors.append(
+                self._api_behavior(
+                    f"/{API_PATH_PREFIX}/{route_def['path']}",
+                    cache_policy.cache_policy_id,
+                    api_prefix,
+                )
+            )
+        behaviors.append(
+            self._api_behavior(
+                f"/{API_PATH_PREFIX}/*",
+                cloudfront.CachePolicy.CACHING_DISABLED.cache_policy_id,
+                api_prefix,
+            )
+        )
+        return behaviors
+
+    @staticmethod
+    def _api_behavior(
+        path_pattern: str, cache_policy_id: str, api_prefix: cloudfront.IFunction
+    ) -> cloudfront.CfnDistribution.CacheBehaviorProperty:
+        """Return an API behavior; the API sees all viewer headers but Host."""
+        return cloudfront.CfnDistribution.CacheBehaviorProperty(
+            path_pattern=path_pattern,
+            target_origin_id="ApiOrigin",
+            viewer_protocol_policy="https-only",
+            allowed_methods=["GET", "HEAD", "OPTIONS", "PUT", "PATCH", "POST", "DELETE"],
+            cached_methods=["GET", "HEAD"],
+            compress=True,
+            cache_policy_id=cache_policy_id,
+            origin_request_policy_id=(
+                cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER.origin_request_policy_id
+            ),
+            function_associations=[
+                cloudfront.CfnDistribution.FunctionAssociationProperty(
+                    event_type="viewer-request",
+                    function_arn=api_prefix.function_arn,
+                )
+            ],
+        )
@@ -1,23 +1,136 @@
 """Lambda handler definitions and factory."""
-from typing import NamedTuple
+import os
+from typing import NamedTuple, Optional, Sequence, Tuple
 from aws_cdk import aws_lambda as _lambda, Duration
 
+from .bundling import asset_code
+
+
+DEFAULT_RUNTIME = _lambda.Runtime.PYTHON_3_14
+DEFAULT_ARCHITECTURE = _lambda.Architecture.ARM_64
+# Alias that API Gateway invokes when a function publishes versions
+LIVE_ALIAS = "live"
+
 
 class HandlerConfig(NamedTuple):
-    """Configuration for a Lambda handler."""
+    """Configuration for a Lambda handler.
+
+    ``tracing`` enables X-Ray active tracing, which the handlers' telemetry
+    decorator extends with per-route subsegments.
+
+    Cold-start knobs: ``snap_start`` restores published versions from a
+    snapshot taken after init; ``provisioned_concurrency`` keeps that many
+    environments initialized behind the ``live`` alias, auto-scaling up to
+    ``provisioned_concurrency_max`` when it is larger. Both publish versions,
+    and Lambda does not allow them on the same version.
+
+    ``code_include`` limits the bundled code to those subdirectories of
+    ``code_path``; all of it is bundled when it is empty.
+    """
     name: str
     function_name: str
     code_path: str
-    runtime: _lambda.Runtime = _lambda.Runtime.PYTHON_3_14
+    runtime: _lambda.Runtime = DEFAULT_RUNTIME
     handler: str = "index.handler"
     timeout_seconds: int = 10
     memory_size: int = 256
+    architecture: _lambda.Architecture = DEFAULT_ARCHITECTURE
+    snap_start: bool = False
+    provisioned_concurrency: int = 0
+    provisioned_concurrency_max: int = 0
+    provisioned_utilization_target: float = 0.7
+    reserved_concurrency: Optional[int] = None
+    tracing: bool = True
+    code_include: Tuple[str, ...] = ()
+
+    @property
+    def publishes_versions(self) -> bool:
+        """Whether requests should go through the ``live`` alias."""
+        return self.snap_start or self.provisioned_concurrency > 0
+
+
+def create_router_config(
+    group: str,
+    handler_configs: Sequence[HandlerConfig],
+    code_root: str,
+) -> HandlerConfig:
+    """Create the configuration of a router-mode function for a handler group.
+
+    The router function ships ``router/`` and the group's handler
+    directories, with their requirements, and dispatches each request to
+    the handler of its route, so its limits cover the most demanding one.
+    SnapStart and provisioned concurrency are exclusive; when the handlers
+    ask for both, provisioned concurrency wins, as its environments are
+    initialized before any request and SnapStart would gain nothing.
+
+    Args:
+        group: Group name, e.g. a resource name or "api"
+        handler_configs: Handlers served by the router function
+        code_root: Backend directory containing every handler and ``router/``
+
+    Returns:
+        HandlerConfig for the router function
+    """
+    reserved = [config.reserved_concurrency for config in handler_configs]
+    provisioned = max(config.provisioned_concurrency for config in handler_configs)
+    return HandlerConfig(
+        name=f"{group.title()}RouterHandler",
+        function_name=f"{group}-router-handler",
+        code_path=code_root,
+        code_include=("router",) + tuple(
+            sorted(
+                {os.path.relpath(config.code_path, code_root) for config in handler_configs}
+            )
+        ),
+        handler="router.index.handler",
+        timeout_seconds=max(config.timeout_seconds for config in handler_configs),
+        memory_size=max(config.memory_size for config in handler_configs),
+        architecture=handler_configs[0].architecture,
+        snap_start=not provisioned and any(
+            config.snap_start for config in handler_configs
+        ),
+        provisioned_concurrency=provisioned,
+        provisioned_concurrency_max=max(
+            config.provisioned_concurrency_max for config in handler_configs
+        ),
+        reserved_concurrency=None if None in reserved else sum(reserved),
+    )
+
+
+def create_shared_layer(
+    stack,
+    code_path: str,
+    project_name: str
+) -> _lambda.LayerVersion:
+    """Create the Lambda layer with code shared by all handlers.
+
+    Args:
+        stack: CDK Stack instance
+        code_path: Directory containing the layer's ``python/`` folder
+        project_name: Project name for naming
+
+    Returns:
+        Configured Lambda LayerVersion
+    """
+    return _lambda.LayerVersion(
+        stack,
+        "SharedLayer",
+        layer_version_name=f"{project_name}-shared",
+        code=asset_code(code_path, "SharedLayer"),
+        compatible_runtimes=[DEFAULT_RUNTIME],
+        compatible_architectures=[
+            _lambda.Architecture.ARM_64,
+            _lambda.Architecture.X86_64,
+        ],
+        description="Shared data-access code for backend handlers",
+    )
 
 
 def create_lambda_function(
     stack,
     config: HandlerConfig,
-    project_name: str
+    project_name: str,
+    layers: Optional[Sequence[_lambda.ILayerVersion]] = None,
 ) -> _lambda.Function:
     """Create a Lambda function from configuration.
     
@@ -25,17 +138,70 @@ def create_lambda_function(
         stack: CDK Stack instance
         config: HandlerConfig with function details
         project_name: Project name for naming
+        layers: Lambda layers to attach, e.g. the shared layer
         
     Returns:
         Configured Lambda Function
     """
+    if config.snap_start and config.provisioned_concurrency:
+        raise ValueError(
+            f"{config.name}: SnapStart and provisioned concurrency are exclusive"
+        )
     return _lambda.Function(
         stack,
         config.name,
         function_name=f"{project_name}-{config.function_name}",
         runtime=config.runtime,
         handler=config.handler,
-        code=_lambda.Code.from_asset(config.code_path),
+        code=asset_code(
+            config.code_path,
+            config.name,
+            config.runtime,
+            config.architecture,
+            config.code_include,
+        ),
         timeout=Duration.seconds(config.timeout_seconds),
-        memory_size=config.memory_size
+        memory_size=config.memory_size,
+        layers=list(layers or []),
+        architecture=config.architecture,
+        snap_start=(
+            _lambda.SnapStartConf.ON_PUBLISHED_VERSIONS if config.snap_start else None
+        ),
+        reserved_concurrent_executions=config.reserved_concurrency,
+        tracing=_lambda.Tracing.ACTIVE if config.tracing else _lambda.Tracing.DISABLED,
+    )
+
+
+def create_lambda_alias(
+    fn: _lambda.Function,
+    config: HandlerConfig,
+) -> Optional[_lambda.Alias]:
+    """Publish the function and point the ``live`` alias at it, if needed.
+
+    SnapStart and provisioned concurrency only apply to published versions,
+    so requests must be routed to the alias rather than ``$LATEST``.
+
+    Args:
+        fn: Function created by ``create_lambda_function``
+        config: HandlerConfig the function was created from
+
+    Returns:
+        The ``live`` alias, or None when the function does not publish versions
+    """
+    if not config.publishes_versions:
+        return None
+    alias = _lambda.Alias(
+        fn,
+        "LiveAlias",
+        alias_name=LIVE_ALIAS,
+        version=fn.current_version,
+        provisioned_concurrent_executions=config.provisioned_concurrency or None,
     )
+    if config.provisioned_concurrency_max > config.provisioned_concurrency > 0:
+        alias.add_auto_scaling(
+            min_capacity=config.provisioned_concurrency,
+            max_capacity=config.provisioned_concurrency_max,
+        ).scale_on_utilization(
+            utilization_target=config.provisioned_utilization_target,
+        )
+    return alias
@@ -0,0 +1,96 @@
+"""Fixtures for tests of the backend handlers and the shared layer.
+
+AWS is moto's in-memory fake, started before ``grammy_common`` creates its
+clients at import. Each test gets a fresh table with the key schema and
+indexes of ``DataStack.table``.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+from moto import mock_aws
+
+from grammy.config import BACKEND, PROJECT_NAME, TABLE_INDEXES
+
+TABLE_NAME = f"{PROJECT_NAME}-table-test"
+
+os.environ.update(
+    TABLE_NAME=TABLE_NAME,
+    AWS_DEFAULT_REGION="eu-central-1",
+    AWS_ACCESS_KEY_ID="testing",
+    AWS_SECRET_ACCESS_KEY="testing",
+)
+os.environ.pop("DYNAMODB_ENDPOINT", None)
+mock_aws().start()
+sys.path.insert(0, os.path.join(BACKEND, "shared", "python"))
+
+
+@pytest.fixture
+def table():
+    """Create the table; return its ``grammy_common.db`` resource."""
+    from grammy_common import db
+
+    attributes = ["PK", "SK"] + [
+        f"{index}{key}" for index, _ in TABLE_INDEXES for key in ("PK", "SK")
+    ]
+    db.client.create_table(
+        TableName=TABLE_NAME,
+        BillingMode="PAY_PER_REQUEST",
+        AttributeDefinitions=[
+            {"AttributeName": name, "AttributeType": "S"} for name in attributes
+        ],
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": index,
+                "KeySchema": [
+                    {"AttributeName": f"{index}PK", "KeyType": "HASH"},
+                    {"AttributeName": f"{index}SK", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": projection},
+            }
+            for index, projection in TABLE_INDEXES
+        ],
+    )
+    yield db.table
+    db.client.delete_table(TableName=TABLE_NAME)
+
+
+@pytest.fixture
+def load_handler():
+    """Return a function importing the handler module under ``backend/<path>``."""
+    return _load_handler
+
+
+def _load_handler(path: str):
+    spec = importlib.util.spec_from_file_location(
+        f"handler_{path.replace('/', '_')}",
+        os.path.join(BACKEND, path, "index.py"),
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def api_event():
+    """Return a function building API Gateway proxy events."""
+    return _api_event
+
+
+def _api_event(method: str = "GET", body=None, headers=None, **params) -> dict:
+    # ``params`` are the event's parameter maps
+    return {
+        "httpMethod": method,
+        "headers": headers or {},
+        "body": json.dumps(body) if body is not None else None,
+        "pathParameters": params.get("path"),
+        "queryStringParameters": params.get("query"),
+        "requestContext": params.get("context", {}),
+    }
@@ -0,0 +1,46 @@
+import base64
+import gzip
+
+import pytest
+
+from grammy_common import api, db, keys
+
+BODY = "x" * 2048
+
+
+def _compressed(api_event, accept_encoding, body=BODY):
+    event = api_event(headers={"Accept-Encoding": accept_encoding})
+    return api.compress(event, {"statusCode": 200, "headers": {}, "body": body})
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "br, gzip", "*", "br;q=1, *"])
+def test_responses_are_gzipped_when_accepted(api_event, accept_encoding):
+    result = _compressed(api_event, accept_encoding)
+
+    assert result["headers"]["Content-Encoding"] == "gzip"
+    assert result["isBase64Encoded"]
+    assert gzip.decompress(base64.b64decode(result["body"])).decode() == BODY
+
+
+@pytest.mark.parametrize("accept_encoding", ["br", "identity", "gzip;q=0", ""])
+def test_responses_stay_uncompressed_without_gzip(api_event, accept_encoding):
+    assert _compressed(api_event, accept_encoding)["body"] == BODY
+
+
+def test_small_bodies_stay_uncompressed(api_event):
+    assert _compressed(api_event, "gzip", body="{}")["body"] == "{}"
+
+
+def test_unchanged_items_are_not_modified(table, load_handler, api_event):
+    handler = load_handler("songs/get_id").handler
+    song = db.create(keys.SONG, {"title": "Song"})
+
+    response = handler(api_event(path={"id": song["id"]}), None)
+    tag = response["headers"]["ETag"]
+    assert response["statusCode"] == 200 and tag.startswith('W/"')
+    conditional = api_event(path={"id": song["id"]}, headers={"If-None-Match": tag})
+    assert handler(conditional, None)["statusCode"] == 304
+
+    db.update(keys.SONG, song["id"], {"title": "New"}, 1)
+    response = handler(conditional, None)
+    assert response["statusCode"] == 200 and response["headers"]["ETag"] != tag
@@ -0,0 +1,77 @@
+import aws_cdk as cdk
+from aws_cdk import aws_apigateway as apigateway
+from aws_cdk import aws_lambda as _lambda
+from aws_cdk.assertions import Match, Template
+
+from grammy.api_routes import RouteConfig, create_api_routes
+
+
+def _template(*routes) -> Template:
+    stack = cdk.Stack(cdk.App(), "Test")
+    function = _lambda.Function(
+        stack,
+        "Function",
+        runtime=_lambda.Runtime.PYTHON_3_12,
+        handler="index.handler",
+        code=_lambda.Code.from_inline("def handler(event, context): pass"),
+    )
+    rest_api = apigateway.RestApi(stack, "Api")
+    create_api_routes(
+        rest_api,
+        [RouteConfig(lambda_function=function, **route) for route in routes],
+    )
+    return Template.from_stack(stack)
+
+
+def test_cached_routes_are_keyed_on_their_parameters():
+    template = _template(
+        {
+            "path": "tunings/{id}",
+            "method": "GET",
+            "cache_ttl_seconds": 300,
+            "cache_key_parameters": ["fields"],
+        },
+        {"path": "songs/{id}", "method": "GET"},
+    )
+
+    template.has_resource_properties(
+        "AWS::ApiGateway::Stage",
+        {
+            "CacheClusterEnabled": True,
+            "MethodSettings": [
+                {
+                    "HttpMethod": "GET",
+                    "ResourcePath": "/~1tunings~1{id}",
+                    "CachingEnabled": True,
+                    "CacheTtlInSeconds": 300,
+                }
+            ],
+        },
+    )
+    template.has_resource_properties(
+        "AWS::ApiGateway::Method",
+        {
+            "RequestParameters": {
+                "method.request.path.id": True,
+                "method.request.querystring.fields": False,
+                "method.request.header.If-None-Match": False,
+                "method.request.header.Accept-Encoding": False,
+            },
+            "Integration": Match.object_like(
+                {"CacheKeyParameters": Match.array_with(["method.request.path.id"])}
+            ),
+        },
+    )
+    template.resource_properties_count_is(
+        "AWS::ApiGateway::Method",
+        {"Integration": Match.object_like({"CacheKeyParameters": Match.absent()})},
+        1,
+    )
+
+
+def test_uncached_apis_have_no_cache_cluster():
+    template = _template({"path": "songs/{id}", "method": "GET"})
+
+    template.has_resource_properties(
+        "AWS::ApiGateway::Stage", {"CacheClusterEnabled": Match.absent()}
+    )
@@ -0,0 +1,197 @@
+import base64
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from grammy_common import api, assets, db, keys
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    monkeypatch.setattr(assets, "BUCKET_NAME", "grammy-assets-test")
+    monkeypatch.setattr(assets, "ASSETS_DOMAIN", "grammy.example")
+    assets.s3.create_bucket(
+        Bucket=assets.BUCKET_NAME,
+        CreateBucketConfiguration={"LocationConstraint": "eu-central-1"},
+    )
+    yield assets.BUCKET_NAME
+    for page in assets.s3.get_paginator("list_objects_v2").paginate(
+        Bucket=assets.BUCKET_NAME
+    ):
+        for entry in page.get("Contents", []):
+            assets.s3.delete_object(Bucket=assets.BUCKET_NAME, Key=entry["Key"])
+    assets.s3.delete_bucket(Bucket=assets.BUCKET_NAME)
+
+
+@pytest.fixture
+def signing_key(monkeypatch):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    secrets = boto3.client("secretsmanager")
+    secret = secrets.create_secret(Name="grammy/asset-signing-test", SecretString=pem)
+    monkeypatch.setattr(assets, "SIGNING_KEY_PAIR_ID", "K2TESTKEY")
+    monkeypatch.setattr(assets, "SIGNING_KEY_SECRET", secret["ARN"])
+    assets._signer.cache_clear()
+    yield private_key.public_key()
+    assets._signer.cache_clear()
+    secrets.delete_secret(SecretId=secret["ARN"], ForceDeleteWithoutRecovery=True)
+
+
+def _status(call, *args):
+    with pytest.raises(api.ApiError) as raised:
+        call(*args)
+    return raised.value.status_code
+
+
+def test_uploads_are_split_into_presigned_parts(bucket):
+    size = 2 * assets.PART_BYTES + 1
+
+    upload = assets.start_upload("s1", "take.wav", "audio/wav", size)
+
+    assert upload["partSize"] == assets.PART_BYTES
+    assert [part["partNumber"] for part in upload["parts"]] == [1, 2, 3]
+    url = urlsplit(upload["parts"][0]["url"])
+    assert url.netloc.startswith(f"{bucket}.s3.")
+    assert url.path == f"/song-assets/s1/{upload['assetId']}"
+    query = parse_qs(url.query)
+    assert query["uploadId"] == [upload["uploadId"]]
+    assert query["partNumber"] == ["1"]
+
+
+@pytest.mark.parametrize(
+    "filename, content_type, size, status",
+    [
+        ("../take.wav", "audio/wav", 1, 400),
+        ("take.html", "text/html", 1, 415),
+        ("take.wav", "audio/wav", 0, 400),
+        ("take.wav", "audio/wav", True, 400),
+        ("take.wav", "audio/wav", assets.MAX_BYTES + 1, 413),
+    ],
+)
+def test_uploads_are_validated(bucket, filename, content_type, size, status):
+    assert _status(assets.start_upload, "s1", filename, content_type, size) == status
+
+
+def test_completed_uploads_become_song_assets(table, bucket):
+    song = db.create(keys.SONG, {"title": "Take"})
+    upload = assets.start_upload(song["id"], "take.wav", "audio/wav", 5)
+    key = assets.object_key(song["id"], upload["assetId"])
+    part = assets.s3.upload_part(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload["uploadId"],
+        PartNumber=1,
+        Body=b"audio",
+    )
+
+    assets.complete_upload(
+        song["id"],
+        upload["assetId"],
+        upload["uploadId"],
+        [{"partNumber": 1, "etag": part["ETag"]}],
+    )
+    asset = assets.record(key, 5)
+
+    head = assets.s3.head_object(Bucket=bucket, Key=key)
+    assert head["ContentDisposition"] == 'attachment; filename="take.wav"'
+    assert asset["filename"] == "take.wav" and asset["contentType"] == "audio/wav"
+    stored = db.get(keys.SONG, song["id"], fields=("assets",))
+    assert stored["assets"][upload["assetId"]]["size"] == 5
+
+
+@pytest.mark.parametrize(
+    "parts",
+    [
+        [],
+        {"partNumber": 1, "etag": "x"},
+        [{"partNumber": 0, "etag": "x"}],
+        [{"partNumber": True, "etag": "x"}],
+        [{"partNumber": 1}],
+        [{"partNumber": 1, "etag": ""}],
+    ],
+)
+def test_completed_parts_are_validated(parts):
+    assert _status(assets.complete_upload, "s1", "a1", "upload", parts) == 400
+
+
+def test_completing_an_unknown_upload_is_not_found(bucket, monkeypatch):
+    # moto fails on unknown upload ids itself, rather than answering like S3
+    def complete_multipart_upload(**params):
+        raise ClientError(
+            {"Error": {"Code": "NoSuchUpload"}}, "CompleteMultipartUpload"
+        )
+
+    monkeypatch.setattr(
+        assets.s3, "complete_multipart_upload", complete_multipart_upload
+    )
+    status = _status(
+        assets.complete_upload, "s1", "a1", "unknown", [{"partNumber": 1, "etag": "x"}]
+    )
+
+    assert status == 404
+
+
+def test_completing_with_a_wrong_etag_is_rejected(bucket):
+    upload = assets.start_upload("s1", "take.wav", "audio/wav", 5)
+
+    status = _status(
+        assets.complete_upload,
+        "s1",
+        upload["assetId"],
+        upload["uploadId"],
+        [{"partNumber": 1, "etag": '"0123"'}],
+    )
+
+    assert status == 400
+
+
+def test_download_urls_are_signed(signing_key):
+    download = assets.download_url("s1", "a1")
+
+    url = urlsplit(download["url"])
+    query = parse_qs(url.query)
+    assert query["Key-Pair-Id"] == ["K2TESTKEY"]
+    assert query["Expires"] == [str(download["expiresAt"])]
+    assert url.path == f"/{assets.object_key('s1', 'a1')}"
+    resource = f"{url.scheme}://{url.netloc}{url.path}"
+    policy = json.dumps(
+        {
+            "Statement": [
+                {
+                    "Resource": resource,
+                    "Condition": {
+                        "DateLessThan": {"AWS:EpochTime": download["expiresAt"]}
+                    },
+                }
+            ]
+        },
+        separators=(",", ":"),
+    )
+    # CloudFront's URL-safe base64
+    signature = query["Signature"][0].translate(str.maketrans("-_~", "+=/"))
+    signing_key.verify(
+        base64.b64decode(signature),
+        policy.encode(),
+        padding.PKCS1v15(),
+        hashes.SHA1(),
+    )
+
+
+def test_downloads_fail_closed_without_a_signing_key(monkeypatch):
+    monkeypatch.setattr(assets, "SIGNING_KEY_PAIR_ID", "")
+
+    assert _status(assets.download_url, "s1", "a1") == 503
+
+    monkeypatch.setattr(assets, "UNSIGNED_DOWNLOADS", True)
+    download = assets.download_url("s1", "a1")
+    assert download["expiresAt"] is None
+    assert "Signature" not in download["url"]
@@ -0,0 +1,140 @@
+import base64
+import io
+import json
+import time
+import urllib.error
+
+import pytest
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from grammy_common import api, auth
+
+CLIENT_ID = "client"
+ISSUER = "https://cognito-idp.eu-central-1.amazonaws.com/eu-central-1_test"
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(autouse=True)
+def user_pool(private_key, monkeypatch):
+    numbers = private_key.public_key().public_numbers()
+    monkeypatch.setattr(auth, "_keys", {"k1": (numbers.n, numbers.e)})
+    monkeypatch.setattr(auth, "_fetched_at", time.monotonic())
+    monkeypatch.setattr(auth, "ISSUER", ISSUER)
+    monkeypatch.setattr(auth, "USER_POOL_CLIENT_ID", CLIENT_ID)
+
+
+def _encode(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+
+def _int(value: int) -> str:
+    encoded = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(encoded).rstrip(b"=").decode()
+
+
+def _token(private_key, kid="k1", **changes):
+    claims = {
+        "sub": "user-1",
+        "iss": ISSUER,
+        "token_use": "access",
+        "client_id": CLIENT_ID,
+        "exp": time.time() + 3600,
+        "iat": time.time(),
+        **changes,
+    }
+    signed = f"{_encode({'alg': 'RS256', 'kid': kid})}.{_encode(claims)}"
+    signature = private_key.sign(signed.encode(), padding.PKCS1v15(), hashes.SHA256())
+    return f"{signed}.{base64.urlsafe_b64encode(signature).rstrip(b'=').decode()}"
+
+
+def _rejection(token) -> str:
+    with pytest.raises(api.ApiError) as rejected:
+        auth.verify(token)
+    assert rejected.value.status_code == 401
+    return rejected.value.message
+
+
+def test_valid_tokens_return_their_claims(private_key):
+    assert auth.verify(_token(private_key))["sub"] == "user-1"
+    id_token = _token(private_key, token_use="id", aud=CLIENT_ID, client_id=None)
+    assert auth.verify(id_token)["token_use"] == "id"
+
+
+@pytest.mark.parametrize(
+    "changes, message",
+    [
+        ({"exp": time.time() - 60}, "Token expired"),
+        ({"nbf": time.time() + 600}, "Token not valid yet"),
+        ({"iat": time.time() + 600}, "Token issued in the future"),
+        ({"iss": "https://example.com"}, "Token issued by another user pool"),
+        ({"client_id": "other"}, "Token issued for another client"),
+    ],
+)
+def test_claims_are_checked(private_key, changes, message):
+    assert _rejection(_token(private_key, **changes)) == message
+
+
+@pytest.mark.parametrize(
+    "changes", [{"exp": "tomorrow"}, {"exp": None}, {"exp": True}, {"nbf": [1]}]
+)
+def test_malformed_time_claims_are_rejected(private_key, changes):
+    assert "must be a number" in _rejection(_token(private_key, **changes))
+
+
+@pytest.mark.parametrize("kid", [["k1"], {"k": 1}, 1, None, "unknown"])
+def test_unknown_or_malformed_key_ids_are_rejected(private_key, kid):
+    assert _rejection(_token(private_key, kid=kid)) == "Invalid token signature"
+
+
+def test_unreachable_jwks_rejects_and_retries(private_key, monkeypatch):
+    def unreachable(url, timeout):
+        raise urllib.error.URLError("timed out")
+
+    monkeypatch.setattr(auth, "_keys", {})
+    monkeypatch.setattr(auth, "_fetched_at", None)
+    monkeypatch.setattr(auth.urllib.request, "urlopen", unreachable)
+    assert _rejection(_token(private_key)) == "Token signing keys are unavailable"
+    assert auth._fetched_at is None
+
+    numbers = private_key.public_key().public_numbers()
+    jwks = {"keys": [{"kty": "RSA", "kid": "k1", "n": _int(numbers.n), "e": "AQAB"}]}
+    monkeypatch.setattr(
+        auth.urllib.request,
+        "urlopen",
+        lambda url, timeout: io.BytesIO(json.dumps(jwks).encode()),
+    )
+    assert auth.verify(_token(private_key))["sub"] == "user-1"
+    assert auth._fetched_at is not None
+
+
+def test_malformed_jwks_is_rejected(private_key, monkeypatch):
+    monkeypatch.setattr(auth, "_keys", {})
+    monkeypatch.setattr(auth, "_fetched_at", None)
+    monkeypatch.setattr(
+        auth.urllib.request, "urlopen", lambda url, timeout: io.BytesIO(b"<html>")
+    )
+    assert _rejection(_token(private_key)) == "Token signing keys are unavailable"
+    assert auth._fetched_at is None
+
+
+def test_tampered_tokens_are_rejected(private_key):
+    header, _, signature = _token(private_key).split(".")
+    forged = _encode({"sub": "admin", "iss": ISSUER, "exp": time.time() + 60})
+    assert _rejection(f"{header}.{forged}.{signature}") == "Invalid token signature"
+    assert _rejection("not-a-token") == "Malformed token"
+
+
+def test_callers_come_from_the_authorizer_or_the_header(private_key, api_event):
+    authorized = api_event(context={"authorizer": {"claims": {"sub": "user-2"}}})
+    assert auth.subject(authorized) == "user-2"
+
+    headers = {"Authorization": f"Bearer {_token(private_key)}"}
+    assert auth.subject(api_event(headers=headers)) == "user-1"
+
+    with pytest.raises(api.ApiError):
+        auth.subject(api_event())
@@ -0,0 +1,73 @@
+import aws_cdk as cdk
+import pytest
+from aws_cdk import aws_apigateway as apigateway
+from aws_cdk.assertions import Match, Template
+
+from grammy import backend_stack
+from grammy.backend_stack import BackendStack
+from grammy.config import (
+    API_BINARY_MEDIA_TYPES,
+    HANDLERS,
+    READ_THROTTLE,
+    WRITE_THROTTLE,
+)
+
+
+def test_cors_preflight_mocks_convert_to_text():
+    stack = cdk.Stack(cdk.App(), "Test")
+    rest_api = apigateway.RestApi(
+        stack,
+        "Api",
+        binary_media_types=API_BINARY_MEDIA_TYPES,
+        default_cors_preflight_options=apigateway.CorsOptions(allow_origins=["*"]),
+    )
+    rest_api.root.add_resource("songs").add_method("GET", apigateway.MockIntegration())
+
+    BackendStack._convert_preflight_to_text(rest_api)
+
+    template = Template.from_stack(stack)
+    template.resource_properties_count_is(
+        "AWS::ApiGateway::Method",
+        {
+            "HttpMethod": "OPTIONS",
+            "Integration": Match.object_like({"ContentHandling": "CONVERT_TO_TEXT"}),
+        },
+        2,
+    )
+    template.has_resource_properties(
+        "AWS::ApiGateway::Method",
+        {
+            "HttpMethod": "GET",
+            "Integration": Match.object_like({"ContentHandling": Match.absent()}),
+        },
+    )
+
+
+def _reserved(handler_configs):
+    return sum(config.reserved_concurrency or 0 for config in handler_configs)
+
+
+@pytest.mark.parametrize("limit, reserved", [(1000, 198), (300, 44), (10, 0)])
+def test_reservations_fit_the_account_concurrency(monkeypatch, limit, reserved):
+    monkeypatch.setattr(backend_stack, "ACCOUNT_CONCURRENCY_LIMIT", limit)
+    handler_configs = BackendStack._budget_reserved_concurrency(
+        [BackendStack._reserve_write_concurrency(config) for config in HANDLERS]
+    )
+
+    assert _reserved(handler_configs) == reserved
+    assert all(config.reserved_concurrency != 0 for config in handler_configs)
+
+
+def test_write_marks_choose_the_throttle_and_reservation():
+    handlers = {config.name: config for config in HANDLERS}
+    transpose = BackendStack._reserve_write_concurrency(
+        handlers["SongsTransposeHandler"]
+    )
+    songs_post = BackendStack._reserve_write_concurrency(handlers["SongsPostHandler"])
+
+    assert transpose.reserved_concurrency is None
+    assert songs_post.reserved_concurrency
+    assert BackendStack._route_throttle({"method": "POST"}) == READ_THROTTLE
+    assert (
+        BackendStack._route_throttle({"method": "GET", "write": True}) == WRITE_THROTTLE
+    )
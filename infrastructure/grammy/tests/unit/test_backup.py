@@ -0,0 +1,170 @@
+import base64
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import Binary
+
+from grammy_common import backup, db
+
+RESTORE_TABLE = "grammy-restore-test"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    monkeypatch.setattr(backup, "BUCKET_NAME", "grammy-backup-test")
+    backup.s3.create_bucket(
+        Bucket=backup.BUCKET_NAME,
+        CreateBucketConfiguration={"LocationConstraint": "eu-central-1"},
+    )
+    yield backup.BUCKET_NAME
+    for page in backup.s3.get_paginator("list_objects_v2").paginate(
+        Bucket=backup.BUCKET_NAME
+    ):
+        for entry in page.get("Contents", []):
+            backup.s3.delete_object(Bucket=backup.BUCKET_NAME, Key=entry["Key"])
+    backup.s3.delete_bucket(Bucket=backup.BUCKET_NAME)
+
+
+@pytest.fixture
+def restore_table(monkeypatch):
+    monkeypatch.setattr(backup, "RESTORE_TABLES", "grammy-restore-*")
+    db.client.create_table(
+        TableName=RESTORE_TABLE,
+        BillingMode="PAY_PER_REQUEST",
+        AttributeDefinitions=[
+            {"AttributeName": name, "AttributeType": "S"} for name in ("PK", "SK")
+        ],
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+    )
+    yield db.dynamodb.Table(RESTORE_TABLE)
+    db.client.delete_table(TableName=RESTORE_TABLE)
+
+
+@pytest.fixture
+def segment_invocations(monkeypatch):
+    """Run the export's segment invocations in turn, as Lambda would."""
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "grammy-backup-export")
+    invocations = []
+
+    def invoke(**params):
+        assert params["InvocationType"] == "Event"
+        invocations.append(backup.export_segment(**json.loads(params["Payload"])))
+        return {"StatusCode": 202}
+
+    monkeypatch.setattr(backup.functions, "invoke", invoke)
+    return invocations
+
+
+def _items(count):
+    return [
+        {
+            "PK": f"SONG#s{number}",
+            "SK": f"SONG#s{number}",
+            "tempo": Decimal("120.5"),
+            "tags": {"rock", "live"},
+            "cover": Binary(b"\x00\x01"),
+        }
+        for number in range(count)
+    ]
+
+
+def _record(sequence, seconds, item_id, image=None):
+    # Stream images are DynamoDB JSON with base64 binary values
+    keys = {"PK": {"S": f"SONG#{item_id}"}, "SK": {"S": f"SONG#{item_id}"}}
+    change = {
+        "SequenceNumber": str(sequence),
+        "ApproximateCreationDateTime": seconds,
+        "Keys": keys,
+    }
+    if image is not None:
+        change["NewImage"] = {**keys, **image}
+    return {"dynamodb": change}
+
+
+def test_export_fans_out_and_the_last_segment_writes_the_manifest(
+    table, bucket, segment_invocations
+):
+    for item in _items(20):
+        table.put_item(Item=item)
+
+    started = backup.export_full(segments=4)
+
+    assert len(segment_invocations) == 4
+    manifest = segment_invocations[-1]
+    assert manifest["items"] == 20 and manifest["segments"] == 4
+    assert manifest["startedAt"] == started["startedAt"]
+    assert [invocation.get("segments") for invocation in segment_invocations[:3]] == [
+        None
+    ] * 3
+    assert backup.latest_export() == manifest
+
+
+def test_restore_round_trips_an_export(
+    table, bucket, restore_table, segment_invocations
+):
+    items = _items(30)
+    for item in items:
+        table.put_item(Item=item)
+    backup.export_full(segments=3)
+
+    result = backup.restore(table_name=RESTORE_TABLE)
+
+    assert result["restored"] == 30
+    restored = sorted(restore_table.scan()["Items"], key=lambda item: item["PK"])
+    assert restored == sorted(items, key=lambda item: item["PK"])
+
+
+def test_restore_replays_changes_until_the_given_time(
+    table, bucket, restore_table, segment_invocations
+):
+    for item in _items(2):
+        table.put_item(Item=item)
+    backup.export_full(segments=2)
+    now = time.time()
+    backup.write_changes(
+        [
+            _record(
+                1, now + 10, "s9", {"cover": {"B": base64.b64encode(b"\x02").decode()}}
+            ),
+            _record(2, now + 20, "s0"),
+        ]
+    )
+    until = datetime.fromtimestamp(now + 15, tz=timezone.utc).isoformat()
+
+    result = backup.restore(table_name=RESTORE_TABLE, until=until)
+
+    assert (result["replayed"], result["deleted"]) == (1, 0)
+    assert sorted(item["PK"] for item in restore_table.scan()["Items"]) == [
+        "SONG#s0",
+        "SONG#s1",
+        "SONG#s9",
+    ]
+    replayed = restore_table.get_item(Key={"PK": "SONG#s9", "SK": "SONG#s9"})
+    assert replayed["Item"]["cover"] == Binary(b"\x02")
+
+    backup.restore(table_name=RESTORE_TABLE)
+
+    assert sorted(item["PK"] for item in restore_table.scan()["Items"]) == [
+        "SONG#s1",
+        "SONG#s9",
+    ]
+
+
+def test_restore_rejects_a_time_before_the_export(
+    table, bucket, restore_table, segment_invocations
+):
+    backup.export_full(segments=1)
+
+    with pytest.raises(ValueError):
+        backup.restore(table_name=RESTORE_TABLE, until="2020-01-01T00:00:00+00:00")
+
+
+def test_restore_only_writes_to_restore_tables(table, bucket, restore_table):
+    with pytest.raises(ValueError):
+        backup.restore(table_name="production")
@@ -0,0 +1,147 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from grammy_common import batch, db
+
+TABLE_NAME = db.TABLE_NAME
+
+
+class FlakyClient:
+    """The table's client, leaving the last ``held`` requests unprocessed."""
+
+    def __init__(self, held):
+        self.held = held
+        self.calls = []
+
+    def _split(self, requests):
+        held = min(self.held(len(self.calls)), len(requests))
+        self.calls.append(len(requests))
+        return requests[: len(requests) - held], requests[len(requests) - held :]
+
+    def batch_write_item(self, RequestItems):
+        processed, unprocessed = self._split(RequestItems[TABLE_NAME])
+        if processed:
+            db.client.batch_write_item(RequestItems={TABLE_NAME: processed})
+        return {"UnprocessedItems": {TABLE_NAME: unprocessed} if unprocessed else {}}
+
+    def batch_get_item(self, RequestItems):
+        request = RequestItems[TABLE_NAME]
+        processed, unprocessed = self._split(request["Keys"])
+        response = {"Responses": {}}
+        if processed:
+            response = db.client.batch_get_item(
+                RequestItems={TABLE_NAME: {**request, "Keys": processed}}
+            )
+        if unprocessed:
+            response["UnprocessedKeys"] = {TABLE_NAME: {**request, "Keys": unprocessed}}
+        return response
+
+
+class FailingClient(FlakyClient):
+    """The table's client, failing every request that holds ``poison``."""
+
+    def __init__(self, poison):
+        super().__init__(lambda call: 0)
+        self.poison = poison
+
+    def _split(self, requests):
+        if self.poison in str(requests):
+            raise ClientError(
+                {"Error": {"Code": "InternalServerError"}}, "BatchWriteItem"
+            )
+        return super()._split(requests)
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    attempts = []
+    monkeypatch.setattr(batch, "_backoff", attempts.append)
+    return attempts
+
+
+def _items(count):
+    return [{"PK": f"TEST#{n}", "SK": f"TEST#{n}", "n": n} for n in range(count)]
+
+
+def _stored():
+    return len(db.table.scan()["Items"])
+
+
+def test_writes_are_chunked_to_the_batch_limit(table, backoffs):
+    client = FlakyClient(lambda call: 0)
+
+    assert batch.write_items(client, TABLE_NAME, _items(60)) == []
+    assert sorted(client.calls) == [10, 25, 25]
+    assert _stored() == 60 and backoffs == []
+
+
+def test_unprocessed_items_are_retried_with_backoff(table, backoffs):
+    # The first call leaves 10 items unprocessed, the retry 5 of those
+    client = FlakyClient(lambda call: {0: 10, 1: 5}.get(call, 0))
+
+    assert batch.write_items(client, TABLE_NAME, _items(20)) == []
+    assert client.calls == [20, 10, 5]
+    assert backoffs == [0, 1]
+    assert _stored() == 20
+
+
+def test_items_never_processed_are_returned(table, backoffs):
+    client = FlakyClient(lambda call: 2)
+    items = _items(5)
+
+    assert batch.write_items(client, TABLE_NAME, items) == items[3:]
+    assert len(client.calls) == batch.MAX_ATTEMPTS
+    assert backoffs == list(range(batch.MAX_ATTEMPTS - 1))
+    assert _stored() == 3
+
+
+def test_deletes_and_reads_retry_too(table, backoffs):
+    items = _items(4)
+    batch.write_items(db.client, TABLE_NAME, items)
+    item_keys = [{"PK": item["PK"], "SK": item["SK"]} for item in items]
+
+    found, failed = batch.get_items(
+        FlakyClient(lambda call: 1 - call), TABLE_NAME, item_keys
+    )
+    assert sorted(item["n"] for item in found) == [0, 1, 2, 3] and failed == []
+
+    client = FlakyClient(lambda call: 1)
+    found, failed = batch.get_items(client, TABLE_NAME, item_keys)
+    assert len(found) == 3 and failed == item_keys[3:]
+
+    assert (
+        batch.delete_items(FlakyClient(lambda call: 1 - call), TABLE_NAME, item_keys)
+        == []
+    )
+    assert _stored() == 0
+
+
+def test_a_failed_chunk_does_not_fail_the_others(table, backoffs, monkeypatch):
+    items = _items(60)
+
+    # Chunks of 25: the second one holds item 30
+    failed = batch.write_items(FailingClient("TEST#30'"), TABLE_NAME, items)
+
+    assert failed == items[25:50]
+    assert _stored() == 35
+
+    batch.write_items(db.client, TABLE_NAME, items)
+    monkeypatch.setattr(batch, "GET_CHUNK_SIZE", 25)
+    item_keys = [{"PK": item["PK"], "SK": item["SK"]} for item in items]
+    found, failed = batch.get_items(FailingClient("TEST#5'"), TABLE_NAME, item_keys)
+    assert len(found) == 35 and failed == item_keys[:25]
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(batch.time, "sleep", sleeps.append)
+    monkeypatch.setattr(batch.random, "uniform", lambda low, high: (low, high))
+
+    for attempt in (0, 3, 20):
+        batch._backoff(attempt)
+
+    assert sleeps == [
+        (0, batch.BASE_DELAY_SECONDS),
+        (0, batch.BASE_DELAY_SECONDS * 8),
+        (0, batch.MAX_DELAY_SECONDS),
+    ]
@@ -0,0 +1,83 @@
+import pytest
+
+from grammy_common import cache, db, keys
+
+
+@pytest.fixture
+def reference_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_cache", cache.LRUCache(16, 300))
+    monkeypatch.setattr(cache, "_versions", {})
+    monkeypatch.setattr(cache, "VERSION_CHECK_SECONDS", 0)
+    reads = []
+    get = db.get
+
+    def counted_get(*args, **kwargs):
+        reads.append(kwargs.get("consistent"))
+        return get(*args, **kwargs)
+
+    monkeypatch.setattr(db, "get", counted_get)
+    return reads
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    lru = cache.LRUCache(2, 300)
+    lru.put("a", 1, "A")
+    lru.put("b", 1, "B")
+    lru.get("a", 1)
+    lru.put("c", 1, "C")
+
+    assert lru.get("b", 1) is None
+    assert lru.get("a", 1).value == "A"
+    assert lru.stats()["evictions"] == 1
+
+
+def test_entries_of_another_version_or_expired_are_misses():
+    lru = cache.LRUCache(2, 0)
+    lru.put("a", 1, "A")
+    assert lru.get("a", 1) is None
+
+    lru = cache.LRUCache(2, 300)
+    lru.put("a", 1, "A")
+    assert lru.get("a", 2) is None
+
+
+def test_items_are_read_once_and_consistently(table, reference_cache):
+    tuning = db.create(keys.TUNING, {"name": "Drop D"})
+
+    assert cache.get(keys.TUNING, tuning["id"])["name"] == "Drop D"
+    assert cache.get(keys.TUNING, tuning["id"])["name"] == "Drop D"
+    assert reference_cache == [True]
+
+
+def test_writes_invalidate_cached_items(table, reference_cache):
+    tuning = db.create(keys.TUNING, {"name": "Drop D"})
+    cache.get(keys.TUNING, tuning["id"])
+
+    db.update(keys.TUNING, tuning["id"], {"name": "Drop C"}, 1)
+    assert cache.get(keys.TUNING, tuning["id"])["name"] == "Drop C"
+
+    db.delete(keys.TUNING, tuning["id"])
+    assert cache.get(keys.TUNING, tuning["id"]) is None
+
+
+def test_writes_to_another_type_keep_entries(table, reference_cache):
+    tuning = db.create(keys.TUNING, {"name": "Drop D"})
+    cache.get(keys.TUNING, tuning["id"])
+    db.create(keys.INSTRUMENT, {"name": "Bass"})
+
+    cache.get(keys.TUNING, tuning["id"])
+    assert len(reference_cache) == 1
+
+
+def test_listings_are_not_cached_until_the_index_settles(
+    table, reference_cache, monkeypatch
+):
+    db.create(keys.TUNING, {"name": "Drop D"})
+    monkeypatch.setattr(cache, "INDEX_LAG_SECONDS", 3600)
+    cache.list_items(keys.TUNING)
+    assert cache._cache.stats()["size"] == 0
+
+    monkeypatch.setattr(cache, "INDEX_LAG_SECONDS", 0)
+    items, _ = cache.list_items(keys.TUNING)
+    assert [item["name"] for item in items] == ["Drop D"]
+    assert cache._cache.stats()["size"] == 1
@@ -0,0 +1,97 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+TOOL = os.path.join(
+    os.path.dirname(__file__), *[".."] * 4, "tools", "deploy_changes.py"
+)
+
+
+@pytest.fixture
+def deploy_changes(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("deploy_changes", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # A checkout of its own: app, frontend, context and state
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "app.py").write_text("app = None\n")
+    (tmp_path / "app" / "cdk.json").write_text(json.dumps({"context": {}}))
+    (tmp_path / "frontend").mkdir()
+    (tmp_path / "frontend" / "Dockerfile").write_text("FROM node\n")
+    monkeypatch.setattr(module, "SYNTH_INPUTS", [str(tmp_path / "app")])
+    monkeypatch.setattr(module, "CONTEXT_FILES", [str(tmp_path / "app" / "cdk.json")])
+    monkeypatch.setattr(
+        module, "FRONTEND_INPUTS", [str(tmp_path / "frontend" / "Dockerfile")]
+    )
+    monkeypatch.setattr(module, "STATE_FILE", str(tmp_path / "state.json"))
+    for name in module.SYNTH_ENVIRONMENT:
+        monkeypatch.delenv(name, raising=False)
+    return module
+
+
+def _assembly(path, templates):
+    path.mkdir(exist_ok=True)
+    artifacts = {}
+    for name, template in templates.items():
+        (path / f"{name}.template.json").write_text(json.dumps(template))
+        artifacts[name] = {
+            "type": "aws:cloudformation:stack",
+            "properties": {"templateFile": f"{name}.template.json"},
+        }
+    (path / "manifest.json").write_text(json.dumps({"artifacts": artifacts}))
+    return str(path)
+
+
+def test_synth_fingerprint_follows_files_environment_and_context(
+    deploy_changes, tmp_path, monkeypatch
+):
+    recorded = deploy_changes.synth_fingerprint()
+    assert deploy_changes.synth_fingerprint() == recorded
+
+    monkeypatch.setenv("GRAMMY_ACCOUNT_CONCURRENCY", "300")
+    with_setting = deploy_changes.synth_fingerprint()
+    assert with_setting != recorded
+
+    (tmp_path / "app" / "cdk.json").write_text(
+        json.dumps({"context": {"@aws-cdk/core:newFlag": True}})
+    )
+    with_context = deploy_changes.synth_fingerprint()
+    assert with_context != with_setting
+
+    (tmp_path / "app" / "app.py").write_text("app = 1\n")
+    assert deploy_changes.synth_fingerprint() != with_context
+
+
+def test_synth_fingerprint_reads_the_signing_key(deploy_changes, tmp_path, monkeypatch):
+    key = tmp_path / "public.pem"
+    key.write_text("one")
+    monkeypatch.setenv("GRAMMY_ASSET_SIGNING_KEY", str(key))
+    recorded = deploy_changes.synth_fingerprint()
+
+    key.write_text("two")
+
+    assert deploy_changes.synth_fingerprint() != recorded
+
+
+def test_frontend_fingerprint_includes_the_dockerfile(deploy_changes, tmp_path):
+    recorded = deploy_changes.fingerprint(deploy_changes.FRONTEND_INPUTS)
+
+    (tmp_path / "frontend" / "Dockerfile").write_text("FROM node:22\n")
+
+    assert deploy_changes.fingerprint(deploy_changes.FRONTEND_INPUTS) != recorded
+
+
+def test_only_stacks_changed_since_their_deploy_are_listed(
+    deploy_changes, tmp_path, capsys
+):
+    assembly = _assembly(tmp_path / "cdk.out", {"Data": {"a": 1}, "Backend": {"b": 1}})
+    assert deploy_changes.main(["changed-stacks", assembly]) == 0
+    assert capsys.readouterr().out.split() == ["Backend", "Data"]
+
+    deploy_changes.main(["record", "stacks", assembly, "Data", "Backend"])
+    _assembly(tmp_path / "cdk.out", {"Data": {"a": 1}, "Backend": {"b": 2}})
+    deploy_changes.main(["changed-stacks", assembly])
+
+    assert capsys.readouterr().out.split() == ["Backend"]
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+from grammy_common import cache, db, fretboard, keys
+
+STANDARD = fretboard.fretboard({"notes": ["E2", "A2", "D3", "G3", "B3", "E4"]})
+DROP_D = fretboard.fretboard({"notes": ["D2", "A2", "D3", "G3", "B3", "E4"]})
+
+
+def _tab(*positions):
+    return [{"string": string, "fret": fret} for string, fret in positions]
+
+
+def _positions(tab):
+    return [(note["string"], note["fret"]) for note in tab]
+
+
+@pytest.mark.parametrize(
+    "note, expected", [("E2", 40), ("F#3", 54), ("Bb1", 34), ("c-1", 0), (64, 64)]
+)
+def test_notes_are_midi_pitches(note, expected):
+    assert fretboard.pitch(note) == expected
+
+
+@pytest.mark.parametrize("note", ["H2", "E", 40.5, True])
+def test_invalid_notes_are_rejected(note):
+    with pytest.raises(ValueError):
+        fretboard.pitch(note)
+
+
+@pytest.mark.parametrize(
+    "instrument, capo",
+    [({"strings": 4}, 0), ({"frets": 12}, 12), ({}, -1), ({}, 1.5)],
+)
+def test_fretboards_are_validated(instrument, capo):
+    with pytest.raises(ValueError):
+        fretboard.fretboard({"notes": ["E2"] * 6}, instrument, capo)
+
+
+def test_the_same_fretboard_keeps_every_position():
+    tab = _tab((0, 0), (2, 7), (5, 24))
+    transposed, unplayable = fretboard.transpose_tab(tab, STANDARD, STANDARD)
+    assert _positions(transposed) == _positions(tab) and unplayable == 0
+
+
+def test_notes_keep_their_pitch_on_the_same_string():
+    tab = _tab((0, 0), (0, 5), (1, 0))
+    transposed, _ = fretboard.transpose_tab(tab, STANDARD, DROP_D)
+    assert _positions(transposed) == [(0, 2), (0, 7), (1, 0)]
+
+
+def test_notes_out_of_reach_move_to_the_nearest_string():
+    short = fretboard.fretboard(
+        {"notes": ["E2", "A2", "D3", "G3", "B3", "E4"]}, {"frets": 5}
+    )
+    # E3 on the low string, fret 12: beyond 5 frets there, D3 fret 2 has it
+    transposed, unplayable = fretboard.transpose_tab(_tab((0, 12)), STANDARD, short)
+    assert _positions(transposed) == [(2, 2)] and unplayable == 0
+
+
+def test_a_capo_shifts_frets_and_can_make_notes_unplayable():
+    capo = fretboard.fretboard({"notes": list(STANDARD.tuning)}, capo=2)
+    # G2 is fret 1 above the capo; E2 is below it on every string
+    transposed, unplayable = fretboard.transpose_tab(
+        _tab((0, 3), (0, 0)), STANDARD, capo
+    )
+    assert _positions(transposed) == [(0, 1), (None, None)]
+    assert unplayable == 1
+
+
+def test_other_keys_of_a_note_are_kept():
+    transposed, _ = fretboard.transpose_tab(
+        [{"string": 0, "fret": 0, "beat": 3}], STANDARD, DROP_D
+    )
+    assert transposed == [{"string": 0, "fret": 2, "beat": 3}]
+
+
+def test_chord_shapes_are_moved_string_by_string():
+    chords = [{"name": "E", "frets": [0, 2, 2, 1, 0, 0]}, {"frets": [None, 0]}]
+    transposed, lost = fretboard.transpose_chords(chords, STANDARD, DROP_D)
+    assert transposed[0] == {"name": "E", "frets": [2, 2, 2, 1, 0, 0]}
+    assert transposed[1]["frets"] == [None, 0, None, None, None, None]
+    assert lost == 0
+
+
+def test_chord_notes_landing_on_a_used_string_are_lost():
+    unison = fretboard.fretboard({"notes": ["E2", "E2"]})
+    single = fretboard.fretboard({"notes": ["E2"]})
+    transposed, lost = fretboard.transpose_chords([{"frets": [0, 0]}], unison, single)
+    assert transposed == [{"frets": [0]}] and lost == 1
+
+
+@pytest.mark.parametrize(
+    "song",
+    [
+        {"tab": [{"string": 0, "fret": "x"}]},
+        {"tab": [{"string": 0, "fret": 1.5}]},
+        {"chords": [{"frets": [0] * 7}]},
+        {"chords": [{"name": "E"}]},
+    ],
+)
+def test_malformed_songs_are_rejected(song):
+    with pytest.raises(ValueError):
+        fretboard.transpose_song(song, STANDARD, DROP_D)
+
+
+@pytest.fixture
+def transpose(table, load_handler, api_event, monkeypatch):
+    monkeypatch.setattr(cache, "_cache", cache.LRUCache(16, 300))
+    monkeypatch.setattr(cache, "_versions", {})
+    handler = load_handler("songs/transpose").handler
+
+    def post(song_id, body):
+        response = handler(api_event("POST", body, path={"id": song_id}), None)
+        return response["statusCode"], json.loads(response["body"])
+
+    return post
+
+
+def test_transpose_handler_returns_the_moved_song(transpose):
+    standard = db.create(
+        keys.TUNING, {"name": "Standard", "notes": list(STANDARD.tuning)}
+    )
+    drop_d = db.create(keys.TUNING, {"name": "Drop D", "notes": list(DROP_D.tuning)})
+    song = db.create(
+        keys.SONG,
+        {"title": "Song", "tuningId": standard["id"], "tab": _tab((0, 3), (0, 0))},
+    )
+
+    status, body = transpose(song["id"], {"tuningId": drop_d["id"]})
+    assert status == 200
+    assert _positions(body["tab"]) == [(0, 5), (0, 2)]
+    assert body["unplayable"] == 0 and body["tuningId"] == drop_d["id"]
+    # Transposing does not change the stored song
+    assert db.get(keys.SONG, song["id"])["tuningId"] == standard["id"]
+
+    assert transpose(song["id"], {"tuningId": "missing"})[0] == 404
+    assert transpose(song["id"], {})[0] == 400
+    assert transpose(song["id"], {"tuningId": drop_d["id"], "capo": 99})[0] == 400
@@ -0,0 +1,135 @@
+import os
+
+import aws_cdk as cdk
+import pytest
+from aws_cdk.assertions import Match, Template
+
+from grammy.frontend_stack import FrontendStack
+
+
+@pytest.fixture(scope="module")
+def distribution(tmp_path_factory):
+    # The stack deploys ../../frontend/dist, relative to the CDK app
+    checkout = tmp_path_factory.mktemp("checkout")
+    (checkout / "frontend" / "dist" / "assets").mkdir(parents=True)
+    (checkout / "frontend" / "dist" / "index.html").write_text("<html></html>")
+    app_dir = checkout / "infrastructure" / "grammy"
+    app_dir.mkdir(parents=True)
+    cwd = os.getcwd()
+    os.chdir(app_dir)
+    try:
+        stack = FrontendStack(
+            cdk.App(),
+            "Frontend",
+            api_domain_name="api.example.com",
+            api_stage_name="dev",
+            user_pool_id="pool",
+            user_pool_client_id="client",
+            assets_bucket_domain_name="assets.example.com",
+        )
+        template = Template.from_stack(stack)
+    finally:
+        os.chdir(cwd)
+    [resource] = template.find_resources("AWS::CloudFront::Distribution").values()
+    return template, resource["Properties"]["DistributionConfig"]
+
+
+def _behaviors(config) -> dict:
+    return {behavior["PathPattern"]: behavior for behavior in config["CacheBehaviors"]}
+
+
+def test_api_is_served_under_the_prefix(distribution):
+    _, config = distribution
+    behaviors = _behaviors(config)
+    [api_origin] = [
+        origin for origin in config["Origins"] if origin["Id"] == "ApiOrigin"
+    ]
+
+    assert api_origin["DomainName"] == "api.example.com"
+    assert api_origin["OriginPath"] == "/dev"
+    api = behaviors["/api/*"]
+    assert api["TargetOriginId"] == "ApiOrigin"
+    assert "POST" in api["AllowedMethods"]
+    assert api["CachePolicyId"] == "4135ea2d-6df8-44a3-9df3-4b5a84be39ad"
+    assert api["OriginRequestPolicyId"] == "b689b0a8-53d0-40ab-baf2-68738e2966ac"
+    assert "CustomErrorResponses" not in config
+
+
+def test_edge_cached_routes_come_before_the_catch_all(distribution):
+    template, config = distribution
+    patterns = [behavior["PathPattern"] for behavior in config["CacheBehaviors"]]
+
+    assert patterns.index("/api/tunings") < patterns.index("/api/*")
+    assert patterns.index("/api/instruments") < patterns.index("/api/*")
+    template.has_resource_properties(
+        "AWS::CloudFront::CachePolicy",
+        {
+            "CachePolicyConfig": Match.object_like(
+                {
+                    "Comment": "GET /api/tunings",
+                    "ParametersInCacheKeyAndForwardedToOrigin": Match.object_like(
+                        {
+                            "HeadersConfig": {
+                                "HeaderBehavior": "whitelist",
+                                "Headers": ["Authorization"],
+                            }
+                        }
+                    ),
+                }
+            )
+        },
+    )
+
+
+def test_spa_routes_and_api_prefix_are_rewritten(distribution):
+    template, _ = distribution
+
+    functions = template.find_resources("AWS::CloudFront::Function").values()
+    code = [function["Properties"]["FunctionCode"] for function in functions]
+    assert any("substring(4)" in source for source in code)
+    assert any('"/index.html"' in source for source in code)
+
+
+def _deployment(template, prefix) -> tuple:
+    [(logical_id, resource)] = [
+        (logical_id, resource)
+        for logical_id, resource in template.find_resources(
+            "Custom::CDKBucketDeployment"
+        ).items()
+        if logical_id.startswith(prefix + "CustomResource")
+    ]
+    return logical_id, resource
+
+
+def test_hashed_assets_are_immutable_and_never_pruned(distribution):
+    template, config = distribution
+    _, assets = _deployment(template, "DeployFrontendAssets")
+
+    assert assets["Properties"]["Include"] == ["assets/*"]
+    assert assets["Properties"]["Prune"] is False
+    assert assets["Properties"]["SystemMetadata"] == {
+        "cache-control": "public, max-age=31536000, immutable"
+    }
+    assert "DistributionPaths" not in assets["Properties"]
+    template.has_resource_properties(
+        "AWS::CloudFront::CachePolicy",
+        {
+            "CachePolicyConfig": Match.object_like(
+                {"Comment": "Content-hashed frontend assets", "MinTTL": 31536000}
+            )
+        },
+    )
+
+
+def test_only_entry_files_are_invalidated(distribution):
+    template, _ = distribution
+    assets_id, _ = _deployment(template, "DeployFrontendAssets")
+    _, entry = _deployment(template, "DeployFrontend")
+
+    assert entry["Properties"]["Exclude"] == ["assets/*"]
+    assert entry["Properties"]["DistributionPaths"] == ["/index.html", "/config.js"]
+    assert entry["Properties"]["SystemMetadata"]["cache-control"] == (
+        "public, max-age=0, must-revalidate, s-maxage=60"
+    )
+    # A new index.html never names chunks that are not uploaded yet
+    assert assets_id in entry["DependsOn"]
@@ -0,0 +1,131 @@
+import os
+import zipfile
+
+import aws_cdk as cdk
+import pytest
+from aws_cdk import aws_lambda as _lambda
+from aws_cdk.assertions import Template
+
+from grammy import bundling
+from grammy.config import BACKEND
+from grammy.handlers import (
+    LIVE_ALIAS,
+    HandlerConfig,
+    create_lambda_alias,
+    create_lambda_function,
+    create_router_config,
+)
+
+
+def _handler(name, code_path=BACKEND, **options):
+    return HandlerConfig(name=name, function_name=name, code_path=code_path, **options)
+
+
+@pytest.mark.parametrize(
+    "handlers, snap_start, provisioned",
+    [
+        ([_handler("a", snap_start=True), _handler("b")], True, 0),
+        (
+            [_handler("a", snap_start=True), _handler("b", provisioned_concurrency=2)],
+            False,
+            2,
+        ),
+    ],
+)
+def test_router_configs_never_combine_snapstart_and_provisioning(
+    handlers, snap_start, provisioned
+):
+    config = create_router_config("songs", handlers, BACKEND)
+
+    assert config.snap_start is snap_start
+    assert config.provisioned_concurrency == provisioned
+    assert config.publishes_versions
+
+
+def test_router_configs_cover_the_most_demanding_handler():
+    config = create_router_config(
+        "songs",
+        [
+            _handler("a", timeout_seconds=30, reserved_concurrency=2),
+            _handler("b", memory_size=1024, reserved_concurrency=3),
+        ],
+        BACKEND,
+    )
+
+    assert (config.timeout_seconds, config.memory_size) == (30, 1024)
+    assert config.reserved_concurrency == 5
+
+
+def test_router_configs_only_include_their_handlers():
+    config = create_router_config(
+        "tunings",
+        [
+            _handler("a", os.path.join(BACKEND, "tunings", "get")),
+            _handler("b", os.path.join(BACKEND, "tunings", "post")),
+        ],
+        BACKEND,
+    )
+
+    assert config.code_path == BACKEND
+    assert config.code_include == ("router", "tunings/get", "tunings/post")
+
+
+def test_bundles_hold_the_included_code_and_its_requirements(tmp_path, monkeypatch):
+    root = tmp_path / "backend"
+    for directory in ("router", "songs/get", "songs/transpose"):
+        (root / directory).mkdir(parents=True)
+        (root / directory / "index.py").write_text(f"# {directory}\n")
+    (root / "songs/transpose/requirements.txt").write_text("numpy\n")
+    monkeypatch.setattr(bundling, "BUNDLE_DIR", str(tmp_path / "assets"))
+    monkeypatch.setattr(bundling, "HASH_CACHE", str(tmp_path / "hashes.json"))
+    installed = []
+
+    def install(root, target, platform, include=None):
+        installed.extend(bundling._requirements(root, include))
+
+    monkeypatch.setattr(bundling, "_install_requirements", install)
+    platform = ("manylinux2014_aarch64", "3.14")
+
+    path = bundling.bundle(str(root), "Router", platform, ("router", "songs/get"))
+
+    assert zipfile.ZipFile(path).namelist() == ["router/index.py", "songs/get/index.py"]
+    assert installed == []
+    bundling.bundle(str(root), "Router", platform, ("router", "songs/transpose"))
+    assert installed == [str(root / "songs/transpose/requirements.txt")]
+
+
+def _function(stack):
+    return _lambda.Function(
+        stack,
+        "Function",
+        runtime=_lambda.Runtime.PYTHON_3_12,
+        handler="index.handler",
+        code=_lambda.Code.from_inline("def handler(event, context): pass"),
+    )
+
+
+def test_provisioned_aliases_scale_on_utilization():
+    stack = cdk.Stack(cdk.App(), "Test")
+    config = _handler("a", provisioned_concurrency=2, provisioned_concurrency_max=6)
+
+    assert create_lambda_alias(_function(stack), config).alias_name == LIVE_ALIAS
+    template = Template.from_stack(stack)
+    template.has_resource_properties(
+        "AWS::Lambda::Alias",
+        {"ProvisionedConcurrencyConfig": {"ProvisionedConcurrentExecutions": 2}},
+    )
+    template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalableTarget",
+        {"MinCapacity": 2, "MaxCapacity": 6},
+    )
+
+
+def test_functions_without_cold_start_knobs_have_no_alias():
+    stack = cdk.Stack(cdk.App(), "Test")
+    assert create_lambda_alias(_function(stack), _handler("a")) is None
+
+
+def test_snapstart_and_provisioning_are_exclusive():
+    config = _handler("a", snap_start=True, provisioned_concurrency=1)
+    with pytest.raises(ValueError):
+        create_lambda_function(cdk.Stack(cdk.App(), "Test"), config, "grammy")
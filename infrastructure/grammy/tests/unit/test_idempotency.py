@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from grammy_common import api, cache, db, idempotency, keys
+
+
+@pytest.fixture
+def post_song(table, load_handler, api_event, monkeypatch):
+    monkeypatch.setattr(api, "WRITE_ROUTES", frozenset(["POST /songs"]))
+    monkeypatch.setattr(idempotency, "_responses", cache.LRUCache(16, 300))
+    handler = load_handler("songs/post").handler
+
+    def post(body, key="key-1", caller="user-1"):
+        headers = {"Idempotency-Key": key} if key else {}
+        context = {"authorizer": {"claims": {"sub": caller}}} if caller else {}
+        event = api_event("POST", body, headers, context=context)
+        return handler({**event, "resource": "/songs", "path": "/songs"}, None)
+
+    return post
+
+
+def _songs():
+    items, _ = db.list_items(keys.SONG)
+    return items
+
+
+def test_retries_replay_the_stored_response(post_song, monkeypatch):
+    first = post_song({"title": "Kashmir"})
+    # From the table, not the execution environment's memory
+    monkeypatch.setattr(idempotency, "_responses", cache.LRUCache(16, 300))
+    retry = post_song({"title": "Kashmir"})
+
+    assert first["statusCode"] == retry["statusCode"] == 201
+    assert json.loads(retry["body"]) == json.loads(first["body"])
+    assert retry["headers"][idempotency.REPLAYED_HEADER] == "true"
+    assert idempotency.REPLAYED_HEADER not in first["headers"]
+    assert len(_songs()) == 1
+
+
+def test_keys_reused_with_another_body_are_rejected(post_song):
+    post_song({"title": "Kashmir"})
+
+    assert post_song({"title": "Black Dog"})["statusCode"] == 422
+    assert len(_songs()) == 1
+
+
+def test_keys_are_scoped_to_the_caller(post_song):
+    post_song({"title": "Kashmir"}, caller="user-1")
+    post_song({"title": "Kashmir"}, caller="user-2")
+
+    assert len(_songs()) == 2
+    assert post_song({"title": "Kashmir"}, caller=None)["statusCode"] == 401
+
+
+def test_failed_requests_release_the_key(post_song, monkeypatch):
+    create = db.create
+
+    def failing(*args, **kwargs):
+        raise api.ApiError(503, "Try again")
+
+    monkeypatch.setattr(db, "create", failing)
+    assert post_song({"title": "Kashmir"})["statusCode"] == 503
+
+    monkeypatch.setattr(db, "create", create)
+    assert post_song({"title": "Kashmir"})["statusCode"] == 201
+
+
+def test_routes_not_marked_as_writes_ignore_the_key(post_song, monkeypatch):
+    monkeypatch.setattr(api, "WRITE_ROUTES", frozenset())
+    post_song({"title": "Kashmir"})
+    post_song({"title": "Kashmir"})
+
+    assert len(_songs()) == 2
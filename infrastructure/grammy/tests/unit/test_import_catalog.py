@@ -0,0 +1,70 @@
+import argparse
+import importlib.util
+import os
+
+import pytest
+
+from grammy.config import PROJECT_NAME
+from grammy_common import db, keys
+
+TOOL = os.path.join(
+    os.path.dirname(__file__), *[".."] * 4, "tools", "import_catalog.py"
+)
+
+
+@pytest.fixture
+def import_catalog():
+    spec = importlib.util.spec_from_file_location("import_catalog", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _import(import_catalog, tmp_path, rows):
+    path = tmp_path / "tunings.csv"
+    path.write_text("id,name\n" + "".join(f"{id},{name}\n" for id, name in rows))
+    args = argparse.Namespace(
+        inputs=[str(path)],
+        table=f"{PROJECT_NAME}-table-test",
+        type="tuning",
+        format="auto",
+        workers=2,
+        rate=1000,
+        min_rate=25,
+        max_rate=1000,
+        increase=50,
+        checkpoint=str(tmp_path / "checkpoint.json"),
+        failures=str(tmp_path / "failures.jsonl"),
+        restart=True,
+        report_seconds=60,
+    )
+    return import_catalog.run(args, db.client)
+
+
+def test_reimports_keep_existing_items(table, import_catalog, tmp_path):
+    assert _import(import_catalog, tmp_path, [("standard", "Standard")]) == 0
+    db.update(keys.TUNING, "standard", {"name": "Edited"}, 1)
+    created = db.get(keys.TUNING, "standard")["createdAt"]
+
+    rows = [("standard", "Standard"), ("drop-d", "Drop D")]
+    assert _import(import_catalog, tmp_path, rows) == 0
+
+    kept = db.get(keys.TUNING, "standard")
+    assert kept["name"] == "Edited" and kept["version"] == 2
+    assert kept["createdAt"] == created
+    assert db.get(keys.TUNING, "drop-d")["version"] == 1
+
+
+def test_interrupted_imports_still_invalidate_caches(
+    table, import_catalog, tmp_path, monkeypatch
+):
+    chunks = import_catalog.chunks
+
+    def interrupted(*args):
+        yield from chunks(*args)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(import_catalog, "chunks", interrupted)
+    assert _import(import_catalog, tmp_path, [("standard", "Standard")]) == 130
+
+    assert db.read_version(keys.TUNING)[0] == 1
@@ -0,0 +1,30 @@
+import sys
+
+import pytest
+
+from grammy_common.lazy import lazy_import
+
+
+@pytest.fixture
+def module_dir(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    sys.modules.pop("heavy", None)
+
+
+def test_modules_run_on_first_attribute_access(module_dir):
+    runs = module_dir / "runs"
+    (module_dir / "heavy.py").write_text(
+        f"with open({str(runs)!r}, 'a') as f:\n    f.write('x')\nVALUE = 42\n"
+    )
+
+    heavy = lazy_import("heavy")
+    assert not runs.exists()
+    assert heavy.VALUE == 42
+    assert lazy_import("heavy") is heavy
+    assert runs.read_text() == "x"
+
+
+def test_missing_modules_fail_at_once():
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("no_such_module_here")
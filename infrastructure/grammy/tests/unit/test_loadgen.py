@@ -0,0 +1,59 @@
+import importlib.util
+import os
+
+import pytest
+
+TOOL = os.path.join(os.path.dirname(__file__), *[".."] * 4, "tools", "loadgen.py")
+
+
+@pytest.fixture(scope="module")
+def loadgen():
+    spec = importlib.util.spec_from_file_location("loadgen", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_templates_expand_variables_and_repeats(loadgen):
+    scenario = loadgen.Scenario(
+        {"requests": [{"path": "/"}], "variables": {"project": ["p1"]}}
+    )
+    body = scenario.render(
+        {
+            "items": {
+                "$repeat": 2,
+                "item": {"name": "Song {seq}", "projectId": "{project}"},
+            }
+        }
+    )
+
+    assert body == {
+        "items": [
+            {"name": "Song 1", "projectId": "p1"},
+            {"name": "Song 2", "projectId": "p1"},
+        ]
+    }
+
+
+def test_captures_follow_paths_into_lists(loadgen):
+    scenario = loadgen.Scenario({"requests": [{"path": "/"}]})
+    scenario.capture(
+        {"capture": {"ids": "succeeded[*].id"}},
+        {"succeeded": [{"id": "a"}, {"id": "b"}]},
+    )
+
+    assert scenario.variables["ids"] == ["a", "b"]
+    assert scenario.render("/projects/{ids}") in ("/projects/a", "/projects/b")
+
+
+def test_reports_count_errors_and_percentiles(loadgen):
+    stats = loadgen.Stats()
+    for elapsed_ms in range(1, 101):
+        status = 502 if elapsed_ms == 100 else 200
+        stats.record("GET /songs", status, elapsed_ms, {"X-Dynamodb-Calls": "2"})
+    report = loadgen.summarize(stats, duration=10)["GET /songs"]
+
+    assert report["requests"] == 100 and report["errors"] == 1
+    assert report["throughput"] == 10
+    assert (report["p50"], report["p99"]) == (51, 100)
+    assert report["dynamodb_calls"] == 2 and report["handler_p50"] is None
@@ -0,0 +1,62 @@
+import http.client
+import importlib.util
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+TOOL = os.path.join(os.path.dirname(__file__), *[".."] * 4, "tools", "local_api.py")
+
+
+@pytest.fixture
+def local_api(monkeypatch):
+    spec = importlib.util.spec_from_file_location("local_api", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setenv("WRITE_ROUTES", "[]")
+    return module
+
+
+@pytest.fixture
+def server(table, local_api):
+    routes = local_api.load_routes()
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), local_api.make_request_handler(routes)
+    )
+    server.verbose = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield http.client.HTTPConnection(*server.server_address)
+    server.shutdown()
+    server.server_close()
+
+
+def _request(connection, method, path, body=None):
+    connection.request(method, path, json.dumps(body) if body is not None else None)
+    response = connection.getresponse()
+    payload = response.read()
+    return response.status, json.loads(payload) if payload else None, response.headers
+
+
+def test_literal_paths_win_over_parameters(local_api):
+    routes = local_api.load_routes()
+
+    route, parameters = local_api.match(routes, "POST", "/songs/batch")
+    assert route.name == "POST /songs/batch" and parameters == {}
+    route, parameters = local_api.match(routes, "GET", "/songs/s1/assets/a1")
+    assert route.name == "GET /songs/{id}/assets/{assetId}"
+    assert parameters == {"id": "s1", "assetId": "a1"}
+    assert local_api.match(routes, "DELETE", "/health") == (None, None)
+
+
+def test_requests_are_served_by_the_handlers(server):
+    status, tuning, headers = _request(server, "POST", "/tunings", {"name": "Drop D"})
+    assert status == 201 and headers["X-Route"] == "POST /tunings"
+    assert float(headers["X-Handler-Ms"]) > 0
+
+    status, body, headers = _request(server, "GET", f"/tunings/{tuning['id']}")
+    assert status == 200 and body["name"] == "Drop D"
+    assert headers["X-Route"] == "GET /tunings/{id}"
+    assert _request(server, "GET", "/unknown")[0] == 404
@@ -0,0 +1,56 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+TOOL = os.path.join(os.path.dirname(__file__), *[".."] * 4, "tools", "measure_init.py")
+
+
+@pytest.fixture
+def measure_init(monkeypatch):
+    spec = importlib.util.spec_from_file_location("measure_init", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(
+        module,
+        "find_handlers",
+        lambda: {"songs/get": "songs", "tunings/get": "tunings"},
+    )
+    monkeypatch.setattr(
+        module,
+        "measure",
+        lambda code_path, repeat: [{"songs": 100.0, "tunings": 10.0}[code_path]]
+        * repeat,
+    )
+    return module
+
+
+def _run(measure_init, monkeypatch, *args):
+    monkeypatch.setattr("sys.argv", ["measure_init.py", "--repeat", "1", *args])
+    return measure_init.main()
+
+
+def test_handlers_exclude_the_shared_layer():
+    spec = importlib.util.spec_from_file_location("measure_init", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    handlers = module.find_handlers()
+    assert "health/get" in handlers
+    assert not any(name.startswith("shared") for name in handlers)
+
+
+def test_slower_handlers_fail_against_the_baseline(measure_init, monkeypatch, tmp_path):
+    baseline = tmp_path / "init.json"
+    assert (
+        _run(
+            measure_init, monkeypatch, "--baseline", str(baseline), "--update-baseline"
+        )
+        == 0
+    )
+    assert json.loads(baseline.read_text()) == {"songs/get": 100.0, "tunings/get": 10.0}
+
+    assert _run(measure_init, monkeypatch, "--baseline", str(baseline)) == 0
+    baseline.write_text(json.dumps({"songs/get": 50.0, "tunings/get": 10.0}))
+    assert _run(measure_init, monkeypatch, "--baseline", str(baseline)) == 1
@@ -0,0 +1,90 @@
+import importlib.util
+import os
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+from grammy_common import db, keys, streams, summaries
+
+TOOL = os.path.join(os.path.dirname(__file__), *[".."] * 4, "tools", "migrate_keys.py")
+
+
+@pytest.fixture
+def migrate_keys(monkeypatch):
+    spec = importlib.util.spec_from_file_location("migrate_keys", TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setenv("db.TABLE_NAME", db.TABLE_NAME)
+    monkeypatch.setattr("sys.argv", ["migrate_keys.py", "--table", db.TABLE_NAME])
+    return module
+
+
+@pytest.fixture
+def old_layout(table):
+    items = [
+        {"PK": "PROJECT", "SK": "PROJECT#p1", "id": "p1", "type": "project"},
+        {"PK": "SONG", "SK": "SONG#s1", "id": "s1", "type": "song", "projectId": "p1"},
+        {"PK": "SONG", "SK": "SONG#s2", "id": "s2", "type": "song", "projectId": "p1"},
+        {"PK": "SEARCH", "SK": "SONG#s1", "terms": ["song"]},
+        {"PK": "SUMMARY", "SK": "PROJECT#p1", "songCount": 7},
+    ]
+    for item in items:
+        table.put_item(Item={**item, "name": "Old"})
+    return items
+
+
+def _partition(partition):
+    return list(
+        db.query_all(
+            KeyConditionExpression="PK = :pk",
+            ExpressionAttributeValues={":pk": partition},
+        )
+    )
+
+
+def test_items_move_to_their_own_partitions(old_layout, migrate_keys):
+    assert migrate_keys.main() == 0
+
+    for partition in ("PROJECT", "SONG", "SEARCH", "SUMMARY"):
+        assert _partition(partition) == []
+    song = db.table.get_item(Key=keys.item_key(keys.SONG, "s1"))["Item"]
+    assert song["projectId"] == "p1" and keys.MIGRATING not in song
+    assert [item["id"] for item in db.all_items(keys.SONG)] == ["s1", "s2"]
+    summary = db.table.get_item(Key=summaries.summary_key("PROJECT#p1"))["Item"]
+    assert summary["songCount"] == 2
+
+    # Rerunning finds nothing left to move
+    assert migrate_keys.main() == 0
+    assert summary == db.table.get_item(Key=summaries.summary_key("PROJECT#p1"))["Item"]
+
+
+def test_the_moves_reach_the_stream_uncounted(old_layout, migrate_keys):
+    copy = migrate_keys.migrated(keys.SONG, old_layout[1])
+    serialize = TypeSerializer().serialize
+    records = [
+        {
+            "eventName": event_name,
+            "dynamodb": {
+                "SequenceNumber": str(sequence),
+                "Keys": {"PK": serialize(item["PK"]), "SK": serialize(item["SK"])},
+                image: {name: serialize(value) for name, value in item.items()},
+            },
+        }
+        for sequence, (event_name, image, item) in enumerate(
+            [("INSERT", "NewImage", copy), ("REMOVE", "OldImage", old_layout[1])]
+        )
+    ]
+    changes = list(streams.changes({"Records": records}))
+
+    assert [change.event_name for change in changes] == ["INSERT"]
+    assert summaries.aggregate(changes[0]) == {}
+
+
+def test_nothing_moves_before_gsi4_is_active(old_layout, migrate_keys, monkeypatch):
+    description = db.client.describe_table(TableName=db.TABLE_NAME)
+    for index in description["Table"]["GlobalSecondaryIndexes"]:
+        index["IndexStatus"] = "CREATING"
+    monkeypatch.setattr(db.client, "describe_table", lambda TableName: description)
+
+    assert migrate_keys.main() == 1
+    assert len(_partition("SONG")) == 2
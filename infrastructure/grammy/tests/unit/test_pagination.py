@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from grammy_common import db, keys
+
+
+@pytest.fixture
+def songs_get(load_handler):
+    return load_handler("songs/get").handler
+
+
+def _page(songs_get, api_event, **query):
+    response = songs_get(api_event(query=query), None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_listings_are_paged_with_cursors(table, songs_get, api_event):
+    created = [db.create(keys.SONG, {"title": f"Song {n}"}) for n in range(5)]
+
+    listed, cursor = [], None
+    while True:
+        query = {"limit": "2", **({"cursor": cursor} if cursor else {})}
+        status, body = _page(songs_get, api_event, **query)
+        assert status == 200 and len(body["items"]) <= 2
+        listed += [item["id"] for item in body["items"]]
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+    assert listed == sorted(song["id"] for song in created)
+
+
+@pytest.mark.parametrize("limit", ["0", "101", "ten"])
+def test_limits_are_validated(table, songs_get, api_event, limit):
+    status, body = _page(songs_get, api_event, limit=limit)
+    assert status == 400 and "limit" in body["message"]
+
+
+def test_cursors_of_another_listing_are_rejected(table, songs_get, api_event):
+    for n in range(2):
+        db.create(keys.TUNING, {"name": f"Tuning {n}"})
+    _, cursor = db.list_items(keys.TUNING, limit=1)
+
+    assert _page(songs_get, api_event, cursor=cursor)[0] == 400
+    assert _page(songs_get, api_event, cursor="not-a-cursor")[0] == 400
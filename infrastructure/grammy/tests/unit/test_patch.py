@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from grammy_common import db, keys
+
+
+@pytest.fixture
+def song(table):
+    project = db.create(keys.PROJECT, {"name": "Album"})
+    return db.create(
+        keys.SONG,
+        {
+            "title": "Song",
+            "projectId": project["id"],
+            "instrumentId": "guitar",
+            "tuningId": "standard",
+        },
+    )
+
+
+def _stored(song_id):
+    return db.table.get_item(Key=keys.item_key(keys.SONG, song_id))["Item"]
+
+
+def _songs_in_tuning(tuning_id):
+    items, _ = db.list_items(keys.SONG, filters={"tuningId": tuning_id})
+    return [item["id"] for item in items]
+
+
+def _projects_by_instrument(instrument_id):
+    items, _ = db.list_items(keys.PROJECT, filters={"instrumentId": instrument_id})
+    return [item["id"] for item in items]
+
+
+def test_changed_references_move_the_index_entries(song):
+    changed = db.update(keys.SONG, song["id"], {"tuningId": "drop-d"}, 1)
+
+    assert changed["tuningId"] == "drop-d" and changed["version"] == 2
+    assert _songs_in_tuning("drop-d") == [song["id"]]
+    assert _songs_in_tuning("standard") == []
+
+
+def test_removed_references_leave_the_index(song):
+    changed = db.update(keys.SONG, song["id"], {"tuningId": None}, 1)
+
+    assert changed["tuningId"] is None
+    assert "tuningId" not in _stored(song["id"])
+    assert "GSI1PK" not in _stored(song["id"])
+
+
+def test_one_gsi2_reference_is_combined_with_the_stored_other(song):
+    db.update(keys.SONG, song["id"], {"instrumentId": "bass"}, 1)
+
+    assert _projects_by_instrument("bass") == [song["projectId"]]
+    assert _projects_by_instrument("guitar") == []
+
+
+def test_moving_a_song_moves_it_between_project_collections(song):
+    other = db.create(keys.PROJECT, {"name": "Other"})
+    db.update(keys.SONG, song["id"], {"projectId": other["id"]}, 1)
+
+    moved = db.get_project(other["id"], frozenset(["songs"]))
+    assert [item["id"] for item in moved["songs"]] == [song["id"]]
+    assert db.get_project(song["projectId"], frozenset(["songs"]))["songs"] == []
+    assert _projects_by_instrument("guitar") == [other["id"]]
+
+
+@pytest.mark.parametrize(
+    "changes", [{"title": "New"}, {"instrumentId": "bass"}, {"projectId": "p2"}]
+)
+def test_stale_versions_conflict_without_writing(song, changes):
+    db.update(keys.SONG, song["id"], {"title": "Current"}, 1)
+
+    with pytest.raises(db.VersionConflict) as conflict:
+        db.update(keys.SONG, song["id"], changes, 1)
+
+    assert conflict.value.version == 2
+    stored = _stored(song["id"])
+    assert stored["title"] == "Current" and stored["GSI2PK"] == "INSTRUMENT#guitar"
+
+
+def test_missing_items_are_not_created(table):
+    assert db.update(keys.SONG, "missing", {"instrumentId": "bass"}, 1) is None
+    assert db.update(keys.SONG, "missing", {"title": "New"}, 1) is None
+    assert "Item" not in db.table.get_item(Key=keys.item_key(keys.SONG, "missing"))
+
+
+def test_patch_handler_reports_conflicts(song, load_handler, api_event):
+    handler = load_handler("songs/patch").handler
+
+    def patch(body):
+        response = handler(api_event("PATCH", body, path={"id": song["id"]}), None)
+        return response["statusCode"], json.loads(response["body"])
+
+    assert patch({"title": "New", "version": 1})[0] == 200
+    status, body = patch({"instrumentId": "bass", "version": 1})
+    assert status == 409 and "version is 2" in body["message"]
+    assert patch({"version": 2})[0] == 400
@@ -0,0 +1,63 @@
+from grammy_common import db, keys
+
+
+def _create(entity, **attributes):
+    return db.create(entity, attributes)
+
+
+def test_projects_by_instrument_are_listed_once(table):
+    instrument = _create(keys.INSTRUMENT, name="Guitar")
+    projects = [_create(keys.PROJECT, name=f"Project {index}") for index in range(5)]
+    for project in projects:
+        for index in range(3):
+            _create(
+                keys.SONG,
+                title=f"Song {index}",
+                projectId=project["id"],
+                instrumentId=instrument["id"],
+            )
+    _create(keys.PROJECT, name="Other")
+
+    listed, cursor = [], None
+    while True:
+        page, cursor = db.list_items(
+            keys.PROJECT,
+            limit=2,
+            cursor=cursor,
+            filters={"instrumentId": instrument["id"]},
+        )
+        assert len(page) == 2 or cursor is None
+        listed += [project["id"] for project in page]
+        if cursor is None:
+            break
+
+    assert sorted(listed) == sorted(project["id"] for project in projects)
+
+
+def _list_all(entity, **params):
+    listed, cursor = [], None
+    while True:
+        page, cursor = db.list_items(entity, cursor=cursor, **params)
+        listed += page
+        if cursor is None:
+            return listed
+
+
+def test_types_are_listed_in_id_order_across_shards(table):
+    created = sorted(
+        _create(keys.TUNING, name=f"Tuning {index}")["id"] for index in range(30)
+    )
+    assert len({keys.type_keys(keys.TUNING, id)["GSI4PK"] for id in created}) > 1
+
+    listed = _list_all(keys.TUNING, limit=7, fields=("name",))
+
+    assert [tuning["id"] for tuning in listed] == created
+    assert set(listed[0]) == {"id", "type", "version", "updatedAt", "name"}
+
+
+def test_type_listing_is_bounded_by_id_range(table):
+    created = sorted(_create(keys.SONG, title="Song")["id"] for _ in range(12))
+
+    listed = _list_all(keys.SONG, limit=2, start=created[3], end=created[8])
+
+    assert [song["id"] for song in listed] == created[3:9]
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from grammy_common import db, keys
+
+
+@pytest.fixture
+def project(table):
+    project = db.create(keys.PROJECT, {"name": "Album"})
+    guitar = db.create(keys.INSTRUMENT, {"name": "Guitar"})
+    standard = db.create(keys.TUNING, {"name": "Standard"})
+    for title in ("One", "Two"):
+        db.create(
+            keys.SONG,
+            {
+                "title": title,
+                "projectId": project["id"],
+                "instrumentId": guitar["id"],
+                "tuningId": standard["id"],
+            },
+        )
+    return project
+
+
+def _get(load_handler, api_event, project_id, **query):
+    event = api_event(path={"id": project_id}, query=query or None)
+    response = load_handler("projects/get_id").handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_related_entities_are_read_with_one_query(
+    project, load_handler, api_event, monkeypatch
+):
+    queries = []
+    query = db.table.query
+    monkeypatch.setattr(
+        db.table, "query", lambda **params: queries.append(params) or query(**params)
+    )
+    status, body = _get(
+        load_handler, api_event, project["id"], include="songs,instruments,tunings"
+    )
+
+    assert status == 200 and len(queries) == 1
+    assert sorted(song["title"] for song in body["songs"]) == ["One", "Two"]
+    assert [instrument["name"] for instrument in body["instruments"]] == ["Guitar"]
+    assert [tuning["name"] for tuning in body["tunings"]] == ["Standard"]
+
+
+def test_projects_without_include_are_read_alone(project, load_handler, api_event):
+    status, body = _get(load_handler, api_event, project["id"])
+
+    assert status == 200 and body["name"] == "Album"
+    assert "songs" not in body
+
+
+def test_unknown_includes_and_projects(project, load_handler, api_event):
+    assert _get(load_handler, api_event, project["id"], include="users")[0] == 400
+    assert _get(load_handler, api_event, "missing", include="songs")[0] == 404
@@ -0,0 +1,118 @@
+import pytest
+
+from grammy_common import db, keys, search
+
+
+def _doc(entity, entity_id, text, sequence):
+    doc = search.document(entity, {"title": text, "name": text})
+    return search.document_item(entity, entity_id, doc, sequence)
+
+
+@pytest.fixture
+def index():
+    index = search.Index()
+    index.apply(_doc(keys.SONG, "1", "Stairway to Heaven", 1))
+    index.apply(_doc(keys.SONG, "2", "Starman", 2))
+    index.apply(_doc(keys.INSTRUMENT, "3", "Stratocaster", 3))
+    return index
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    monkeypatch.setattr(search, "_index", search.Index())
+    monkeypatch.setattr(search, "_synced_at", None)
+    monkeypatch.setattr(search, "SYNC_SECONDS", 0)
+
+
+def _ids(results):
+    return [result["id"] for result in results]
+
+
+def test_tokens_match_indexed_terms_by_prefix(index):
+    assert _ids(index.search("sta")) == ["2", "1"]
+    assert _ids(index.search("stair")) == ["1"]
+
+
+def test_every_word_must_match(index):
+    assert _ids(index.search("sta heav")) == ["1"]
+    assert index.search("sta xylophone") == []
+
+
+def test_exact_terms_outrank_prefixes(index):
+    index.apply(_doc(keys.SONG, "4", "Star", 4))
+    assert _ids(index.search("star"))[0] == "4"
+
+
+def test_misspelled_words_match_by_trigrams(index):
+    assert _ids(index.search("stratocater")) == ["3"]
+
+
+def test_results_are_filtered_by_type(index):
+    assert _ids(index.search("st", types=["instrument"])) == ["3"]
+
+
+def test_prefix_matches_are_bounded(index, monkeypatch):
+    monkeypatch.setattr(search, "MAX_PREFIX_TERMS", 1)
+    assert _ids(index.search("sta")) == ["1"]
+
+
+def test_accents_and_case_are_ignored(index):
+    index.apply(_doc(keys.SONG, "5", "Café Olé", 5))
+    assert _ids(index.search("CAFE ole")) == ["5"]
+
+
+def test_tombstones_and_stale_documents(index):
+    index.apply(_doc(keys.SONG, "1", "Kashmir", 6))
+    index.apply(_doc(keys.SONG, "1", "Stairway to Heaven", 5))
+    assert _ids(index.search("kashmir")) == ["1"]
+    assert index.search("stairway") == []
+
+    index.apply(search.document_item(keys.SONG, "1", None, 7))
+    assert index.search("kashmir") == []
+    assert len(index) == 2
+
+
+def test_tombstones_expire():
+    tombstone = search.document_item(keys.SONG, "1", None, 1)
+    assert tombstone["deleted"] and tombstone["ttl"] > 0
+    assert "ttl" not in _doc(keys.SONG, "1", "Kashmir", 2)
+
+
+def test_documents_are_spread_over_shards():
+    partitions = {
+        search.document_item(keys.SONG, str(number), None, number)["GSI1PK"]
+        for number in range(100)
+    }
+    assert partitions == set(keys.search_partitions())
+
+
+def test_queries_load_and_sync_the_shards(table, fresh_index):
+    song = db.create(keys.SONG, {"title": "Black Dog"})
+    search.write_documents(
+        [(keys.SONG, song["id"], {"label": "Black Dog", "text": "Black Dog"})]
+    )
+    assert _ids(search.query("black")) == [song["id"]]
+
+    other = db.create(keys.SONG, {"title": "Black Hole Sun"})
+    search.write_documents(
+        [
+            (
+                keys.SONG,
+                other["id"],
+                {"label": "Black Hole Sun", "text": "Black Hole Sun"},
+            ),
+            (keys.SONG, song["id"], None),
+        ]
+    )
+    assert _ids(search.query("black")) == [other["id"]]
+
+
+def test_stale_indexes_are_reloaded(table, fresh_index, monkeypatch):
+    search.write_documents([(keys.SONG, "1", {"label": "Kashmir", "text": "Kashmir"})])
+    search.query("kashmir")
+    # A tombstone this index never saw has expired and been deleted
+    document_key = keys.search_keys(keys.SONG, "1")
+    table.delete_item(Key={"PK": document_key["PK"], "SK": document_key["SK"]})
+    monkeypatch.setattr(search, "TOMBSTONE_SECONDS", 0)
+
+    assert search.query("kashmir") == []
@@ -0,0 +1,230 @@
+from itertools import count
+
+import pytest
+from botocore.exceptions import ClientError
+
+from grammy_common import db, keys, streams, summaries
+
+_sequence = count(100)
+
+
+def _change(entity, entity_id, old=None, new=None):
+    event_name = "REMOVE" if new is None else "INSERT" if old is None else "MODIFY"
+    return streams.Change(
+        str(next(_sequence)), event_name, 1760000000.0, entity, entity_id, old, new
+    )
+
+
+def _song(**references):
+    return {"updatedAt": "2026-10-18T00:00:00+00:00", **references}
+
+
+def _summary(*parts):
+    return db.table.get_item(Key=summaries.summary_key(*parts)).get("Item")
+
+
+def _count(*parts):
+    return int((_summary(*parts) or {}).get("songCount", 0))
+
+
+PROJECT = keys.sort_key(keys.PROJECT, "p1")
+GUITAR = keys.sort_key(keys.INSTRUMENT, "guitar")
+BASS = keys.sort_key(keys.INSTRUMENT, "bass")
+STANDARD = keys.sort_key(keys.TUNING, "standard")
+
+
+def test_songs_are_counted_per_project_instrument_and_tuning(table):
+    song = _song(projectId="p1", instrumentId="guitar", tuningId="standard")
+    changes = [
+        _change(keys.SONG, "s1", new=song),
+        _change(keys.SONG, "s2", new=song),
+        _change(keys.SONG, "s3", new=_song(projectId="p1", instrumentId="bass")),
+    ]
+
+    assert summaries.apply(changes) == []
+
+    assert _count(PROJECT) == 3
+    assert _count(PROJECT, GUITAR) == 2
+    assert _count(PROJECT, BASS) == 1
+    assert _count(GUITAR) == 2
+    assert _count(STANDARD) == 2
+    assert _summary(PROJECT)["lastActivity"] == song["updatedAt"]
+
+
+def test_moves_and_deletions_are_counted(table):
+    guitar_song = _song(projectId="p1", instrumentId="guitar")
+    bass_song = _song(projectId="p1", instrumentId="bass")
+    summaries.apply(
+        [
+            _change(keys.SONG, "s1", new=guitar_song),
+            _change(keys.SONG, "s1", old=guitar_song, new=bass_song),
+            _change(keys.SONG, "s2", new=bass_song),
+            _change(keys.SONG, "s2", old=bass_song),
+        ]
+    )
+
+    assert _count(PROJECT) == 1
+    assert _count(GUITAR) == 0 and _count(PROJECT, GUITAR) == 0
+    assert _count(BASS) == 1 and _count(PROJECT, BASS) == 1
+
+
+def test_entities_keep_their_name_and_deletion(table):
+    summaries.apply(
+        [
+            _change(keys.INSTRUMENT, "guitar", new={"name": "Guitar"}),
+            _change(keys.TUNING, "standard", new={"name": "Standard"}),
+            _change(keys.TUNING, "standard", old={"name": "Standard"}),
+        ]
+    )
+
+    assert _summary(GUITAR)["name"] == "Guitar"
+    assert _summary(GUITAR)["deleted"] is False
+    assert _summary(STANDARD)["deleted"] is True
+
+
+def test_redelivered_records_are_applied_once(table):
+    changes = [_change(keys.SONG, "s1", new=_song(projectId="p1"))]
+
+    summaries.apply(changes)
+    summaries.apply(changes)
+
+    assert _count(PROJECT) == 1
+
+
+def _recording(monkeypatch, fail_on=()):
+    """Record every transaction; raise a throttling error on the calls named."""
+    transact = db.client.transact_write_items
+    transactions = []
+
+    def recording(**params):
+        transactions.append(params["TransactItems"])
+        if len(transactions) - 1 in fail_on:
+            raise ClientError(
+                {"Error": {"Code": "ProvisionedThroughputExceededException"}},
+                "TransactWriteItems",
+            )
+        return transact(**params)
+
+    monkeypatch.setattr(db.client, "transact_write_items", recording)
+    return transactions
+
+
+def test_a_batch_writes_each_summary_once(table, monkeypatch):
+    transactions = _recording(monkeypatch)
+    song = _song(projectId="p1", instrumentId="guitar")
+
+    summaries.apply([_change(keys.SONG, f"s{n}", new=song) for n in range(10)])
+
+    assert len(transactions) == 1
+    # The marker, the project, its guitar usage and the guitar
+    assert len(transactions[0]) == 4
+    assert _count(PROJECT) == 10 and _count(GUITAR) == 10
+
+
+def test_failed_transactions_are_retried_without_double_counting(table, monkeypatch):
+    changes = [
+        _change(keys.SONG, f"s{number}", new=_song(projectId="p1"))
+        for number in range(3)
+    ]
+    _recording(monkeypatch, fail_on={0})
+
+    assert summaries.apply(changes) == [change.sequence_number for change in changes]
+    assert _count(PROJECT) == 0
+
+    monkeypatch.undo()
+    assert summaries.apply(changes) == []
+    assert summaries.apply(changes) == []
+    assert _count(PROJECT) == 3
+
+
+def test_redelivered_batches_skip_the_applied_transactions(table, monkeypatch):
+    # Each song touches a summary of its own, so two fit a transaction
+    monkeypatch.setattr(summaries, "MAX_TRANSACTION_ITEMS", 3)
+    changes = [
+        _change(keys.SONG, f"s{number}", new=_song(tuningId=f"t{number}"))
+        for number in range(5)
+    ]
+    transactions = _recording(monkeypatch, fail_on={1})
+
+    failed = summaries.apply(changes)
+
+    assert len(transactions) == 2
+    assert failed == [change.sequence_number for change in changes[2:]]
+    tunings = [keys.sort_key(keys.TUNING, f"t{number}") for number in range(5)]
+    assert [_count(tuning) for tuning in tunings] == [1, 1, 0, 0, 0]
+
+    # Lambda may retry from the first failed record or deliver the whole batch
+    assert summaries.apply(changes[2:]) == []
+    assert summaries.apply(changes) == []
+    assert [_count(tuning) for tuning in tunings] == [1, 1, 1, 1, 1]
+    assert len(transactions) == 4
+
+
+def test_summaries_have_partitions_of_their_own(table):
+    summaries.apply(
+        [_change(keys.SONG, "s1", new=_song(projectId="p1", instrumentId="guitar"))]
+    )
+
+    assert _summary(PROJECT)["PK"] == f"SUMMARY#{PROJECT}"
+    assert _summary(PROJECT, GUITAR)["PK"] == f"SUMMARY#{PROJECT}"
+    assert _summary(GUITAR)["PK"] == f"SUMMARY#{GUITAR}"
+    assert _summary(GUITAR)["GSI2PK"] in keys.summary_partitions()
+
+
+def test_applied_markers_expire(table):
+    change = _change(keys.SONG, "s1", new=_song(projectId="p1"))
+    summaries.apply([change])
+
+    marker = db.table.get_item(Key=summaries.applied_key(change.sequence_number))
+    assert marker["Item"]["ttl"] > 1760000000
+
+
+@pytest.mark.parametrize("applied", [0, 2])
+def test_rebuild_matches_the_incremental_counts(table, applied):
+    project = db.create(keys.PROJECT, {"name": "Album"})
+    instrument = db.create(keys.INSTRUMENT, {"name": "Guitar"})
+    songs = [
+        db.create(
+            keys.SONG,
+            {
+                "title": f"Song {n}",
+                "projectId": project["id"],
+                "instrumentId": instrument["id"],
+            },
+        )
+        for n in range(3)
+    ]
+    summaries.apply(
+        [_change(keys.SONG, song["id"], new=song) for song in songs[:applied]]
+    )
+
+    summaries.rebuild()
+
+    project_key = keys.sort_key(keys.PROJECT, project["id"])
+    instrument_key = keys.sort_key(keys.INSTRUMENT, instrument["id"])
+    assert _count(project_key) == 3
+    assert _count(project_key, instrument_key) == 3
+    assert _summary(instrument_key)["name"] == "Guitar"
+
+
+def test_rebuild_zeroes_the_summaries_of_deleted_items(table):
+    summaries.apply(
+        [
+            _change(keys.INSTRUMENT, "guitar", new={"name": "Guitar"}),
+            _change(keys.SONG, "s1", new=_song(projectId="p1", instrumentId="guitar")),
+        ]
+    )
+
+    summaries.rebuild()
+
+    assert _count(PROJECT) == 0 and _count(PROJECT, GUITAR) == 0
+    assert _summary(GUITAR)["deleted"] is True
+
+
+def test_migration_copies_are_not_counted(table):
+    song = _song(projectId="p1", instrumentId="guitar")
+    marked = {**song, keys.MIGRATING: True}
+
+    assert summaries.apply([_change(keys.SONG, "s1", new=marked)]) == []
+    assert summaries.apply([_change(keys.SONG, "s1", old=marked, new=song)]) == []
+    assert _summary(PROJECT) is None
@@ -0,0 +1,51 @@
+import json
+
+from grammy_common import telemetry
+
+
+def _records(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_named_routes_count_failed_records(capsys, monkeypatch):
+    monkeypatch.setattr(telemetry, "_cold_start", True)
+
+    @telemetry.instrument(route="STREAM search-indexer")
+    def handler(event, context):
+        return {"batchItemFailures": [{"itemIdentifier": "1"}]}
+
+    handler({}, None)
+    handler({}, None)
+
+    first, second = _records(capsys)
+    assert first["Route"] == "STREAM search-indexer"
+    assert first["RecordFailures"] == 1 and first["StatusCode"] == 200
+    assert first["ColdStart"] == 1 and first["InitDuration"] > 0
+    assert second["ColdStart"] == 0 and "InitDuration" not in second
+
+
+def test_api_routes_come_from_the_event(capsys, api_event):
+    handler = telemetry.instrument(lambda event, context: {"statusCode": 503})
+
+    handler({**api_event("POST"), "resource": "/songs"}, None)
+
+    (record,) = _records(capsys)
+    assert record["Route"] == "POST /songs"
+    assert record["Errors"] == 1 and "RecordFailures" not in record
+
+
+def test_handlers_without_a_result_are_recorded(capsys):
+    telemetry.instrument(route="EVENT song-asset-recorder")(lambda e, c: None)({}, None)
+
+    (record,) = _records(capsys)
+    assert record["StatusCode"] == 200
+
+
+def test_the_health_check_is_recorded(capsys, api_event, load_handler):
+    health = load_handler("health/get")
+
+    response = health.handler({**api_event("GET"), "resource": "/health"}, None)
+
+    assert response == {"statusCode": 200, "body": "Healthy!"}
+    (record,) = _records(capsys)
+    assert record["Route"] == "GET /health" and record["StatusCode"] == 200
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Tell ``deploy.sh`` what changed since the last successful deploy.
+
+Fingerprints of the deploy inputs and of every synthesized stack template
+are kept in ``infrastructure/grammy/build/deploy-state.json`` (local to this
+checkout). Asset hashes are part of the templates, so a stack's template
+changes exactly when its resources or its code do. Synth also depends on the
+``GRAMMY_*`` settings in the environment and on the CDK context, so they are
+part of its fingerprint.
+
+    python tools/deploy_changes.py frontend-changed    # exit 0 if changed
+    python tools/deploy_changes.py synth-needed        # exit 0 if needed
+    python tools/deploy_changes.py changed-stacks DIR  # names, one per line
+    python tools/deploy_changes.py record frontend|synth
+    python tools/deploy_changes.py record stacks DIR STACK...
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INFRASTRUCTURE = os.path.join(ROOT, "infrastructure", "grammy")
+STATE_FILE = os.path.join(INFRASTRUCTURE, "build", "deploy-state.json")
+
+# What the frontend build reads.
+FRONTEND_INPUTS = [
+    os.path.join(ROOT, "frontend", name)
+    for name in (
+        "src",
+        "public",
+        "index.html",
+        "vite.config.js",
+        "package.json",
+        "package-lock.json",
+        "Dockerfile",
+    )
+]
+# What synth reads: the CDK app, the code it bundles and the built frontend.
+SYNTH_INPUTS = [
+    INFRASTRUCTURE,
+    os.path.join(ROOT, "backend"),
+    os.path.join(ROOT, "frontend", "dist"),
+]
+# The settings grammy/config.py reads from the environment.
+SYNTH_ENVIRONMENT = (
+    "GRAMMY_TABLE_INDEXES",
+    "GRAMMY_ASSET_SIGNING_KEY",
+    "GRAMMY_ACCOUNT_CONCURRENCY",
+    "GRAMMY_ALARM_EMAIL",
+    "GRAMMY_DISTRIBUTION_ID",
+    "GRAMMY_ASSET_UNSIGNED_DOWNLOADS",
+)
+# Where the CDK CLI reads context from, the user's own settings included.
+CONTEXT_FILES = [
+    os.path.join(INFRASTRUCTURE, "cdk.json"),
+    os.path.join(INFRASTRUCTURE, "cdk.context.json"),
+    os.path.join(os.path.expanduser("~"), ".cdk.json"),
+]
+SKIPPED = frozenset(
+    ("__pycache__", ".pytest_cache", ".ruff_cache", ".venv", "build", "cdk.out")
+)
+
+
+def fingerprint(paths: list) -> str:
+    """Hash the names and contents of every file under ``paths``."""
+    digest = hashlib.sha256()
+    for top in paths:
+        if os.path.isfile(top):
+            files = [top]
+        else:
+            files = []
+            for directory, subdirectories, names in os.walk(top):
+                subdirectories[:] = sorted(
+                    name for name in subdirectories if name not in SKIPPED
+                )
+                files.extend(
+                    os.path.join(directory, name)
+                    for name in sorted(names)
+                    if not name.endswith(".pyc")
+                )
+        for path in files:
+            digest.update(os.path.relpath(path, ROOT).encode() + b"\0")
+            with open(path, "rb") as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def _context(path: str) -> dict:
+    try:
+        with open(path) as file:
+            settings = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    # cdk.context.json is all context; the other files keep it under a key
+    if os.path.basename(path) == "cdk.context.json":
+        return settings
+    return settings.get("context", {})
+
+
+def synth_fingerprint() -> str:
+    """Hash everything synth reads: files, environment settings and context."""
+    environment = {name: os.environ.get(name) for name in SYNTH_ENVIRONMENT}
+    digest = hashlib.sha256(fingerprint(SYNTH_INPUTS).encode())
+    digest.update(json.dumps(environment, sort_keys=True).encode())
+    # The signing key is read from the file the setting names
+    signing_key = environment["GRAMMY_ASSET_SIGNING_KEY"]
+    if signing_key and os.path.isfile(signing_key):
+        with open(signing_key, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    for path in CONTEXT_FILES:
+        digest.update(json.dumps(_context(path), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def stack_templates(assembly: str) -> dict:
+    """Return the template hash of every stack in a cloud assembly."""
+    with open(os.path.join(assembly, "manifest.json")) as file:
+        manifest = json.load(file)
+    templates = {}
+    for name, artifact in manifest.get("artifacts", {}).items():
+        if artifact.get("type") != "aws:cloudformation:stack":
+            continue
+        template = artifact["properties"]["templateFile"]
+        with open(os.path.join(assembly, template), "rb") as file:
+            templates[name] = hashlib.sha256(file.read()).hexdigest()
+    return templates
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: dict) -> None:
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    temporary = f"{STATE_FILE}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(state, file, indent=2)
+    os.replace(temporary, STATE_FILE)
+
+
+def main(argv: list) -> int:
+    if not argv:
+        print(__doc__, file=sys.stderr)
+        return 2
+    command, arguments = argv[0], argv[1:]
+    state = load_state()
+
+    if command == "frontend-changed":
+        dist = os.path.join(ROOT, "frontend", "dist")
+        changed = not os.path.isdir(dist) or state.get("frontend") != fingerprint(
+            FRONTEND_INPUTS
+        )
+        return 0 if changed else 1
+    if command == "synth-needed":
+        assembly = os.path.join(INFRASTRUCTURE, "cdk.out", "manifest.json")
+        needed = not os.path.exists(assembly) or state.get("synth") != (
+            synth_fingerprint()
+        )
+        return 0 if needed else 1
+    if command == "changed-stacks":
+        deployed = state.get("stacks", {})
+        for name, digest in sorted(stack_templates(arguments[0]).items()):
+            if deployed.get(name) != digest:
+                print(name)
+        return 0
+    if command == "record" and arguments[:1] == ["frontend"]:
+        state["frontend"] = fingerprint(FRONTEND_INPUTS)
+    elif command == "record" and arguments[:1] == ["synth"]:
+        state["synth"] = synth_fingerprint()
+    elif command == "record" and arguments[:1] == ["stacks"]:
+        templates = stack_templates(arguments[1])
+        deployed = state.setdefault("stacks", {})
+        for name in arguments[2:]:
+            deployed[name] = templates[name]
+    else:
+        print(__doc__, file=sys.stderr)
+        return 2
+    save_state(state)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
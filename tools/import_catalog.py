@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""Bulk-load a catalog of songs, instruments, tunings or projects.
+
+Rows are read from CSV or JSONL files as a stream, mapped to table items with
+the layer's key scheme (``grammy_common.keys``), and written by concurrent
+``BatchWriteItem`` workers, straight to the table:
+
+    python tools/import_catalog.py songs.csv --type song --table grammy-table-test
+    python tools/import_catalog.py catalog.jsonl --table grammy-local \\
+        --endpoint-url http://localhost:8000
+
+A row's ``type`` column (or ``--type``) names its entity. Rows keep their
+``id``; rows without one get an id derived from the file name and row number,
+so importing a file twice writes the same items instead of duplicates. Items
+already in the table are left as they are, keeping their version and
+``createdAt``: each chunk's keys are read first and only the missing items
+are written. CSV values are strings and empty cells are left out; JSONL keeps
+JSON types.
+
+The write rate adapts to the table: it starts at ``--rate`` items/s, grows
+while writes succeed and halves whenever DynamoDB throttles or returns
+unprocessed items. Progress, throughput and throttling are reported every
+``--report-seconds``. The checkpoint file records, per input, the row up to
+which everything is written; a rerun resumes after it (``--restart`` ignores
+it). Rows that cannot be written are appended to the failures file with the
+reason, and do not block the checkpoint.
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAYER = os.path.join(ROOT, "backend", "shared", "python")
+
+sys.path.insert(0, LAYER)
+from grammy_common import keys  # noqa: E402
+
+CHUNK_SIZE = 25  # BatchWriteItem limit
+MAX_ATTEMPTS = 10
+MAX_DELAY_SECONDS = 5.0
+THROTTLE_ERRORS = frozenset(
+    (
+        "ProvisionedThroughputExceededException",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+    )
+)
+# Rows are numbered from 1; their ids are stable across reruns of a file.
+ID_NAMESPACE = uuid.UUID("6f1c7a52-2d0e-4b7e-9d55-3f0f8c1a9e21")
+
+
+class AdaptiveRate:
+    """Token bucket whose rate follows the table's throttling (AIMD).
+
+    Every successful write raises the rate by ``increase`` items/s per second
+    of writing at that rate; a throttled one halves it, at most once a second
+    so that one burst of throttling counts once.
+    """
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, increase: float):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self._tokens = 0.0
+        self._refilled = time.monotonic()
+        self._decreased = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int) -> None:
+        """Block until ``count`` items may be written."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    max(self.rate, count),
+                    self._tokens + (now - self._refilled) * self.rate,
+                )
+                self._refilled = now
+                if self._tokens >= count:
+                    self._tokens -= count
+                    return
+                wait = (count - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def succeeded(self, count: int) -> None:
+        with self._lock:
+            self.rate = min(
+                self.max_rate, self.rate + self.increase * count / self.rate
+            )
+
+    def throttled(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._decreased >= 1.0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._decreased = now
+
+
+class Checkpoint:
+    """Per-input row up to which every row has been written or rejected.
+
+    Chunks finish out of order; each one covers a contiguous range of rows,
+    and an input's mark only moves past ranges that are all done.
+    """
+
+    def __init__(self, path: str, restart: bool):
+        self.path = path
+        self.marks = {}
+        if not restart and os.path.exists(path):
+            with open(path) as file:
+                self.marks = json.load(file)["inputs"]
+        self._done = {}
+        self._lock = threading.Lock()
+
+    def mark(self, source: str) -> int:
+        return self.marks.get(source, 0)
+
+    def done(self, source: str, first: int, last: int) -> None:
+        with self._lock:
+            ranges = self._done.setdefault(source, {})
+            ranges[first] = last
+            mark = self.marks.get(source, 0)
+            while mark + 1 in ranges:
+                mark = ranges.pop(mark + 1)
+            self.marks[source] = mark
+
+    def save(self) -> None:
+        with self._lock:
+            state = {"inputs": dict(self.marks)}
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(state, file, indent=2)
+        os.replace(temporary, self.path)
+
+
+class Stats:
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+        self.throttled = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    def add(self, **counts) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+class Failures:
+    """Append-only JSONL file of rows that could not be imported."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def record(self, source: str, row_number: int, reason: str, row) -> None:
+        entry = {"input": source, "row": row_number, "reason": reason, "data": row}
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(json.dumps(entry, default=str) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def read_rows(path: str, file_format: str):
+    """Yield ``(row number, row)`` from a CSV or JSONL file, as a stream."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            for number, row in enumerate(csv.DictReader(file), start=1):
+                yield (
+                    number,
+                    {name: value for name, value in row.items() if name and value},
+                )
+            return
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line, parse_float=Decimal)
+            except ValueError:
+                row = line  # rejected by to_item
+            yield number, row
+
+
+def input_format(path: str, requested: str) -> str:
+    if requested != "auto":
+        return requested
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format")
+
+
+def to_item(row: dict, default_type: str, source: str, number: int, now: str):
+    """Map a row to a table item, as ``db.create`` would build it."""
+    if not isinstance(row, dict):
+        raise ValueError("row is not a JSON object")
+    entity = keys.ENTITIES.get(row.get("type") or default_type)
+    if entity is None:
+        raise ValueError(f"unknown type {row.get('type') or default_type!r}")
+    entity_id = str(
+        row.get("id")
+        or uuid.uuid5(ID_NAMESPACE, f"{os.path.basename(source)}:{number}")
+    ).strip()
+    if not entity_id:
+        raise ValueError("empty id")
+    item = keys.to_item(entity, entity_id, row)
+    item["createdAt"] = now
+    item["updatedAt"] = now
+    item["version"] = 1
+    item.update(keys.index_keys(entity, item))
+    return entity, item
+
+
+def chunks(args, checkpoint: Checkpoint, failures: Failures, stats: Stats, imported):
+    """Yield ``(source, first row, last row, rows)`` chunks for the workers.
+
+    ``rows`` holds ``(row number, item)`` pairs.
+
+    The rows of one input are covered by consecutive chunks without gaps,
+    including rows that were skipped or rejected, so that the checkpoint can
+    move past them.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    for path in args.inputs:
+        source = os.path.abspath(path)
+        file_format = input_format(path, args.format)
+        resume_after = checkpoint.mark(source)
+        first, rows, item_keys, last = resume_after + 1, [], set(), resume_after
+        for number, row in read_rows(path, file_format):
+            last = number
+            if number <= resume_after:
+                continue
+            stats.add(read=1)
+            try:
+                entity, item = to_item(row, args.type, path, number, now)
+            except ValueError as exc:
+                failures.record(source, number, str(exc), row)
+                stats.add(failed=1)
+                continue
+            key = (item["PK"], item["SK"])
+            # A batch may not name one key twice.
+            if key in item_keys:
+                yield source, first, number - 1, rows
+                first, rows, item_keys = number, [], set()
+            imported.add(entity)
+            rows.append((number, item))
+            item_keys.add(key)
+            if len(rows) == CHUNK_SIZE:
+                yield source, first, number, rows
+                first, rows, item_keys = number + 1, [], set()
+        if last >= first:
+            yield source, first, last, rows
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(random.uniform(0, min(MAX_DELAY_SECONDS, 0.05 * 2**attempt)))
+
+
+def existing_keys(client, table_name, rows) -> set:
+    """Return the ``(PK, SK)`` of the rows' items already in the table."""
+    from botocore.exceptions import ClientError
+
+    pending = {
+        table_name: {
+            "Keys": [{"PK": item["PK"], "SK": item["SK"]} for _, item in rows],
+            "ProjectionExpression": "PK, SK",
+        }
+    }
+    found = set()
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = client.batch_get_item(RequestItems=pending)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] not in THROTTLE_ERRORS:
+                raise
+            _backoff(attempt)
+            continue
+        found.update(
+            (item["PK"], item["SK"]) for item in response["Responses"][table_name]
+        )
+        pending = response.get("UnprocessedKeys")
+        if not pending:
+            return found
+        _backoff(attempt)
+    raise RuntimeError("existing items still unprocessed")
+
+
+def write_chunk(client, table_name, limiter, stats, failures, source, rows):
+    """Write the chunk's new items, retrying unprocessed and throttled ones."""
+    from botocore.exceptions import ClientError
+
+    try:
+        existing = existing_keys(client, table_name, rows)
+    except (ClientError, RuntimeError) as exc:
+        for number, item in rows:
+            failures.record(source, number, str(exc), item)
+        stats.add(failed=len(rows))
+        return
+    new_rows = [row for row in rows if (row[1]["PK"], row[1]["SK"]) not in existing]
+    stats.add(skipped=len(rows) - len(new_rows))
+    if not new_rows:
+        return
+    numbers = {item["SK"]: number for number, item in new_rows}
+    pending = [{"PutRequest": {"Item": item}} for _, item in new_rows]
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire(len(pending))
+        try:
+            response = client.batch_write_item(RequestItems={table_name: pending})
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] not in THROTTLE_ERRORS:
+                for request in pending:
+                    item = request["PutRequest"]["Item"]
+                    failures.record(source, numbers[item["SK"]], str(exc), item)
+                stats.add(failed=len(pending))
+                return
+            limiter.throttled()
+            stats.add(throttled=1, retried=len(pending))
+            _backoff(attempt)
+            continue
+        unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+        stats.add(written=len(pending) - len(unprocessed))
+        limiter.succeeded(len(pending) - len(unprocessed))
+        if not unprocessed:
+            return
+        limiter.throttled()
+        stats.add(throttled=1, retried=len(unprocessed))
+        pending = unprocessed
+        _backoff(attempt)
+    for request in pending:
+        item = request["PutRequest"]["Item"]
+        failures.record(source, numbers[item["SK"]], "still unprocessed", item)
+    stats.add(failed=len(pending))
+
+
+def report(stats: Stats, limiter: AdaptiveRate, started: float, stream=sys.stderr):
+    elapsed = time.monotonic() - started
+    print(
+        f"{elapsed:7.1f}s  read {stats.read}  written {stats.written}"
+        f"  skipped {stats.skipped}  failed {stats.failed}  {stats.written / max(elapsed, 1e-9):.0f} items/s"
+        f"  rate {limiter.rate:.0f}/s  throttled {stats.throttled}",
+        file=stream,
+    )
+
+
+def run(args, client) -> int:
+    checkpoint = Checkpoint(args.checkpoint, args.restart)
+    failures = Failures(args.failures)
+    stats = Stats()
+    limiter = AdaptiveRate(args.rate, args.min_rate, args.max_rate, args.increase)
+    imported = set()
+    work = queue.Queue(maxsize=args.workers * 4)
+    stopping = threading.Event()
+
+    def worker():
+        while True:
+            entry = work.get()
+            if entry is None:
+                return
+            source, first, last, rows = entry
+            if rows and not stopping.is_set():
+                write_chunk(client, args.table, limiter, stats, failures, source, rows)
+            if not stopping.is_set():
+                checkpoint.done(source, first, last)
+
+    def reporter():
+        while not finished.wait(args.report_seconds):
+            report(stats, limiter, started)
+            checkpoint.save()
+
+    started = time.monotonic()
+    finished = threading.Event()
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    threads.append(threading.Thread(target=reporter, daemon=True))
+    for thread in threads:
+        thread.start()
+    interrupted = False
+    try:
+        for entry in chunks(args, checkpoint, failures, stats, imported):
+            work.put(entry)
+    except KeyboardInterrupt:
+        interrupted = True
+        stopping.set()
+        print("Interrupted; finishing the writes in flight", file=sys.stderr)
+    finally:
+        for _ in range(args.workers):
+            work.put(None)
+        for thread in threads[:-1]:
+            thread.join()
+        finished.set()
+        checkpoint.save()
+        failures.close()
+        report(stats, limiter, started)
+        # Caches of reference data are validated against the version items;
+        # whatever was written, even by an interrupted run, must invalidate.
+        for entity in imported & set(keys.VERSIONED):
+            client.update_item(
+                TableName=args.table,
+                Key=keys.version_key(entity),
+                UpdateExpression="SET changedAt = :now ADD version :one",
+                ExpressionAttributeValues={":now": int(time.time()), ":one": 1},
+            )
+
+    if stats.failed:
+        print(f"{stats.failed} rows failed; see {args.failures}", file=sys.stderr)
+    if interrupted:
+        return 130
+    return 1 if stats.failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="CSV or JSONL files")
+    parser.add_argument("--table", required=True, help="table name")
+    parser.add_argument(
+        "--type", choices=sorted(keys.ENTITIES), help="entity of rows without a type"
+    )
+    parser.add_argument("--format", choices=("auto", "csv", "jsonl"), default="auto")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint, e.g. DynamoDB Local")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION"))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=500, help="initial items/s")
+    parser.add_argument("--min-rate", type=float, default=25)
+    parser.add_argument("--max-rate", type=float, default=10000)
+    parser.add_argument(
+        "--increase",
+        type=float,
+        default=50,
+        help="items/s added per second of successful writes",
+    )
+    parser.add_argument("--checkpoint", help="default: <first input>.checkpoint.json")
+    parser.add_argument("--failures", help="default: <first input>.failures.jsonl")
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore an existing checkpoint"
+    )
+    parser.add_argument("--report-seconds", type=float, default=5)
+    args = parser.parse_args()
+    args.checkpoint = args.checkpoint or f"{args.inputs[0]}.checkpoint.json"
+    args.failures = args.failures or f"{args.inputs[0]}.failures.jsonl"
+
+    import boto3
+    from botocore.config import Config
+
+    # Throttling is handled here, by the rate limiter, not by botocore.
+    config = Config(
+        max_pool_connections=args.workers,
+        retries={"max_attempts": 1, "mode": "standard"},
+    )
+    client = boto3.resource(
+        "dynamodb",
+        region_name=args.region,
+        endpoint_url=args.endpoint_url,
+        config=config,
+    ).meta.client
+    return run(args, client)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Replay a load scenario against the API and report latency per route.
+
+A scenario is a JSON file (see ``tools/scenarios``) with ``setup`` steps that
+run once, in order, and weighted ``requests`` that workers pick at random.
+Steps can ``capture`` values from their response body into variables, which
+later steps reference as ``{name}`` in paths, query strings and bodies; a
+captured list yields one random element per use. ``{seq}`` expands to a
+counter that is unique per request, and ``{"$repeat": n, "item": ...}`` in a
+body expands to ``n`` copies of ``item``.
+
+    python tools/local_api.py &
+    python tools/loadgen.py tools/scenarios/browse_projects.json --duration 30
+
+The report lists throughput and p50/p95/p99 latency per route. Against
+``tools/local_api.py`` it also shows the handler time and the DynamoDB calls
+per request; ``--output`` writes the same numbers as JSON for comparison
+between runs.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+_PLACEHOLDER = re.compile(r"{(\w+)}")
+
+
+class Scenario:
+    """A parsed scenario file and the variables its steps captured."""
+
+    def __init__(self, definition: dict):
+        self.name = definition.get("name", "scenario")
+        self.setup = definition.get("setup", [])
+        self.requests = definition["requests"]
+        self.weights = [step.get("weight", 1) for step in self.requests]
+        self.variables = dict(definition.get("variables", {}))
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _value(self, name: str) -> str:
+        if name == "seq":
+            with self._lock:
+                return str(next(self._seq))
+        value = self.variables[name]
+        if isinstance(value, list):
+            value = random.choice(value)
+        return str(value)
+
+    def render(self, template):
+        """Expand placeholders and ``$repeat`` blocks in ``template``."""
+        if isinstance(template, str):
+            return _PLACEHOLDER.sub(lambda found: self._value(found.group(1)), template)
+        if isinstance(template, list):
+            return [self.render(value) for value in template]
+        if isinstance(template, dict):
+            if "$repeat" in template:
+                return [
+                    self.render(template["item"]) for _ in range(template["$repeat"])
+                ]
+            return {name: self.render(value) for name, value in template.items()}
+        return template
+
+    def capture(self, step: dict, body) -> None:
+        for name, path in step.get("capture", {}).items():
+            self.variables[name] = extract(body, path)
+
+
+def extract(value, path: str):
+    """Follow a dotted ``path`` into ``value``; ``name[*]`` maps over a list."""
+    parts = path.split(".") if path else []
+    for position, part in enumerate(parts):
+        if part.endswith("[*]"):
+            items = value[part[:-3]] if part[:-3] else value
+            rest = ".".join(parts[position + 1 :])
+            return [extract(item, rest) for item in items]
+        value = value[part]
+    return value
+
+
+class Client:
+    """One keep-alive connection to the API under test."""
+
+    def __init__(self, url: str, headers: dict):
+        parsed = urlsplit(url)
+        connection = (
+            http.client.HTTPSConnection
+            if parsed.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._connection = connection(parsed.netloc, timeout=30)
+        self._prefix = parsed.path.rstrip("/")
+        self._headers = headers
+
+    def send(self, scenario: Scenario, step: dict):
+        """Send ``step``; return status, body, elapsed ms and response headers."""
+        path = self._prefix + scenario.render(step["path"])
+        query = scenario.render(step.get("query", {}))
+        if query:
+            path += "?" + urlencode(query)
+        body = None
+        headers = dict(self._headers)
+        if "body" in step:
+            body = json.dumps(scenario.render(step["body"]))
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        self._connection.request(step.get("method", "GET"), path, body, headers)
+        response = self._connection.getresponse()
+        payload = response.read()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            parsed = json.loads(payload) if payload else None
+        except ValueError:
+            parsed = None
+        return response.status, parsed, elapsed_ms, response.headers
+
+
+class Stats:
+    """Samples per route, collected from all workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def record(self, route: str, status: int, elapsed_ms: float, headers) -> None:
+        handler_ms = headers.get("X-Handler-Ms")
+        calls = headers.get("X-Dynamodb-Calls")
+        with self._lock:
+            self.samples[route].append(
+                (
+                    status,
+                    elapsed_ms,
+                    float(handler_ms) if handler_ms is not None else None,
+                    int(calls) if calls is not None else None,
+                )
+            )
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(stats: Stats, duration: float) -> dict:
+    report = {}
+    for route, samples in sorted(stats.samples.items()):
+        latencies = [sample[1] for sample in samples]
+        handler = [sample[2] for sample in samples if sample[2] is not None]
+        calls = [sample[3] for sample in samples if sample[3] is not None]
+        report[route] = {
+            "requests": len(samples),
+            "errors": sum(1 for sample in samples if sample[0] >= 500),
+            "throughput": round(len(samples) / duration, 2),
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "handler_p50": round(statistics.median(handler), 2) if handler else None,
+            "dynamodb_calls": round(statistics.mean(calls), 2) if calls else None,
+        }
+    return report
+
+
+def print_report(report: dict, duration: float) -> None:
+    print(
+        f"{'route':<30}{'reqs':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'p99 ms':>9}{'handler':>9}{'ddb/req':>9}"
+    )
+    for route, row in report.items():
+        handler = f"{row['handler_p50']:.1f}" if row["handler_p50"] is not None else "-"
+        calls = (
+            f"{row['dynamodb_calls']:.2f}" if row["dynamodb_calls"] is not None else "-"
+        )
+        print(
+            f"{route:<30}{row['requests']:>7}{row['errors']:>5}"
+            f"{row['throughput']:>9.1f}{row['p50']:>9.1f}{row['p95']:>9.1f}"
+            f"{row['p99']:>9.1f}{handler:>9}{calls:>9}"
+        )
+    total = sum(row["requests"] for row in report.values())
+    print(f"{total} requests in {duration:.1f}s ({total / duration:.1f} req/s)")
+
+
+def route_name(step: dict, headers) -> str:
+    return headers.get("X-Route") or f"{step.get('method', 'GET')} {step['path']}"
+
+
+def run_setup(scenario: Scenario, client: Client) -> None:
+    for step in scenario.setup:
+        status, body, _, _ = client.send(scenario, step)
+        if status >= 300:
+            raise SystemExit(f"Setup step {step['path']} failed with {status}: {body}")
+        scenario.capture(step, body)
+
+
+def run_load(scenario: Scenario, args) -> tuple:
+    stats = Stats()
+    budget = itertools.count()
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def worker():
+        client = Client(args.url, dict(args.header))
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            if args.requests and next(budget) >= args.requests:
+                return
+            step = random.choices(scenario.requests, scenario.weights)[0]
+            status, _, elapsed_ms, headers = client.send(scenario, step)
+            stats.record(route_name(step, headers), status, elapsed_ms, headers)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", help="scenario JSON file")
+    parser.add_argument("--url", default="http://127.0.0.1:3001")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="total requests to send")
+    parser.add_argument(
+        "--header",
+        action="append",
+        default=[],
+        type=lambda value: tuple(part.strip() for part in value.split(":", 1)),
+        help='extra request header, e.g. "Authorization: Bearer ..."',
+    )
+    parser.add_argument("--seed", type=int, help="seed the request mix")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        args.duration = 10.0
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    with open(args.scenario) as f:
+        scenario = Scenario(json.load(f))
+    run_setup(scenario, Client(args.url, dict(args.header)))
+    stats, duration = run_load(scenario, args)
+    report = summarize(stats, duration)
+    print(f"Scenario {scenario.name}, concurrency {args.concurrency}")
+    print_report(report, duration)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"scenario": scenario.name, "duration": duration, "routes": report},
+                f,
+                indent=2,
+            )
+    return 1 if any(row["errors"] for row in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
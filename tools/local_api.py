@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Serve every backend handler in-process behind a local HTTP server.
+
+Routes and handlers come from ``grammy.config`` (``ROUTES`` and ``HANDLERS``),
+so the emulator serves what the stack deploys. Each request is turned into an
+API Gateway proxy event and passed to the handler's ``index.handler``.
+DynamoDB is either an in-memory fake (moto) or DynamoDB Local:
+
+    python tools/local_api.py --dynamodb memory
+    python tools/local_api.py --dynamodb http://localhost:8000
+
+Every handler function is loaded once and serves one request at a time, like
+a single warm execution environment. Responses carry ``X-Route``,
+``X-Handler-Ms`` (time spent in the handler, without waiting for the
+environment) and ``X-Dynamodb-Calls`` headers, which ``tools/loadgen.py``
+aggregates per route.
+"""
+
+import argparse
+import base64
+import contextvars
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INFRASTRUCTURE = os.path.join(ROOT, "infrastructure", "grammy")
+LAYER = os.path.join(ROOT, "backend", "shared", "python")
+
+TABLE_NAME = "grammy-local"
+LOCAL_CLAIMS = {"sub": "local-user", "email": "local@example.com"}
+
+_dynamodb_calls = contextvars.ContextVar("dynamodb_calls")
+
+
+class Route:
+    """One ``ROUTES`` entry bound to its handler module."""
+
+    def __init__(self, method: str, path: str, handler_config):
+        self.method = method
+        self.resource = "/" + path
+        self.handler_config = handler_config
+        self.parameters = re.findall(r"{(\w+)}", path)
+        self.pattern = re.compile(
+            "^" + re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", self.resource) + "$"
+        )
+        self.lock = threading.Lock()
+        self._handler = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.resource}"
+
+    def handler(self):
+        if self._handler is None:
+            code_path = self.handler_config.code_path
+            spec = importlib.util.spec_from_file_location(
+                "grammy_local_" + self.handler_config.name,
+                os.path.join(code_path, "index.py"),
+            )
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._handler = module.handler
+        return self._handler
+
+
+def load_routes() -> list:
+    """Return the configured routes, literal paths before parameterized ones.
+
+    Also sets the handlers' ``WRITE_ROUTES``, as the stack does; call it
+    before the layer's ``api`` module is imported.
+    """
+    sys.path.insert(0, INFRASTRUCTURE)
+    from grammy import config
+
+    os.environ["WRITE_ROUTES"] = json.dumps(
+        [
+            f"{route_def['method']} /{route_def['path']}"
+            for route_def in config.ROUTES
+            if route_def.get("write")
+        ]
+    )
+    handler_configs = {handler.name: handler for handler in config.HANDLERS}
+    routes = [
+        Route(
+            route_def.get("method", "GET"),
+            route_def["path"],
+            handler_configs[route_def["handler"]],
+        )
+        for route_def in config.ROUTES
+    ]
+    # One lock per function: routes sharing a handler share its environment.
+    locks = {}
+    for route in routes:
+        route.lock = locks.setdefault(route.handler_config.name, route.lock)
+    return sorted(routes, key=lambda route: len(route.parameters))
+
+
+def match(routes: list, method: str, path: str):
+    """Return the route serving ``method path`` and its path parameters."""
+    for route in routes:
+        found = route.pattern.match(path)
+        if found and route.method == method:
+            return route, found.groupdict()
+    return None, None
+
+
+def proxy_event(route: Route, path_parameters: dict, request) -> dict:
+    """Build the API Gateway (REST, proxy integration) event for ``request``."""
+    url = urlsplit(request.path)
+    query = parse_qsl(url.query, keep_blank_values=True)
+    length = int(request.headers.get("Content-Length") or 0)
+    body = request.rfile.read(length).decode() if length else None
+    headers = dict(request.headers.items())
+    multi_headers = {}
+    for name, value in request.headers.items():
+        multi_headers.setdefault(name, []).append(value)
+    multi_query = {}
+    for name, value in query:
+        multi_query.setdefault(name, []).append(value)
+    return {
+        "resource": route.resource,
+        "path": url.path,
+        "httpMethod": route.method,
+        "headers": headers,
+        "multiValueHeaders": multi_headers,
+        "queryStringParameters": dict(query) or None,
+        "multiValueQueryStringParameters": multi_query or None,
+        "pathParameters": path_parameters or None,
+        "stageVariables": None,
+        "requestContext": {
+            "resourcePath": route.resource,
+            "httpMethod": route.method,
+            "path": "/local" + url.path,
+            "stage": "local",
+            "requestId": str(uuid.uuid4()),
+            "requestTimeEpoch": int(time.time() * 1000),
+            "authorizer": {"claims": LOCAL_CLAIMS},
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def lambda_context(route: Route):
+    deadline = time.monotonic() + route.handler_config.timeout_seconds
+    return SimpleNamespace(
+        function_name=route.handler_config.function_name,
+        memory_limit_in_mb=route.handler_config.memory_size,
+        aws_request_id=str(uuid.uuid4()),
+        get_remaining_time_in_millis=lambda: int((deadline - time.monotonic()) * 1000),
+    )
+
+
+def make_request_handler(routes: list):
+    class RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; avoid delayed-ACK stalls.
+        disable_nagle_algorithm = True
+
+        def _dispatch(self):
+            path = urlsplit(self.path).path.rstrip("/") or "/"
+            route, path_parameters = match(routes, self.command, path)
+            if route is None:
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self._send(
+                    404, {}, json.dumps({"message": "Missing Authentication Token"})
+                )
+                return
+            event = proxy_event(route, path_parameters, self)
+            calls = [0]
+            _dynamodb_calls.set(calls)
+            with route.lock:
+                started = time.perf_counter()
+                try:
+                    result = route.handler()(event, lambda_context(route))
+                except Exception as exc:  # surfaced like API Gateway does
+                    self.log_error("%s raised %r", route.name, exc)
+                    result = {
+                        "statusCode": 502,
+                        "body": json.dumps({"message": "Internal server error"}),
+                    }
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            headers = dict(result.get("headers") or {})
+            headers.update(
+                {
+                    "X-Route": route.name,
+                    "X-Handler-Ms": f"{elapsed_ms:.3f}",
+                    "X-Dynamodb-Calls": str(calls[0]),
+                }
+            )
+            body = result.get("body") or ""
+            if result.get("isBase64Encoded"):
+                body = base64.b64decode(body)
+            self._send(result.get("statusCode", 200), headers, body)
+
+        def _send(self, status: int, headers: dict, body):
+            payload = body.encode() if isinstance(body, str) else body
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+        def log_message(self, format, *args):
+            if self.server.verbose:
+                super().log_message(format, *args)
+
+    return RequestHandler
+
+
+def create_table(client) -> None:
+    """Create the table with the key schema and GSIs of ``data_stack``."""
+    indexes = [
+        ("GSI1", "ALL"),
+        ("GSI2", "KEYS_ONLY"),
+        ("GSI3", "ALL"),
+        ("GSI4", "ALL"),
+    ]
+    attributes = ["PK", "SK"] + [
+        f"{index}{key}" for index, _ in indexes for key in ("PK", "SK")
+    ]
+    client.create_table(
+        TableName=TABLE_NAME,
+        BillingMode="PAY_PER_REQUEST",
+        AttributeDefinitions=[
+            {"AttributeName": name, "AttributeType": "S"} for name in attributes
+        ],
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": index,
+                "KeySchema": [
+                    {"AttributeName": f"{index}PK", "KeyType": "HASH"},
+                    {"AttributeName": f"{index}SK", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": projection},
+            }
+            for index, projection in indexes
+        ],
+    )
+    client.get_waiter("table_exists").wait(TableName=TABLE_NAME)
+
+
+def setup_dynamodb(target: str) -> None:
+    """Point the shared layer at ``target`` and make sure the table exists."""
+    os.environ["TABLE_NAME"] = TABLE_NAME
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+    if target == "memory":
+        from moto import mock_aws
+
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+        mock_aws().start()
+    else:
+        os.environ["DYNAMODB_ENDPOINT"] = target
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+
+    sys.path.insert(0, LAYER)
+    from grammy_common import db
+
+    if TABLE_NAME not in db.client.list_tables()["TableNames"]:
+        create_table(db.client)
+
+    def count_call(**kwargs):
+        calls = _dynamodb_calls.get(None)
+        if calls is not None:
+            calls[0] += 1
+
+    db.client.meta.events.register("before-call.dynamodb", count_call)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument(
+        "--dynamodb",
+        default="memory",
+        help='"memory" for an in-memory fake, or a DynamoDB Local endpoint URL',
+    )
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    routes = load_routes()
+    setup_dynamodb(args.dynamodb)
+    server = ThreadingHTTPServer((args.host, args.port), make_request_handler(routes))
+    server.daemon_threads = True
+    server.verbose = args.verbose
+    print(f"Serving {len(routes)} routes on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
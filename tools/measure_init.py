@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Measure the import/init time of every backend handler.
+
+Each handler is imported in a fresh interpreter, as in a new Lambda execution
+environment, with the shared layer on ``sys.path``. The median over
+``--repeat`` runs is reported per handler. With ``--baseline`` the results
+are compared to an earlier run, and the script exits non-zero when a handler
+got slower than the tolerance allows, so regressions show up before deploy.
+
+    python tools/measure_init.py --update-baseline --baseline init.json
+    python tools/measure_init.py --baseline init.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND = os.path.join(ROOT, "backend")
+LAYER = os.path.join(BACKEND, "shared", "python")
+
+CHILD = """
+import sys, time
+sys.path[:0] = [{layer!r}, {code!r}]
+start = time.perf_counter()
+import index
+print(time.perf_counter() - start)
+"""
+
+# Slack for timer noise on very fast handlers.
+ABSOLUTE_SLACK_MS = 5.0
+
+
+def find_handlers() -> dict:
+    """Return handler code directories keyed by their path under backend/."""
+    handlers = {}
+    for directory, _, files in os.walk(BACKEND):
+        if "index.py" in files and not directory.startswith(
+            os.path.join(BACKEND, "shared")
+        ):
+            handlers[os.path.relpath(directory, BACKEND).replace(os.sep, "/")] = (
+                directory
+            )
+    return dict(sorted(handlers.items()))
+
+
+def measure(code_path: str, repeat: int) -> list:
+    """Return ``repeat`` import times of one handler, in milliseconds."""
+    env = dict(os.environ)
+    env.setdefault("TABLE_NAME", "grammy-local")
+    env.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+    program = CHILD.format(layer=LAYER, code=code_path)
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", program],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="JSON file with earlier medians")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown against the baseline (default 0.25)",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results, regressions = {}, []
+    print(f"{'handler':<28}{'median ms':>12}{'max ms':>10}{'baseline':>10}")
+    for name, code_path in find_handlers().items():
+        samples = measure(code_path, args.repeat)
+        median = statistics.median(samples)
+        results[name] = round(median, 2)
+        previous = baseline.get(name)
+        flag = ""
+        if (
+            previous is not None
+            and median > previous * (1 + args.tolerance) + ABSOLUTE_SLACK_MS
+        ):
+            regressions.append(name)
+            flag = "  REGRESSION"
+        shown = f"{previous:.1f}" if previous is not None else "-"
+        print(f"{name:<28}{median:>12.1f}{max(samples):>10.1f}{shown:>10}{flag}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    if regressions:
+        print(f"Init time regressed for: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
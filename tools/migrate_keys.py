@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Move entity items from per-type partitions to per-item partitions.
+
+Items used to share one partition per type (``PK`` ``SONG``, ``SK``
+``SONG#<id>``); they now have a partition of their own and are listed through
+the GSI4 type shards (see ``grammy_common.keys``). This copies every item
+still in the old layout to its new key and deletes the old item. Search
+documents moved from the ``SEARCH`` partition to sharded ones too, and
+summaries from the ``SUMMARY`` partition to one each; the old ones are
+deleted:
+
+    python tools/migrate_keys.py --table grammy-table-test
+    python tools/migrate_keys.py --table grammy-local \\
+        --endpoint-url http://localhost:8000 --dry-run
+
+Deploy GSI4 first; nothing is moved until it is ``ACTIVE``. The copies are
+written with ``keys.MIGRATING`` set, which the summary aggregator does not
+count, and the mark is cleared once the originals are deleted; then the
+summaries are rebuilt from the moved items. Afterwards invoke the search
+indexer with ``{"backfill": true}`` to write every search document.
+Rerunning is safe: only items still in the old layout are moved.
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAYER = os.path.join(ROOT, "backend", "shared", "python")
+
+sys.path.insert(0, LAYER)
+from grammy_common import keys  # noqa: E402
+
+
+def migrated(entity: keys.Entity, item: dict) -> dict:
+    """Return an ``entity`` item of the old layout under its new key, marked."""
+    entity_id = keys.id_from_sort_key(entity, item["SK"])
+    return {
+        **item,
+        **keys.item_key(entity, entity_id),
+        **keys.type_keys(entity, entity_id),
+        keys.MIGRATING: True,
+    }
+
+
+def index_active(client, table_name: str, index_name: str) -> bool:
+    """Return whether the global secondary index ``index_name`` is usable."""
+    table = client.describe_table(TableName=table_name)["Table"]
+    return any(
+        index["IndexName"] == index_name and index.get("IndexStatus") == "ACTIVE"
+        for index in table.get("GlobalSecondaryIndexes", [])
+    )
+
+
+def move(table, entity: keys.Entity, dry_run: bool) -> int:
+    """Move the old-layout items of ``entity``; return how many."""
+    params = {
+        "KeyConditionExpression": "PK = :pk",
+        "ExpressionAttributeValues": {":pk": entity.prefix},
+    }
+    moved = 0
+    while True:
+        response = table.query(**params)
+        items = [migrated(entity, item) for item in response["Items"]]
+        if not dry_run:
+            with table.batch_writer() as writer:
+                for item in items:
+                    writer.put_item(Item=item)
+            # Only once every copy is written
+            with table.batch_writer() as writer:
+                for item in response["Items"]:
+                    writer.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
+        moved += len(items)
+        if "LastEvaluatedKey" not in response:
+            return moved
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def unmark(table) -> None:
+    """Clear the migration mark of every moved item.
+
+    The marked items are found with a ``Scan``, so copies left marked by an
+    interrupted run are cleared too.
+    """
+    params = {
+        "FilterExpression": "attribute_exists(#migrating)",
+        "ProjectionExpression": "PK, SK",
+        "ExpressionAttributeNames": {"#migrating": keys.MIGRATING},
+    }
+    while True:
+        response = table.scan(**params)
+        for item_key in response["Items"]:
+            try:
+                table.update_item(
+                    Key=item_key,
+                    UpdateExpression="REMOVE #migrating",
+                    ConditionExpression="attribute_exists(PK)",
+                    ExpressionAttributeNames={"#migrating": keys.MIGRATING},
+                )
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                pass  # deleted since
+        if "LastEvaluatedKey" not in response:
+            return
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def delete_partition(table, partition: str, dry_run: bool) -> int:
+    """Delete the items of an old derived partition; return how many."""
+    params = {
+        "KeyConditionExpression": "PK = :pk",
+        "ExpressionAttributeValues": {":pk": partition},
+        "ProjectionExpression": "PK, SK",
+    }
+    deleted = 0
+    while True:
+        response = table.query(**params)
+        if not dry_run:
+            with table.batch_writer() as writer:
+                for item in response["Items"]:
+                    writer.delete_item(Key=item)
+        deleted += len(response["Items"])
+        if "LastEvaluatedKey" not in response:
+            return deleted
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--table", required=True, help="table name")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint, e.g. DynamoDB Local")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION"))
+    parser.add_argument(
+        "--dry-run", action="store_true", help="count the items without moving them"
+    )
+    args = parser.parse_args()
+
+    # The layer's table and summaries read their settings at import
+    os.environ["TABLE_NAME"] = args.table
+    if args.endpoint_url:
+        os.environ["DYNAMODB_ENDPOINT"] = args.endpoint_url
+    if args.region:
+        os.environ["AWS_DEFAULT_REGION"] = args.region
+    from grammy_common import db, summaries
+
+    if not index_active(db.client, args.table, "GSI4"):
+        print(
+            f"GSI4 of {args.table} is not ACTIVE yet; deploy it first", file=sys.stderr
+        )
+        return 1
+
+    # Old partitions are the bare type prefixes; a Query per type reads them
+    moved = sum(
+        move(db.table, entity, args.dry_run) for entity in keys.ENTITIES.values()
+    )
+    derived = sum(
+        delete_partition(db.table, partition, args.dry_run)
+        for partition in (keys.SEARCH.prefix, keys.SUMMARY.prefix)
+    )
+    if args.dry_run:
+        print(
+            f"would move {moved} items, would delete {derived} "
+            "search documents and summaries"
+        )
+        return 0
+    unmark(db.table)
+    rebuilt = summaries.rebuild()
+    print(
+        f"moved {moved} items, deleted {derived} search documents and "
+        f"summaries, rebuilt {rebuilt} summaries"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
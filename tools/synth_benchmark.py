@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Measure how long ``cdk synth`` of ``infrastructure/grammy/app.py`` takes.
+
+The app is run as ``cdk synth`` runs it, in a fresh interpreter, writing to a
+temporary cloud assembly. The cold run starts from an empty build directory,
+so every handler is bundled; the warm runs reuse the content-hashed bundles,
+as a synth after a small change does. Medians are reported, and with
+``--history`` each run is appended to a JSON lines file and compared to the
+previous one, so synth time can be tracked over commits.
+
+    python tools/synth_benchmark.py --history synth-times.jsonl
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INFRASTRUCTURE = os.path.join(ROOT, "infrastructure", "grammy")
+
+
+def synth(command: list, build_dir: str) -> float:
+    """Run one synth; return its wall time in seconds."""
+    with tempfile.TemporaryDirectory() as outdir:
+        env = dict(os.environ, CDK_OUTDIR=outdir, GRAMMY_BUILD_DIR=build_dir)
+        start = time.perf_counter()
+        subprocess.run(
+            command, cwd=INFRASTRUCTURE, env=env, check=True, capture_output=True
+        )
+        return time.perf_counter() - start
+
+
+def git_revision() -> str:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() or "unknown"
+
+
+def last_record(path: str):
+    try:
+        with open(path) as f:
+            lines = [line for line in f if line.strip()]
+    except OSError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="warm runs")
+    parser.add_argument(
+        "--app",
+        default=f"{shlex.quote(sys.executable)} app.py",
+        help="command that synthesizes the app (default: python app.py)",
+    )
+    parser.add_argument("--history", help="JSON lines file to append results to")
+    args = parser.parse_args()
+    command = shlex.split(args.app)
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        cold = synth(command, build_dir)
+        warm = [synth(command, build_dir) for _ in range(args.repeat)]
+    record = {
+        "time": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "revision": git_revision(),
+        "coldSeconds": round(cold, 2),
+        "warmSeconds": round(statistics.median(warm), 2),
+    }
+
+    previous = last_record(args.history) if args.history else None
+    print(f"{'run':<8}{'seconds':>10}{'previous':>10}")
+    for run, key in (("cold", "coldSeconds"), ("warm", "warmSeconds")):
+        shown = f"{previous[key]:.2f}" if previous else "-"
+        print(f"{run:<8}{record[key]:>10.2f}{shown:>10}")
+
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Appended to {args.history}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
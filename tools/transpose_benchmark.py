@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark song transposition (``grammy_common.fretboard``).
+
+Random songs of each ``--notes`` size are transposed from standard tuning to
+drop D with a capo, the way ``POST /songs/{id}/transpose`` does it. The tab
+is compared with a per-note reference implementation that searches the
+target fretboard note by note; both must give the same result. The table for
+a pair of fretboards is built once and memoized, so the cold time includes
+building it. Warm times are the median over ``--repeat`` runs, and songs
+have one chord per eight notes.
+
+    python tools/transpose_benchmark.py --notes 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "backend", "shared", "python"))
+
+from grammy_common import fretboard  # noqa: E402
+
+STANDARD = {"notes": ["E2", "A2", "D3", "G3", "B3", "E4"]}
+DROP_D = {"notes": ["D2", "A2", "D3", "G3", "B3", "E4"]}
+GUITAR = {"strings": 6, "frets": 22}
+
+
+def random_song(notes: int, seed: int) -> dict:
+    generator = random.Random(seed)
+    return {
+        "tab": [
+            {
+                "string": generator.randrange(6),
+                "fret": generator.randrange(GUITAR["frets"] + 1),
+                "time": index / 4,
+            }
+            for index in range(notes)
+        ],
+        "chords": [
+            {
+                "frets": [
+                    None if generator.random() < 0.2 else generator.randrange(5)
+                    for _ in range(6)
+                ]
+            }
+            for _ in range(notes // 8)
+        ],
+    }
+
+
+def reference_tab(tab: list, source, target) -> list:
+    """Transpose note by note, as the table is defined."""
+    result = []
+    for note in tab:
+        sounding = source.tuning[note["string"]] + source.capo + note["fret"]
+        best = None
+        for string, open_pitch in enumerate(target.tuning):
+            fret = sounding - open_pitch - target.capo
+            if 0 <= fret <= target.reach:
+                cost = (
+                    abs(string - note["string"]) * (target.frets + 1) + fret,
+                    string,
+                )
+                if best is None or cost < best[0]:
+                    best = (cost, string, fret)
+        string, fret = (best[1], best[2]) if best else (None, None)
+        result.append({**note, "string": string, "fret": fret})
+    return result
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--notes", type=int, nargs="+", default=[1000, 5000, 20000, 100000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = fretboard.fretboard(STANDARD, GUITAR)
+    target = fretboard.fretboard(DROP_D, GUITAR, capo=2)
+
+    print(
+        f"{'notes':>8}{'cold ms':>10}{'warm ms':>10}{'per-note ms':>13}"
+        f"{'speedup':>9}{'chords ms':>11}{'unplayable':>12}"
+    )
+    for notes in args.notes:
+        song = random_song(notes, seed=notes)
+        fretboard.transposition.cache_clear()
+        fretboard.pitches.cache_clear()
+        cold = timed(fretboard.transpose_tab, song["tab"], source, target)
+        warm = statistics.median(
+            timed(fretboard.transpose_tab, song["tab"], source, target)
+            for _ in range(args.repeat)
+        )
+        per_note = statistics.median(
+            timed(reference_tab, song["tab"], source, target)
+            for _ in range(args.repeat)
+        )
+        chords = statistics.median(
+            timed(fretboard.transpose_chords, song["chords"], source, target)
+            for _ in range(args.repeat)
+        )
+        tab, unplayable = fretboard.transpose_tab(song["tab"], source, target)
+        if tab != reference_tab(song["tab"], source, target):
+            print(f"Transposed tab differs from the reference for {notes} notes")
+            return 1
+        print(
+            f"{notes:>8}{cold:>10.2f}{warm:>10.2f}{per_note:>13.2f}"
+            f"{per_note / warm:>8.1f}x{chords:>11.2f}{unplayable:>12}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())